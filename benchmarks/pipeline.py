@@ -0,0 +1,325 @@
+"""
+Бенчмарк конвейеров обработки гиперспектральных сеансов (desk и web) на синтетических данных.
+
+Генерирует гиперкубы с известными концентрациями хромофоров (очаг с повышенным THb на фоне кожи),
+прогоняет по ним этапы обработки настольного приложения (desk/src/core/processing.py) и сервера
+(web/back/src/utils/spectral.py) и для каждого этапа записывает время, пропускную способность
+(Mpix/s — пикселей одного канала в секунду) и пиковый объём памяти, выделенной numpy (tracemalloc).
+Точность разложения контролируется по RMSE концентраций относительно заданных.
+
+Примеры:
+    python benchmarks/pipeline.py                                  # 256² и 1080p, 8 и 16 каналов
+    python benchmarks/pipeline.py --sizes 256 1080p 4k --bands 8 --repeat 5
+    python benchmarks/pipeline.py --save-baseline benchmarks/baseline.json
+    python benchmarks/pipeline.py --compare benchmarks/baseline.json --tolerance 0.2
+
+При --compare этапы, ставшие медленнее базовых больше чем на tolerance, выводятся как регрессии,
+и скрипт завершается с кодом 1. Базовый файл записывается на эталонной машине и хранится рядом.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "desk" / "src"))  # core.processing
+sys.path.insert(0, str(ROOT / "web" / "back"))  # src.utils.spectral
+sys.path.insert(0, str(ROOT))  # engine (общий код desk и web)
+
+RESOLUTIONS = {
+    "256": (256, 256),
+    "1080p": (1920, 1080),
+    "4k": (3840, 2160),
+}
+CHROMOPHORES = ["HbO2", "Hb", "Mel"]
+
+
+# --- Синтетические данные ---
+
+def make_overlap_matrix(n_bands, rng):
+    """
+    Матрица перекрытия (каналы × хромофоры) с гладкими положительными спектрами поглощения
+    """
+    wavelengths = np.linspace(0.0, 1.0, n_bands)
+    centers = rng.uniform(0.1, 0.9, len(CHROMOPHORES))
+    widths = rng.uniform(0.15, 0.35, len(CHROMOPHORES))
+    matrix = np.exp(-((wavelengths[:, None] - centers[None, :]) / widths[None, :]) ** 2)
+    return (0.2 + matrix).astype(np.float32)
+
+
+def make_scene(width, height, n_bands, seed=0):
+    """
+    Синтетический сеанс: матрица перекрытия, концентрации (хромофоры, H, W) и каналы uint8.
+    В центре кадра — очаг с повышенными HbO2/Hb, по всему кадру — плавный фон и шум.
+    """
+    rng = np.random.default_rng(seed)
+    overlap = make_overlap_matrix(n_bands, rng)
+
+    yy, xx = np.mgrid[0:height, 0:width].astype(np.float32)
+    cx, cy, radius = width / 2, height / 2, min(width, height) / 5
+    lesion = ((xx - cx) ** 2 + (yy - cy) ** 2 <= radius ** 2).astype(np.float32)
+    gradient = xx / max(width - 1, 1)
+
+    concentrations = np.stack([
+        0.15 + 0.05 * gradient + 0.25 * lesion,     # HbO2
+        0.10 + 0.05 * (1 - gradient) + 0.20 * lesion,  # Hb
+        0.08 + 0.02 * gradient,                     # Меланин
+    ]).astype(np.float32)
+
+    od = (overlap @ concentrations.reshape(len(CHROMOPHORES), -1)).reshape(n_bands, height, width)
+    od += rng.normal(0.0, 0.002, od.shape).astype(np.float32)
+    bands = np.clip(255.0 * np.power(10.0, -od), 0, 255).round().astype(np.uint8)
+    return overlap, concentrations, bands
+
+
+def write_bands(bands, directory):
+    """ Сохраняет каналы в PNG (для этапа загрузки); возвращает пути в порядке каналов """
+    from PIL import Image
+
+    paths = []
+    for i, band in enumerate(bands):
+        path = os.path.join(directory, f"band_{i:02d}.png")
+        Image.fromarray(band).save(path)
+        paths.append(path)
+    return paths
+
+
+# --- Измерение ---
+
+def measure(func, repeat, memory):
+    """
+    Время этапа (лучшее из repeat запусков) и пик памяти numpy за отдельный запуск под tracemalloc.
+    Возвращает (результат, секунды, пик в МБ или None)
+    """
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    peak_mb = None
+    if memory:
+        tracemalloc.start()
+        try:
+            func()
+            peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+    return result, best, peak_mb
+
+
+def rmse(estimated, expected):
+    return float(np.sqrt(np.mean((np.asarray(estimated, dtype=np.float64) - expected) ** 2)))
+
+
+# --- Конвейеры ---
+
+def desk_stages(paths, overlap, unmixing="lstsq"):
+    """ Этапы ProcessWorker (без БД): функции, каждая принимает результат предыдущих """
+    from PIL import Image
+    from core.processing import HypercubeBuilder, BandRegistration, ConcentrationCalculator, AnalysisEngine, to_uint8
+    from engine.unmixing import REGULARIZED_METHODS
+
+    # Как в ProcessWorker: после разложения с регуляризацией размытие не выполняется
+    engine = AnalysisEngine(gaussian_sigma=0.0 if unmixing in REGULARIZED_METHODS else 1.0)
+    state = {}
+
+    def encode():
+        for image in [state["thb"], *state["concentrations"]]:
+            Image.fromarray(to_uint8(image)).save(io.BytesIO(), format="PNG")
+
+    return state, [
+        ("load", lambda: HypercubeBuilder(paths).build(), "cube"),
+        ("register", lambda: BandRegistration().apply(state["cube"], BandRegistration().estimate(state["cube"])), "cube"),
+        ("od", lambda: ConcentrationCalculator.optical_density(state["cube"]), "od"),
+        ("unmix", lambda: ConcentrationCalculator(overlap, unmixing).calculate(state["od"]), "concentrations"),
+        ("thb", lambda: AnalysisEngine.thb_map(state["concentrations"], CHROMOPHORES)[0], "thb"),
+        ("segment", lambda: engine.segment(state["thb"])[1], "mask"),
+        ("stats", lambda: AnalysisEngine.statistics(state["thb"], state["mask"]), "stats"),
+        ("encode", encode, None),
+    ]
+
+
+def web_stages(paths, overlap, size, unmixing="lstsq"):
+    """ Этапы analyze_hyperspectral_session (без БД и Celery) """
+    import cv2
+    from src.utils import spectral
+    from engine.registration import estimate_shifts, apply_shifts
+    from engine.unmixing import unmix, REGULARIZED_METHODS
+
+    state = {}
+    normalized = overlap / np.abs(overlap).max()
+
+    def segment():
+        mask, _ = spectral.segment_otsu(state["thb"], blur=unmixing not in REGULARIZED_METHODS)
+        spectral.zone_statistics(state["thb"], mask)
+        return mask
+
+    def encode():
+        cv2.imencode(".png", spectral.contour_image(state["thb"], state["mask"]))
+        for image in state["concentrations"]:
+            cv2.imencode(".png", spectral.to_uint8(image))
+
+    return state, [
+        ("load", lambda: np.stack([spectral.read_band(p, size) for p in paths]), "cube"),
+        ("register", lambda: apply_shifts(state["cube"], estimate_shifts(state["cube"])), "cube"),
+        ("od", lambda: spectral.optical_density(state["cube"]), "od"),
+        ("unmix", lambda: unmix(normalized, state["od"], unmixing), "concentrations"),
+        ("thb", lambda: spectral.thb_map(state["concentrations"], 0, 1), "thb"),
+        ("segment", segment, "mask"),
+        ("encode", encode, None),
+    ]
+
+
+def run_pipeline(stages, state, megapixels, repeat, memory):
+    records = []
+    total = 0.0
+    for stage, func, key in stages:
+        result, seconds, peak_mb = measure(func, repeat, memory)
+        if key:
+            state[key] = result
+        total += seconds
+        records.append({
+            "stage": stage,
+            "seconds": round(seconds, 6),
+            "mpix_per_s": round(megapixels / seconds, 3) if seconds > 0 else None,
+            "peak_mb": round(peak_mb, 2) if peak_mb is not None else None,
+        })
+    records.append({
+        "stage": "total",
+        "seconds": round(total, 6),
+        "mpix_per_s": round(megapixels / total, 3) if total > 0 else None,
+        "peak_mb": max((r["peak_mb"] for r in records if r["peak_mb"] is not None), default=None),
+    })
+    return records
+
+
+def run(sizes, band_counts, pipelines, repeat, memory, seed, unmixing="lstsq"):
+    results = []
+    for size_name in sizes:
+        width, height = RESOLUTIONS[size_name]
+        megapixels = width * height / 1e6
+        for n_bands in band_counts:
+            overlap, expected, bands = make_scene(width, height, n_bands, seed)
+            with tempfile.TemporaryDirectory() as directory:
+                paths = write_bands(bands, directory)
+                for pipeline in pipelines:
+                    if pipeline == "desk":
+                        state, stages = desk_stages(paths, overlap, unmixing)
+                        scale = 1.0
+                    else:
+                        state, stages = web_stages(paths, overlap, (width, height), unmixing)
+                        # Сервер нормирует матрицу на максимум — концентрации масштабируются обратно
+                        scale = 1.0 / np.abs(overlap).max()
+                    records = run_pipeline(stages, state, megapixels, repeat, memory)
+                    error = rmse(state["concentrations"] * scale, expected)
+                    for record in records:
+                        record.update(pipeline=pipeline, resolution=size_name, bands=n_bands, unmixing=unmixing)
+                    results.extend(records)
+                    total = records[-1]
+                    print(
+                        f"{pipeline:4} {size_name:>5} {n_bands:>2} каналов: {total['seconds']:.3f} с, "
+                        f"{total['mpix_per_s']} Mpix/s, пик {total['peak_mb']} МБ, RMSE {error:.2e}"
+                    )
+                    results.append({
+                        "pipeline": pipeline, "resolution": size_name, "bands": n_bands, "unmixing": unmixing,
+                        "stage": "accuracy", "rmse": error,
+                    })
+    return results
+
+
+# --- Сравнение с базовым прогоном ---
+
+def _key(record):
+    return (record["pipeline"], record["resolution"], record["bands"],
+            record.get("unmixing", "lstsq"), record["stage"])
+
+
+def compare(results, baseline, tolerance):
+    """
+    Печатает изменение времени этапов относительно базового прогона.
+    Возвращает список регрессий (этапы медленнее базовых больше чем на tolerance)
+    """
+    base = {_key(r): r for r in baseline["results"] if "seconds" in r}
+    regressions = []
+    print(f"\n{'конвейер':8} {'размер':>6} {'кан.':>4} {'этап':8} {'база, с':>10} {'сейчас, с':>10} {'изм.':>8}")
+    for record in results:
+        if "seconds" not in record or _key(record) not in base:
+            continue
+        before = base[_key(record)]["seconds"]
+        ratio = record["seconds"] / before if before else float("inf")
+        mark = ""
+        if ratio > 1 + tolerance:
+            mark = "  регрессия"
+            regressions.append(record)
+        elif ratio < 1 - tolerance:
+            mark = "  ускорение"
+        print(
+            f"{record['pipeline']:8} {record['resolution']:>6} {record['bands']:>4} {record['stage']:8} "
+            f"{before:>10.4f} {record['seconds']:>10.4f} {ratio - 1:>+8.0%}{mark}"
+        )
+    return regressions
+
+
+def main(argv=None):
+    from engine.unmixing import UNMIXING_METHODS
+
+    parser = argparse.ArgumentParser(description="Бенчмарк конвейеров обработки на синтетических гиперкубах")
+    parser.add_argument("--sizes", nargs="+", default=["256", "1080p"], choices=list(RESOLUTIONS))
+    parser.add_argument("--bands", nargs="+", type=int, default=[8, 16])
+    parser.add_argument("--pipelines", nargs="+", default=["desk", "web"], choices=["desk", "web"])
+    parser.add_argument("--repeat", type=int, default=3, help="Запусков каждого этапа (берётся лучший)")
+    parser.add_argument("--no-memory", action="store_true", help="Не измерять пик памяти (tracemalloc)")
+    parser.add_argument("--unmixing", default="lstsq", choices=list(UNMIXING_METHODS),
+                        help="Метод разложения")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Сохранить результаты в JSON")
+    parser.add_argument("--save-baseline", help="Сохранить результаты как базовые (JSON)")
+    parser.add_argument("--compare", help="Сравнить с базовыми результатами (JSON)")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Допустимое замедление этапа (доля)")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.bands, args.pipelines, max(args.repeat, 1), not args.no_memory, args.seed,
+                  args.unmixing)
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"Результаты сохранены: {path}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\nРегрессий: {len(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,9 @@
 import os
 
+from PyQt6.QtCore import QSettings
+
+from engine.unmixing import REGULARIZATION_WEIGHT
+
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 
 class AppSettings:
@@ -9,4 +13,60 @@ class AppSettings:
         pass
 
     def get_device_api_url():
-        pass
\ No newline at end of file
+        pass
+
+
+# --- Пользовательские настройки (QSettings) ---
+
+PROFILING_KEY = "processing/profiling"
+UNMIXING_KEY = "processing/unmixing"
+REGULARIZATION_KEY = "processing/regularization"
+REGISTRATION_KEY = "processing/registration"
+
+
+def app_settings():
+    return QSettings("HyperSpectRus", "desk")
+
+
+def is_processing_profiling_enabled():
+    """
+    Включено ли профилирование обработки сеанса (отчёт сохраняется рядом с результатами).
+    """
+    return app_settings().value(PROFILING_KEY, False, type=bool)
+
+
+def set_processing_profiling_enabled(enabled):
+    app_settings().setValue(PROFILING_KEY, bool(enabled))
+
+
+def get_unmixing_method():
+    """
+    Метод разложения на хромофоры (ключ из engine.unmixing.UNMIXING_METHODS).
+    """
+    return app_settings().value(UNMIXING_KEY, "lstsq", type=str)
+
+
+def set_unmixing_method(method):
+    app_settings().setValue(UNMIXING_KEY, method)
+
+
+def get_regularization_weight():
+    """
+    Относительный вес регуляризации для разложения tikhonov / tv.
+    """
+    return app_settings().value(REGULARIZATION_KEY, REGULARIZATION_WEIGHT, type=float)
+
+
+def set_regularization_weight(weight):
+    app_settings().setValue(REGULARIZATION_KEY, float(weight))
+
+
+def is_band_registration_enabled():
+    """
+    Совмещать ли каналы гиперкуба перед разложением (по умолчанию — да).
+    """
+    return app_settings().value(REGISTRATION_KEY, True, type=bool)
+
+
+def set_band_registration_enabled(enabled):
+    app_settings().setValue(REGISTRATION_KEY, bool(enabled))
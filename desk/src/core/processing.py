@@ -1,8 +1,204 @@
+import numpy as np
+from PIL import Image
+from skimage.filters import threshold_otsu, gaussian
+import cv2
+
+from engine.registration import REGISTRATION_WINDOW, REGISTRATION_MAX_SHIFT, estimate_shifts, apply_shifts
+from engine.unmixing import UNMIXING_METHODS, REGULARIZATION_WEIGHT, unmix
+
+"""
+Вычислительные этапы обработки сеанса без привязки к БД и Qt:
+сборка гиперкуба, совмещение каналов, расчёт оптической плотности и карт концентраций, THb,
+сегментация и статистики. Используются ProcessWorker и бенчмарком (benchmarks/pipeline.py).
+"""
+
+
 class HypercubeBuilder:
-    pass
+    """
+    Сборка гиперкуба из снимков (по одному на длину волны, в порядке длин волн).
+    Если задана roi (x, y, ширина, высота), снимки обрезаются сразу при декодировании:
+    в памяти и на всех следующих этапах — только область интереса.
+    """
+
+    def __init__(self, paths, roi=None):
+        self.paths = list(paths)
+        self.roi = roi
+
+    def image_size(self):
+        """
+        Размер снимков (W, H) по заголовкам файлов. Если размеры различаются — None.
+        """
+        sizes = set()
+        for path in self.paths:
+            with Image.open(path) as img:
+                sizes.add(img.size)
+        return sizes.pop() if len(sizes) == 1 else None
+
+    def build(self):
+        """
+        Гиперкуб (каналы, H, W) float32 из снимков в оттенках серого.
+        JPEG декодируется сразу в оттенках серого (draft), без преобразования цвета.
+        """
+        cube = None
+        for i, path in enumerate(self.paths):
+            with Image.open(path) as img:
+                img.draft("L", img.size)
+                box = roi_box(self.roi, img.size)
+                if box is not None:
+                    img = img.crop(box)
+                band = np.asarray(img.convert("L"), dtype=np.float32)
+            if cube is None:
+                # Память под весь куб выделяется один раз, без промежуточного списка слоёв
+                cube = np.empty((len(self.paths),) + band.shape, dtype=np.float32)
+            cube[i] = band
+        return cube
+
+
+def roi_box(roi, size):
+    """
+    Прямоугольник (left, top, right, bottom) для Image.crop по ROI (x, y, ширина, высота),
+    ограниченный размером снимка size (W, H). None — ROI не задана, пуста или совпадает с кадром.
+    """
+    if roi is None:
+        return None
+    x, y, w, h = roi
+    width, height = size
+    left, top = max(int(x), 0), max(int(y), 0)
+    right, bottom = min(int(x + w), width), min(int(y + h), height)
+    if right <= left or bottom <= top or (left, top, right, bottom) == (0, 0, width, height):
+        return None
+    return left, top, right, bottom
+
+
+class BandRegistration:
+    """
+    Совмещение каналов гиперкуба: компенсация смещения пациента между кадрами.
+    Оценка сдвигов и сдвиг каналов — в engine.registration (общий код с web).
+    """
+
+    def __init__(self, window=REGISTRATION_WINDOW, max_shift=REGISTRATION_MAX_SHIFT):
+        self.window = window
+        self.max_shift = max_shift
+
+    def estimate(self, cube):
+        """
+        Сдвиги каналов (каналы, 2) — (dy, dx) в пикселях: канал[y, x] ≈ опорный[y - dy, x - dx].
+        """
+        return estimate_shifts(cube, self.window, self.max_shift)
+
+    @staticmethod
+    def apply(cube, shifts):
+        """
+        Сдвигает каналы на оценённые сдвиги (на месте), чтобы они совпали с опорным.
+        """
+        return apply_shifts(cube, shifts)
+
 
 class ConcentrationCalculator:
-    pass
+    """
+    Расчёт карт концентраций хромофоров по матрице перекрытия (спектры × хромофоры).
+    """
+
+    def __init__(self, overlap_matrix, method="lstsq", regularization=REGULARIZATION_WEIGHT):
+        if method not in UNMIXING_METHODS:
+            raise ValueError(f"Неизвестный метод разложения: {method}")
+        self.overlap_matrix = np.asarray(overlap_matrix, dtype=np.float32)
+        self.method = method
+        self.regularization = regularization
+
+    @staticmethod
+    def optical_density(cube):
+        """
+        OD = -log10(I / I0), I0 = 255. Epsilon защищает от log(0).
+        """
+        od = np.clip(cube / np.float32(255.0), 1e-6, 1.0)
+        np.log10(od, out=od)
+        np.negative(od, out=od)
+        return od
+
+    def calculate(self, od):
+        """
+        Карты концентраций (хромофоры, H, W) выбранным методом разложения (см. engine.unmixing.unmix).
+        """
+        return unmix(self.overlap_matrix, od, self.method, self.regularization)
+
 
 class AnalysisEngine:
-    pass
\ No newline at end of file
+    """
+    THb-карта, сегментация (Гаусс + Otsu) и статистики по областям.
+    """
+
+    def __init__(self, gaussian_sigma=1.0):
+        self.gaussian_sigma = gaussian_sigma
+
+    @staticmethod
+    def thb_map(concentration_maps, symbols):
+        """
+        THb = |HbO2| + |Hb| (или доступный из них, или первый хромофор).
+        Возвращает (карта, сообщение для журнала обработки).
+        """
+        lowered = [s.lower() for s in symbols]
+        idx_hbo2 = next((i for i, s in enumerate(lowered) if s in ["hbo2", "hb02"]), None)
+        idx_hb = next((i for i, s in enumerate(lowered) if s == "hb"), None)
+
+        if idx_hbo2 is not None and idx_hb is not None:
+            return (np.abs(concentration_maps[idx_hbo2]) + np.abs(concentration_maps[idx_hb]),
+                    "Информация: THb = |HbO2| + |Hb|.")
+        if idx_hbo2 is not None:
+            return (np.abs(concentration_maps[idx_hbo2]),
+                    "Предупреждение: Хромофор Hb не найден. THb рассчитывается как |HbO2|.")
+        if idx_hb is not None:
+            return (np.abs(concentration_maps[idx_hb]),
+                    "Предупреждение: Хромофор HbO2 не найден. THb рассчитывается как |Hb|.")
+        if len(symbols) > 0:
+            return (np.abs(concentration_maps[0]),
+                    f"Предупреждение: Хромофоры Hb и HbO2 не найдены. THb основан на первом доступном хромофоре: {symbols[0]}.")
+        return None, "Критическая ошибка: Нет хромофоров для расчета THb."
+
+    def segment(self, thb_map, log=None):
+        """
+        Сегментация THb-карты: размытие Гаусса, нормировка к uint8 и порог Otsu.
+        Возвращает (порог, маска очага). log(сообщение) — для сообщений о запасных вариантах.
+        Если gaussian_sigma = 0 (карта уже сглажена регуляризацией), размытие не выполняется.
+        """
+        # preserve_range=True важно, чтобы значения не нормировались skimage автоматически до [0,1]
+        if self.gaussian_sigma > 0:
+            blurred = gaussian(thb_map, sigma=self.gaussian_sigma, preserve_range=True)
+        else:
+            blurred = thb_map
+        norm = to_uint8(blurred)
+
+        try:
+            threshold, binary = cv2.threshold(norm, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        except Exception as otsu_cv2_e:
+            if log:
+                log(f"Ошибка Otsu (cv2): {otsu_cv2_e}. Попытка с skimage.filters.threshold_otsu...")
+            try:
+                threshold = threshold_otsu(norm)
+                binary = (norm >= threshold).astype(np.uint8) * 255
+            except Exception as otsu_sk_e:
+                if log:
+                    log(f"Ошибка Otsu (skimage): {otsu_sk_e}. Используется порог 128.")
+                threshold = 128.0
+                binary = (norm >= threshold).astype(np.uint8) * 255
+        return threshold, binary == 255
+
+    @staticmethod
+    def statistics(thb_map, mask_lesion):
+        """
+        Средний THb в очаге и на здоровой коже и S-коэффициент (их отношение).
+        """
+        mask_skin = ~mask_lesion
+        mean_lesion = float(np.nanmean(thb_map[mask_lesion])) if np.any(mask_lesion) else 0.0
+        mean_skin = float(np.nanmean(thb_map[mask_skin])) if np.any(mask_skin) else 0.0
+        s_coefficient = mean_lesion / mean_skin if mean_skin > 1e-6 else 0.0
+        return mean_lesion, mean_skin, s_coefficient
+
+
+def to_uint8(img):
+    """
+    Линейная нормировка массива к 0–255 (uint8) для сохранения или сегментации.
+    """
+    min_val = np.nanmin(img)
+    max_val = np.nanmax(img)
+    return ((img - min_val) / (max_val - min_val + 1e-8) * 255).astype(np.uint8)
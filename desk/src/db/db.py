@@ -4,6 +4,9 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from db.models import Base
+from db.search import init_patient_search
+from db.matrix import init_overlap_index
+from db.schema import add_missing_columns
 
 # Вычисляем путь к app.db относительно main.py
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -14,6 +17,9 @@ SessionLocal = sessionmaker(bind=engine, autoflush=False)
 
 def init_db():
     Base.metadata.create_all(engine)
+    add_missing_columns(engine)
+    init_patient_search(engine)
+    init_overlap_index(engine)
 
 
 @contextmanager
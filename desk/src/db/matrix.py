@@ -0,0 +1,108 @@
+import uuid
+import threading
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from db.models import OverlapCoefficient
+
+logger = logging.getLogger(__name__)
+
+"""
+Чтение и пакетное сохранение матрицы коэффициентов перекрытия (спектр × хромофор).
+Все изменённые ячейки записываются одной транзакцией через INSERT ... ON CONFLICT
+по уникальному индексу (spectrum_id, chromophore_id). После сохранения рассылается событие
+«матрица изменена» со списком затронутых спектров — по нему открытые окна сеансов
+помечают результаты, полученные с прежними коэффициентами, как устаревшие.
+"""
+
+UNIQUE_INDEX_NAME = "uq_overlap_coefficients_spectrum_chromophore"
+
+_listeners = []
+_lock = threading.Lock()
+
+
+def init_overlap_index(engine):
+    """
+    Создаёт уникальный индекс (spectrum_id, chromophore_id) в существующей БД.
+    Дубликаты, накопившиеся до появления индекса, удаляются (остаётся последняя запись).
+    """
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type='index' AND name=:name"),
+            {"name": UNIQUE_INDEX_NAME},
+        ).first() is not None
+        if exists:
+            return
+        removed = conn.execute(text(
+            "DELETE FROM overlap_coefficients WHERE rowid NOT IN ("
+            " SELECT MAX(rowid) FROM overlap_coefficients GROUP BY spectrum_id, chromophore_id)"
+        )).rowcount
+        if removed:
+            logger.warning(f"Удалено дублирующихся коэффициентов перекрытия: {removed}")
+    for index in OverlapCoefficient.__table__.indexes:
+        index.create(engine, checkfirst=True)
+
+
+def subscribe_matrix_changed(callback):
+    """
+    Подписывает callback(spectrum_ids) на изменение матрицы.
+    spectrum_ids — множество спектров, строки которых изменились.
+    """
+    with _lock:
+        _listeners.append(callback)
+
+
+def unsubscribe_matrix_changed(callback):
+    with _lock:
+        if callback in _listeners:
+            _listeners.remove(callback)
+
+
+def _notify(spectrum_ids):
+    with _lock:
+        listeners = list(_listeners)
+    for callback in listeners:
+        try:
+            callback(spectrum_ids)
+        except Exception as e:
+            logger.warning(f"Ошибка обработчика изменения матрицы: {e}")
+
+
+def load_overlap_coefficients(session, spectrum_ids):
+    """
+    Коэффициенты для указанных спектров одним запросом: {(spectrum_id, chromophore_id): коэффициент}.
+    """
+    spectrum_ids = list(spectrum_ids)
+    if not spectrum_ids:
+        return {}
+    rows = session.query(
+        OverlapCoefficient.spectrum_id, OverlapCoefficient.chromophore_id, OverlapCoefficient.coefficient
+    ).filter(OverlapCoefficient.spectrum_id.in_(spectrum_ids)).all()
+    return {(s_id, c_id): coef for s_id, c_id, coef in rows}
+
+
+def save_overlap_coefficients(session, values):
+    """
+    Сохраняет коэффициенты {(spectrum_id, chromophore_id): значение} одной транзакцией.
+    При ошибке транзакция откатывается целиком и исключение пробрасывается вызывающему.
+    """
+    if not values:
+        return
+    rows = [
+        {"id": str(uuid.uuid4()), "spectrum_id": s_id, "chromophore_id": c_id, "coefficient": float(val)}
+        for (s_id, c_id), val in values.items()
+    ]
+    stmt = sqlite_insert(OverlapCoefficient)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[OverlapCoefficient.spectrum_id, OverlapCoefficient.chromophore_id],
+        set_={"coefficient": stmt.excluded.coefficient},
+    )
+    try:
+        session.execute(stmt, rows)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    _notify({s_id for s_id, _ in values})
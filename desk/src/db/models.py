@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime, date
 
 from sqlalchemy import (
-    create_engine, Column, String, Boolean, DateTime, ForeignKey, Integer, Float, Date, Table
+    create_engine, Column, String, Boolean, DateTime, ForeignKey, Integer, Float, Date, Table, Index, JSON
 )
 from sqlalchemy.orm import declarative_base, relationship, sessionmaker
 
@@ -77,6 +77,11 @@ class Patient(Base):
     sessions = relationship("Session", back_populates="patient")
     organization = relationship("Organization", back_populates="patients")
 
+    __table_args__ = (
+        # Постраничная выдача списка пациентов организации, отсортированного по ФИО
+        Index("ix_patients_organization_id_full_name", "organization_id", "full_name"),
+    )
+
 class Device(Base):
     __tablename__ = 'devices'
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -117,6 +122,11 @@ class Session(Base):
     photos_downloaded = Column(Boolean, default=False)
     operator_id = Column(String(36), ForeignKey('users.id'), nullable=False)
     notes = Column(String)
+    # Область интереса (ROI) в пикселях исходных снимков; если не задана — обрабатывается весь кадр
+    roi_x = Column(Integer, nullable=True)
+    roi_y = Column(Integer, nullable=True)
+    roi_width = Column(Integer, nullable=True)
+    roi_height = Column(Integer, nullable=True)
 
     patient = relationship("Patient", back_populates="sessions")
     device_binding = relationship("DeviceBinding", back_populates="sessions")
@@ -125,6 +135,13 @@ class Session(Base):
     reconstructed_images = relationship("ReconstructedImage", back_populates="session", cascade="all, delete-orphan")
     result = relationship("Result", back_populates="session", uselist=False, single_parent=True, cascade="all, delete-orphan")
 
+    @property
+    def roi(self):
+        """ ROI (x, y, ширина, высота) или None """
+        if None in (self.roi_x, self.roi_y, self.roi_width, self.roi_height):
+            return None
+        return self.roi_x, self.roi_y, self.roi_width, self.roi_height
+
 class RawImage(Base):
     __tablename__ = 'raw_images'
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -163,6 +180,11 @@ class OverlapCoefficient(Base):
     spectrum = relationship("Spectrum", back_populates="overlaps")
     chromophore = relationship("Chromophore", back_populates="overlaps")
 
+    __table_args__ = (
+        # Одна ячейка матрицы на пару спектр-хромофор; ключ для пакетного upsert
+        Index("uq_overlap_coefficients_spectrum_chromophore", "spectrum_id", "chromophore_id", unique=True),
+    )
+
 class Result(Base):
     __tablename__ = 'results'
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -174,6 +196,7 @@ class Result(Base):
     mean_skin_thb = Column(Float, nullable=False)
     segmentation_otsu_threshold = Column(Float, nullable=True)  # Фактическое пороговое значение, использованное для сегментации Отсу
     segmentation_gaussian_sigma = Column(Float, nullable=True)  # Значение sigma, использованное для Гауссова размытия перед сегментацией
+    registration_shifts = Column(JSON, nullable=True)  # Сдвиги каналов при совмещении: [{"wavelength", "dy", "dx"}] в пикселях
     notes = Column(String)
 
     session = relationship("Session", back_populates="result")
@@ -0,0 +1,30 @@
+import logging
+
+from sqlalchemy import inspect, text
+
+from db.models import Base
+
+logger = logging.getLogger(__name__)
+
+"""
+Досоздание столбцов, добавленных в модели после создания БД.
+create_all создаёт только отсутствующие таблицы, поэтому новые столбцы существующих
+таблиц добавляются через ALTER TABLE ... ADD COLUMN. Добавляются только столбцы,
+допускающие NULL: у старых строк значения нет.
+"""
+
+
+def add_missing_columns(engine):
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+                logger.info(f"Добавлен столбец {table.name}.{column.name}")
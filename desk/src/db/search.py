@@ -0,0 +1,148 @@
+import logging
+from collections import namedtuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from db.models import Patient
+
+logger = logging.getLogger(__name__)
+
+"""
+Поиск, сортировка и постраничная выборка пациентов силами SQLite.
+Для поиска по ФИО и заметкам используется полнотекстовый индекс FTS5 (таблица patients_fts),
+который поддерживается в актуальном состоянии триггерами. Индекс хранит собственную копию
+текста и связан с пациентами по id (неявный rowid таблицы patients меняется при VACUUM).
+Если SQLite собран без FTS5, поиск выполняется через LIKE.
+"""
+
+PatientRow = namedtuple("PatientRow", ["id", "full_name", "birth_date", "notes"])
+
+FTS_TABLE = "patients_fts"
+
+# Сортируемые столбцы списка пациентов (номер столбца модели => колонка БД)
+SORT_COLUMNS = {
+    0: Patient.full_name,
+    1: Patient.birth_date,
+    2: Patient.notes,
+}
+
+FTS_TRIGGERS = ("patients_fts_ai", "patients_fts_ad", "patients_fts_au")
+
+_FTS_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        id UNINDEXED, full_name, notes,
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS patients_fts_ai AFTER INSERT ON patients BEGIN
+        INSERT INTO {FTS_TABLE}(id, full_name, notes) VALUES (new.id, new.full_name, new.notes);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS patients_fts_ad AFTER DELETE ON patients BEGIN
+        DELETE FROM {FTS_TABLE} WHERE id = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS patients_fts_au AFTER UPDATE OF id, full_name, notes ON patients BEGIN
+        UPDATE {FTS_TABLE} SET id = new.id, full_name = new.full_name, notes = new.notes WHERE id = old.id;
+    END
+    """,
+]
+
+_fts_engines = set()
+
+
+def init_patient_search(engine):
+    """
+    Создаёт индексы списка пациентов и полнотекстовый индекс patients_fts (если его ещё нет).
+    При первом создании индекс заполняется существующими записями. Индекс прежнего формата
+    (external content по rowid таблицы patients) пересоздаётся.
+    Возвращает True, если FTS5 доступен.
+    """
+    for index in Patient.__table__.indexes:
+        index.create(engine, checkfirst=True)
+
+    with engine.begin() as conn:
+        ddl = conn.execute(
+            text("SELECT sql FROM sqlite_master WHERE type='table' AND name=:name"),
+            {"name": FTS_TABLE},
+        ).scalar()
+        existed = ddl is not None
+        if existed and "content_rowid" in ddl:
+            for trigger in FTS_TRIGGERS:
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+            conn.execute(text(f"DROP TABLE {FTS_TABLE}"))
+            existed = False
+        try:
+            for ddl in _FTS_DDL:
+                conn.execute(text(ddl))
+        except OperationalError as e:
+            logger.warning(f"FTS5 недоступен, поиск пациентов будет выполняться через LIKE: {e}")
+            _fts_engines.discard(engine)
+            return False
+        if not existed:
+            conn.execute(text(
+                f"INSERT INTO {FTS_TABLE}(id, full_name, notes) SELECT id, full_name, notes FROM patients"
+            ))
+    _fts_engines.add(engine)
+    return True
+
+
+def has_fts(session):
+    return session.get_bind() in _fts_engines
+
+
+def make_match_query(search):
+    """
+    Превращает строку поиска в запрос FTS5: каждое слово ищется по префиксу,
+    все слова должны встретиться (например, «иван пет» => "иван"* "пет"*).
+    """
+    terms = [t.replace('"', '""') for t in search.split()]
+    return " ".join(f'"{t}"*' for t in terms if t)
+
+
+def _filtered_query(session, columns, organization_id=None, search=""):
+    query = session.query(*columns)
+    if organization_id:
+        query = query.filter(Patient.organization_id == organization_id)
+    search = (search or "").strip()
+    if search:
+        if has_fts(session):
+            query = query.filter(text(
+                f"patients.id IN (SELECT id FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match)"
+            )).params(match=make_match_query(search))
+        else:
+            pattern = f"%{search}%"
+            query = query.filter(Patient.full_name.ilike(pattern) | Patient.notes.ilike(pattern))
+    return query
+
+
+def count_patients(session, organization_id=None, search=""):
+    """
+    Количество пациентов, подходящих под фильтр.
+    """
+    return _filtered_query(session, [Patient.id], organization_id, search).count()
+
+
+def fetch_patients(session, organization_id=None, search="", sort_column=0, descending=False,
+                   offset=0, limit=None):
+    """
+    Возвращает страницу пациентов (список PatientRow), отсортированную на стороне БД.
+    Для устойчивого порядка между страницами добавляется сортировка по id.
+    """
+    column = SORT_COLUMNS.get(sort_column, Patient.full_name)
+    query = _filtered_query(
+        session,
+        [Patient.id, Patient.full_name, Patient.birth_date, Patient.notes],
+        organization_id, search,
+    )
+    query = query.order_by(column.desc() if descending else column.asc(), Patient.id)
+    if offset:
+        query = query.offset(offset)
+    if limit is not None:
+        query = query.limit(limit)
+    return [PatientRow(*row) for row in query.all()]
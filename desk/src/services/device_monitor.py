@@ -0,0 +1,242 @@
+import json
+import random
+import logging
+import time
+
+from PyQt6.QtCore import QObject, QTimer, QUrl, QUrlQuery, pyqtSignal
+from PyQt6.QtNetwork import QNetworkAccessManager, QNetworkRequest, QNetworkReply
+
+logger = logging.getLogger(__name__)
+
+DEVICE_PORT = 8080
+ONLINE_CHECK_INTERVAL = 3.0     # Период проверки доступного устройства, сек
+OFFLINE_BACKOFF_BASE = 3.0      # Первая пауза после неудачной проверки, сек
+OFFLINE_BACKOFF_MAX = 60.0      # Максимальная пауза для недоступного устройства, сек
+BACKOFF_JITTER = 0.2            # Разброс паузы ±20%, чтобы проверки не шли одной пачкой
+PROBE_TIMEOUT_MS = 2000
+HEARTBEAT_TIMEOUT = 25          # Время ожидания long-poll /events на устройстве, сек
+SCHEDULER_TICK_MS = 500
+
+ONLINE = "online"
+OFFLINE = "offline"
+
+
+class DeviceState:
+    """
+    Последнее известное состояние устройства и расписание его проверок.
+    """
+    def __init__(self):
+        self.status = None          # None (ещё не проверялось), ONLINE или OFFLINE
+        self.last_seen = None       # time.time() последнего успешного ответа
+        self.failures = 0
+        self.next_check = 0.0       # time.monotonic() следующей проверки
+        self.watchers = 0
+        self.probe = None           # QNetworkReply текущей HEAD-проверки
+        self.heartbeat = None       # QNetworkReply текущего long-poll /events
+        self.heartbeat_watchers = 0
+        self.cursor = None          # Курсор событий устройства
+        self.heartbeat_supported = True  # False — прошивка устройства без /events
+
+    @property
+    def wants_heartbeat(self):
+        return self.heartbeat_watchers > 0 and self.heartbeat_supported
+
+
+class DeviceMonitor(QObject):
+    """
+    Общий для всего приложения монитор доступности устройств.
+    Один QNetworkAccessManager и один таймер на все устройства; состояние кешируется
+    и раздаётся всем окнам сигналом status_changed. Недоступные устройства проверяются
+    с экспоненциально растущей паузой со случайным разбросом.
+    Для устройств с подпиской на события (watch(..., heartbeat=True)) вместо HEAD-проверок
+    держится long-poll запрос /events: ответ одновременно подтверждает, что устройство на связи,
+    и доставляет изменения задач (сигнал events_received).
+    """
+    status_changed = pyqtSignal(str, str)       # ip, ONLINE/OFFLINE
+    events_received = pyqtSignal(str, object)   # ip, ответ /events (задачи, изменённые после курсора)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.manager = QNetworkAccessManager(self)
+        self.devices = {}   # ip => DeviceState
+        self.timer = QTimer(self)
+        self.timer.setInterval(SCHEDULER_TICK_MS)
+        self.timer.timeout.connect(self._tick)
+
+    # --- Публичный интерфейс ---
+
+    def watch(self, ip, heartbeat=False):
+        """
+        Начать отслеживание устройства (с подсчётом ссылок: каждому watch — свой unwatch).
+        Если состояние уже известно, подписчик получит его сразу через status().
+        """
+        if not ip:
+            return
+        state = self.devices.setdefault(ip, DeviceState())
+        state.watchers += 1
+        if heartbeat:
+            state.heartbeat_watchers += 1
+        if not self.timer.isActive():
+            self.timer.start()
+        self._tick()
+
+    def unwatch(self, ip, heartbeat=False):
+        state = self.devices.get(ip)
+        if state is None:
+            return
+        state.watchers -= 1
+        if heartbeat:
+            state.heartbeat_watchers = max(0, state.heartbeat_watchers - 1)
+            if state.heartbeat_watchers == 0:
+                self._abort(state, "heartbeat")
+        if state.watchers <= 0:
+            # Кешированное состояние оставляем: следующее окно покажет его сразу
+            state.watchers = 0
+            self._abort(state, "probe")
+            self._abort(state, "heartbeat")
+        if not any(s.watchers for s in self.devices.values()):
+            self.timer.stop()
+
+    def status(self, ip):
+        state = self.devices.get(ip)
+        return state.status if state else None
+
+    def last_seen(self, ip):
+        state = self.devices.get(ip)
+        return state.last_seen if state else None
+
+    def check_now(self, ip):
+        """ Внеочередная проверка (например, после изменения IP) """
+        state = self.devices.get(ip)
+        if state is None:
+            return
+        state.next_check = 0.0
+        self._tick()
+
+    # --- Планировщик ---
+
+    def _tick(self):
+        now = time.monotonic()
+        for ip, state in self.devices.items():
+            if not state.watchers:
+                continue
+            if state.wants_heartbeat and state.status == ONLINE:
+                if state.heartbeat is None:
+                    self._start_heartbeat(ip, state)
+                continue
+            if state.probe is None and state.heartbeat is None and now >= state.next_check:
+                self._start_probe(ip, state)
+
+    def _schedule(self, state, ok):
+        if ok:
+            state.failures = 0
+            delay = ONLINE_CHECK_INTERVAL
+        else:
+            state.failures += 1
+            delay = min(OFFLINE_BACKOFF_BASE * 2 ** (state.failures - 1), OFFLINE_BACKOFF_MAX)
+        delay *= random.uniform(1 - BACKOFF_JITTER, 1 + BACKOFF_JITTER)
+        state.next_check = time.monotonic() + delay
+
+    def _set_status(self, ip, state, status):
+        if status == ONLINE:
+            state.last_seen = time.time()
+        if state.status != status:
+            state.status = status
+            logger.debug(f"DeviceMonitor: {ip} -> {status}")
+            self.status_changed.emit(ip, status)
+
+    def _abort(self, state, attr):
+        reply = getattr(state, attr)
+        setattr(state, attr, None)
+        if reply is not None:
+            reply.abort()
+            reply.deleteLater()
+
+    # --- HEAD-проверка ---
+
+    def _start_probe(self, ip, state):
+        request = QNetworkRequest(QUrl(f"http://{ip}:{DEVICE_PORT}/"))
+        request.setTransferTimeout(PROBE_TIMEOUT_MS)
+        reply = self.manager.head(request)
+        state.probe = reply
+        reply.finished.connect(lambda: self._on_probe_finished(ip, reply))
+
+    def _on_probe_finished(self, ip, reply):
+        state = self.devices.get(ip)
+        if state is None or state.probe is not reply:
+            # Запрос был отменён (abort) — ответ уже не нужен
+            return
+        state.probe = None
+        code = reply.attribute(QNetworkRequest.Attribute.HttpStatusCodeAttribute)
+        ok = reply.error() == QNetworkReply.NetworkError.NoError and code is not None and code < 500
+        if not ok:
+            logger.debug(f"DeviceMonitor: {ip} недоступно: {reply.errorString()}")
+        reply.deleteLater()
+        self._schedule(state, ok)
+        self._set_status(ip, state, ONLINE if ok else OFFLINE)
+        if ok and state.wants_heartbeat:
+            self._start_heartbeat(ip, state)
+
+    # --- Подписка на события устройства (long-poll /events) ---
+
+    def _start_heartbeat(self, ip, state):
+        url = QUrl(f"http://{ip}:{DEVICE_PORT}/events")
+        query = QUrlQuery()
+        query.addQueryItem("timeout", str(HEARTBEAT_TIMEOUT))
+        if state.cursor:
+            query.addQueryItem("cursor", state.cursor)
+        url.setQuery(query)
+        request = QNetworkRequest(url)
+        request.setTransferTimeout((HEARTBEAT_TIMEOUT + 5) * 1000)
+        reply = self.manager.get(request)
+        state.heartbeat = reply
+        reply.finished.connect(lambda: self._on_heartbeat_finished(ip, reply))
+
+    def _on_heartbeat_finished(self, ip, reply):
+        state = self.devices.get(ip)
+        if state is None or state.heartbeat is not reply:
+            return
+        state.heartbeat = None
+        code = reply.attribute(QNetworkRequest.Attribute.HttpStatusCodeAttribute)
+        data = None
+        if reply.error() == QNetworkReply.NetworkError.NoError and code == 200:
+            try:
+                data = json.loads(bytes(reply.readAll()).decode("utf-8"))
+            except ValueError as e:
+                logger.warning(f"DeviceMonitor: некорректный ответ /events от {ip}: {e}")
+        reply.deleteLater()
+
+        if code == 404:
+            # Старая прошивка без /events: устройство на связи, проверяем его HEAD-запросами
+            logger.info(f"DeviceMonitor: {ip} не поддерживает /events, используется опрос")
+            state.heartbeat_supported = False
+            self._schedule(state, True)
+            self._set_status(ip, state, ONLINE)
+            return
+
+        if data is None:
+            # Устройство без /events или связь потеряна — возвращаемся к HEAD-проверкам
+            self._schedule(state, False)
+            self._set_status(ip, state, OFFLINE)
+            return
+
+        self._schedule(state, True)
+        self._set_status(ip, state, ONLINE)
+        state.cursor = data.get("cursor") or state.cursor
+        if data.get("tasks"):
+            self.events_received.emit(ip, data)
+        if state.wants_heartbeat:
+            self._start_heartbeat(ip, state)
+
+
+_monitor = None
+
+
+def get_device_monitor():
+    """
+    Возвращает общий экземпляр монитора устройств (создаётся при первом обращении).
+    """
+    global _monitor
+    if _monitor is None:
+        _monitor = DeviceMonitor()
+    return _monitor
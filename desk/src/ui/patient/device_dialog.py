@@ -3,19 +3,19 @@ from PyQt6.QtWidgets import (
     QVBoxLayout, QHBoxLayout, QPushButton, QTableWidget, QTableWidgetItem,
     QDialog, QComboBox, QMessageBox, QHeaderView
 )
-from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtCore import Qt
 
 from db.db import get_db_session
 from db.models import Device, DeviceBinding
-from ui.patient.device_worker import DeviceStatusWorker
+from services.device_monitor import get_device_monitor, ONLINE, OFFLINE
 
 class DeviceBindingDialog(QDialog):
     """
     Диалог для управления списком устройств пользователя:
     позволяет добавлять, удалять устройства и отслеживать их статус через сеть.
-    Статус проверяется асинхронно без потоков (QThread), только с QTimer и DeviceStatusWorker.
+    Статус берётся из общего монитора устройств (DeviceMonitor): он сам планирует проверки
+    и сообщает об изменениях сигналом, последнее известное состояние показывается сразу.
     """
-    STATUS_CHECK_INTERVAL = 3000  # Интервал проверки статуса устройств в мс
 
     def __init__(self, user, parent=None):
         """
@@ -70,17 +70,17 @@ class DeviceBindingDialog(QDialog):
         self.devices = []
         self.bindings = []
         self._adding_row = False
-        self.status_timers = dict()     # row => QTimer
-        self.status_workers = dict()    # row => DeviceStatusWorker
+        self.watched_ips = []           # IP, на которые подписан диалог (по одному на строку)
+        self.monitor = get_device_monitor()
+        self.monitor.status_changed.connect(self.on_device_status_changed)
 
         self.reload()
 
     def reload(self):
         """
-        Загрузка устройств и связей пользователя, пересоздание таблицы и таймеров статуса.
+        Загрузка устройств и связей пользователя, пересоздание таблицы и подписок на статус.
         """
-        self._stop_all_timers()
-        self._abort_all_workers()
+        self._unwatch_all()
         self.table.blockSignals(True)
         with get_db_session() as session:
             self.devices = session.query(Device).all()
@@ -103,11 +103,11 @@ class DeviceBindingDialog(QDialog):
             ip_item.setFlags(ip_item.flags() | Qt.ItemFlag.ItemIsEditable)
             self.table.setItem(row, 1, ip_item)
 
-            status_item = QTableWidgetItem("⏳")
+            status_item = QTableWidgetItem(self.status_icon(b.ip_address))
             status_item.setFlags(status_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
             self.table.setItem(row, 2, status_item)
 
-            self._setup_status_timer(b.ip_address, row)
+            self._watch(b.ip_address)
 
         self.table.blockSignals(False)
         self._adding_row = False
@@ -118,61 +118,39 @@ class DeviceBindingDialog(QDialog):
         self.del_btn.setVisible(True)
         self.update_del_btn()
 
-    def _setup_status_timer(self, ip, row):
-        """
-        Настроить таймер для периодической проверки статуса устройства по IP.
-        """
-        def check():
-            self.check_device_status_async(ip, row)
-        timer = QTimer(self)
-        timer.setInterval(self.STATUS_CHECK_INTERVAL)
-        timer.timeout.connect(check)
-        timer.start()
-        self.status_timers[row] = timer
-        check()  # Первая проверка сразу
-
-    def _stop_all_timers(self):
-        """Остановить и удалить все таймеры статуса."""
-        for t in self.status_timers.values():
-            t.stop()
-            t.deleteLater()
-        self.status_timers.clear()
-
-    def _abort_all_workers(self):
-        """Прервать все активные DeviceStatusWorker'ы."""
-        for w in self.status_workers.values():
-            w.abort()
-            w.deleteLater()
-        self.status_workers.clear()
-
-    def check_device_status_async(self, ip, row):
+    def status_icon(self, ip):
+        """Значок статуса по последнему известному состоянию устройства."""
+        if not ip:
+            return "—"
+        status = self.monitor.status(ip)
+        if status == ONLINE:
+            return "🟢"
+        if status == OFFLINE:
+            return "🔴"
+        return "⏳"
+
+    def _watch(self, ip):
+        if ip:
+            self.monitor.watch(ip)
+            self.watched_ips.append(ip)
+
+    def _unwatch_all(self):
+        """Отписаться от статусов всех устройств диалога."""
+        for ip in self.watched_ips:
+            self.monitor.unwatch(ip)
+        self.watched_ips.clear()
+
+    def on_device_status_changed(self, ip, status):
         """
-        Асинхронно проверить статус устройства по IP для строки row.
-        Запускается при старте таймера и при редактировании IP.
+        Слот монитора устройств: обновить значок во всех строках с этим IP.
         """
-        if not ip:
-            self.table.setItem(row, 2, QTableWidgetItem("—"))
-            return
-
-        # Если уже есть worker — отменяем предыдущий
-        if row in self.status_workers:
-            self.status_workers[row].abort()
-            self.status_workers[row].deleteLater()
-
-        worker = DeviceStatusWorker()
-        self.status_workers[row] = worker
-
-        def update_status(ip_checked, status):
-            # Установить статус 🟢/🔴 в нужной строке
-            item = self.table.item(row, 2)
-            if item:
-                item.setText("🟢" if status == 'online' else "🔴")
-            worker.deleteLater()
-            self.status_workers.pop(row, None)
-
-        worker.finished.connect(update_status)
-        worker.error.connect(lambda ip, msg: update_status(ip, 'offline'))
-        worker.check(ip)  # Асинхронно (без потоков!)
+        for row, b in enumerate(self.bindings):
+            item = self.table.item(row, 1)
+            row_ip = item.text().strip() if item else b.ip_address
+            if row_ip == ip:
+                status_item = self.table.item(row, 2)
+                if status_item:
+                    status_item.setText(self.status_icon(ip))
 
     def add_row(self):
         """
@@ -263,12 +241,18 @@ class DeviceBindingDialog(QDialog):
                 if db_binding and new_ip != db_binding.ip_address:
                     db_binding.ip_address = new_ip
                     session.commit()
-            # Перезапустить таймер проверки статуса
-            if row in self.status_timers:
-                self.status_timers[row].stop()
-                self.status_timers[row].start()
-            self.table.setItem(row, 2, QTableWidgetItem("⏳"))
-            self.check_device_status_async(new_ip, row)
+            # Переподписаться на статус по новому IP и проверить его без ожидания
+            old_ip = binding.ip_address
+            if old_ip != new_ip:
+                if old_ip in self.watched_ips:
+                    self.watched_ips.remove(old_ip)
+                    self.monitor.unwatch(old_ip)
+                binding.ip_address = new_ip
+                self._watch(new_ip)
+            self.table.blockSignals(True)
+            self.table.setItem(row, 2, QTableWidgetItem(self.status_icon(new_ip)))
+            self.table.blockSignals(False)
+            self.monitor.check_now(new_ip)
 
     def on_selection_change(self, selected, deselected):
         """Обновить состояние кнопки удаления при смене выбора."""
@@ -309,8 +293,12 @@ class DeviceBindingDialog(QDialog):
 
     def closeEvent(self, event):
         """
-        При закрытии окна: остановить все таймеры и отменить все проверки.
+        При закрытии окна: отписаться от статусов устройств.
         """
-        self._stop_all_timers()
-        self._abort_all_workers()
+        self._unwatch_all()
         super().closeEvent(event)
+
+    def done(self, result):
+        """Закрытие через accept/reject (Esc) не вызывает closeEvent — отписываемся и здесь."""
+        self._unwatch_all()
+        super().done(result)
@@ -0,0 +1,119 @@
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+from db.db import get_db_session
+from db.search import count_patients, fetch_patients
+
+PAGE_SIZE = 200
+
+
+class PatientTableModel(QAbstractTableModel):
+    """
+    Модель списка пациентов для QTableView.
+    Фильтрация и сортировка выполняются запросом к SQLite, строки подгружаются
+    страницами по PAGE_SIZE по мере прокрутки (canFetchMore/fetchMore).
+    """
+    HEADERS = ["ФИО", "Дата рождения", "Заметки"]
+
+    def __init__(self, organization_id=None, parent=None):
+        super().__init__(parent)
+        self.organization_id = organization_id
+        self.search = ""
+        self.sort_column = 0
+        self.descending = False
+        self.rows = []      # Загруженные PatientRow
+        self.total = 0      # Всего строк под текущим фильтром
+
+    # --- Управление выборкой ---
+
+    def set_filter(self, text):
+        """
+        Меняет строку поиска. Возвращает True, если список был перечитан.
+        """
+        text = (text or "").strip()
+        if text == self.search:
+            return False
+        self.search = text
+        self.reload()
+        return True
+
+    def reload(self):
+        """
+        Перечитывает первую страницу под текущими фильтром и сортировкой.
+        """
+        self.beginResetModel()
+        with get_db_session() as session:
+            self.total = count_patients(session, self.organization_id, self.search)
+            self.rows = fetch_patients(
+                session, self.organization_id, self.search,
+                self.sort_column, self.descending, offset=0, limit=PAGE_SIZE,
+            )
+        self.endResetModel()
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return len(self.rows) < self.total
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        with get_db_session() as session:
+            page = fetch_patients(
+                session, self.organization_id, self.search,
+                self.sort_column, self.descending, offset=len(self.rows), limit=PAGE_SIZE,
+            )
+        if not page:
+            # Записи удалены в другом окне — больше подгружать нечего
+            self.total = len(self.rows)
+            return
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+        self.rows.extend(page)
+        self.endInsertRows()
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self.sort_column = column
+        self.descending = order == Qt.SortOrder.DescendingOrder
+        self.reload()
+
+    # --- Доступ к строкам ---
+
+    def patient_at(self, row):
+        if 0 <= row < len(self.rows):
+            return self.rows[row]
+        return None
+
+    def row_of(self, patient_id):
+        """
+        Номер строки пациента среди загруженных или -1.
+        """
+        for i, p in enumerate(self.rows):
+            if p.id == patient_id:
+                return i
+        return -1
+
+    # --- QAbstractTableModel ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole):
+            return None
+        p = self.rows[index.row()]
+        column = index.column()
+        if column == 0:
+            return p.full_name
+        if column == 1:
+            return p.birth_date.strftime('%d.%m.%Y') if p.birth_date else "—"
+        if column == 2:
+            return p.notes or ""
+        return None
@@ -2,13 +2,15 @@ import os
 import shutil
 
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLineEdit, QTableWidget,
-    QTableWidgetItem, QMessageBox, QHeaderView, QLabel, QDialog, QApplication
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLineEdit, QTableView,
+    QMessageBox, QHeaderView, QLabel, QDialog, QApplication
 )
-from PyQt6.QtCore import pyqtSignal
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
 from sqlalchemy.orm import joinedload
 
 from ui.patient.patient_dialog import PatientDialog
+from ui.patient.patient_model import PatientTableModel
+from ui.patient.session_model import SessionTableModel
 from ui.patient.session_dialog import SessionDialog
 from ui.session.session_widget import SessionWidget
 from ui.setting.setting_widget import SettingWidget
@@ -18,7 +20,9 @@ from ui.user.create_user_widget import CreateUserDialog
 from services.device_api import create_device_task
 
 from db.db import get_db_session
-from db.models import Patient, Session, DeviceBinding
+from db.models import Patient, Session
+
+SEARCH_DEBOUNCE_MS = 300  # Пауза после ввода в строке поиска перед запросом к БД
 
 
 class PatientsWidget(QWidget):
@@ -47,22 +51,29 @@ class PatientsWidget(QWidget):
         # Фильтр по ФИО
         filter_row = QHBoxLayout()
         self.search_edit = QLineEdit()
-        self.search_edit.setPlaceholderText("Поиск по ФИО...")
+        self.search_edit.setPlaceholderText("Поиск по ФИО и заметкам...")
         filter_row.addWidget(QLabel("Пациенты"))
         filter_row.addWidget(self.search_edit)
         left_box.addLayout(filter_row)
 
-        # Таблица пациентов
-        self.table = QTableWidget(0, 4)
-        self.table.setHorizontalHeaderLabels(["ФИО", "Дата рождения", "Заметки", "ID"])
+        # Таблица пациентов: данные, поиск и сортировка — на стороне БД (PatientTableModel)
+        self.patients_model = PatientTableModel(self.user.organization_id if self.user else None, self)
+        self.table = QTableView()
+        self.table.setModel(self.patients_model)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QTableView.SelectionMode.SingleSelection)
+        self.table.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
         self.table.setAlternatingRowColors(True)
         self.table.verticalHeader().setVisible(False)
-        self.table.setSortingEnabled(True)
         left_box.addWidget(self.table)
 
+        # Отложенный поиск: запрос уходит, когда пользователь перестал печатать
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.apply_filter)
+
         # Кнопки управления пациентами
         btn_row = QHBoxLayout()
         self.add_btn = QPushButton("Добавить")
@@ -86,11 +97,14 @@ class PatientsWidget(QWidget):
         self.sessions_label = QLabel("Сеансы пациента:")
         right_box.addWidget(self.sessions_label)
 
-        self.sessions_table = QTableWidget(0, 2)
-        self.sessions_table.setHorizontalHeaderLabels(["Дата", "Заметки"])
+        # Сеансы кешируются моделью по пациенту: повторный выбор пациента не обращается к БД
+        self.sessions_model = SessionTableModel(self)
+        self.sessions_table = QTableView()
+        self.sessions_table.setModel(self.sessions_model)
         self.sessions_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.sessions_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.sessions_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.sessions_table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.sessions_table.setSelectionMode(QTableView.SelectionMode.SingleSelection)
+        self.sessions_table.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
         self.sessions_table.setAlternatingRowColors(True)
         self.sessions_table.verticalHeader().setVisible(False)
         right_box.addWidget(self.sessions_table)
@@ -139,9 +153,9 @@ class PatientsWidget(QWidget):
         self.del_btn.clicked.connect(self.delete_patient)
         self.settings_btn.clicked.connect(self.open_settings)
         self.search_edit.textChanged.connect(self.filter_table)
-        self.table.cellDoubleClicked.connect(self.edit_patient)
+        self.table.doubleClicked.connect(self.edit_patient)
         self.table.selectionModel().selectionChanged.connect(self.on_patient_selected)
-        self.sessions_table.cellDoubleClicked.connect(self.open_session)
+        self.sessions_table.doubleClicked.connect(self.open_session)
         self.open_session_btn.clicked.connect(self.open_session)
         self.add_session_btn.clicked.connect(self.add_session)
         self.delete_session_btn.clicked.connect(self.delete_session)
@@ -153,11 +167,10 @@ class PatientsWidget(QWidget):
         self.logout_btn.clicked.connect(self.logout_clicked)
         self.close_btn.clicked.connect(QApplication.quit)
 
-        # Загрузка данных
-        self.reload()
-        if self.table.rowCount() > 0:
-            self.table.selectRow(0)
-            self.on_patient_selected()
+        # Загрузка данных: включение сортировки сразу запрашивает первую страницу (model.sort)
+        self.table.horizontalHeader().setSortIndicator(0, Qt.SortOrder.AscendingOrder)
+        self.table.setSortingEnabled(True)
+        self.select_patient()
 
     # ===== МЕТОДЫ =====
 
@@ -200,55 +213,39 @@ class PatientsWidget(QWidget):
 
     # ==== Работа с пациентами ====
 
-    def reload(self):
+    def reload(self, selected_patient_id=None):
         """
-        Перечитывает список пациентов из БД.
+        Перечитывает список пациентов из БД (первую страницу под текущими фильтром и сортировкой).
         С учетом организации пользователя, если задано.
+        Если передан selected_patient_id — выделяет этого пациента, иначе первую строку.
         """
-        with get_db_session() as session:
-            if self.user and self.user.organization_id:
-                self.patients = session.query(Patient).filter_by(organization_id=self.user.organization_id).all()
-            else:
-                self.patients = session.query(Patient).all()
-        self.show_patients(self.patients)
-
-    def show_patients(self, patients):
-        """
-        Заполняет таблицу на основе списка пациентов.
-
-        :param patients: список экземпляров Patient
-        """
-        self.table.setSortingEnabled(False)
-        self.table.setRowCount(0)
-        for p in patients:
-            self.table.insertRow(self.table.rowCount())
-            row = self.table.rowCount() - 1
-            self.table.setItem(row, 0, QTableWidgetItem(p.full_name))
-            bdate_str = p.birth_date.strftime('%d.%m.%Y') if p.birth_date else "—"
-            self.table.setItem(row, 1, QTableWidgetItem(bdate_str))
-            self.table.setItem(row, 2, QTableWidgetItem(p.notes or ""))
-            self.table.setItem(row, 3, QTableWidgetItem(str(p.id)))
-        self.table.resizeRowsToContents()
-        self.table.setColumnHidden(3, True)  # Скрываем столбец ID
-        if self.table.rowCount() > 0:
-            self.table.selectRow(0)
-        self.table.setSortingEnabled(True)
+        self.patients_model.reload()
+        self.select_patient(selected_patient_id)
+
+    def select_patient(self, patient_id=None):
+        """
+        Выделяет строку пациента по ID (если он загружен) или первую строку.
+        Сброс модели снимает выделение без сигнала, поэтому при пустом списке
+        таблица сеансов очищается явно.
+        """
+        row = self.patients_model.row_of(patient_id) if patient_id else -1
+        if row < 0 and self.patients_model.rowCount() > 0:
+            row = 0
+        if row >= 0:
+            self.table.selectRow(row)
+            self.table.scrollTo(self.patients_model.index(row, 0))
+        else:
+            self.on_patient_selected()
 
     def get_selected_patient(self):
         """
-        Возвращает выбранного пациента (Patient) или None.
+        Возвращает выбранного пациента (PatientRow: id, full_name, birth_date, notes) или None.
+        Данные берутся из модели без обращения к БД.
         """
         selected_rows = self.table.selectionModel().selectedRows()
         if not selected_rows:
             return None
-        row = selected_rows[0].row()
-        id_item = self.table.item(row, 3)
-        if not id_item:
-            return None
-        patient_id = id_item.text()
-        with get_db_session() as session:
-            patient = session.query(Patient).get(patient_id)
-        return patient
+        return self.patients_model.patient_at(selected_rows[0].row())
 
     def add_patient(self):
         """
@@ -272,7 +269,8 @@ class PatientsWidget(QWidget):
                 )
                 session.add(p)
                 session.commit()
-            self.reload()
+                new_patient_id = p.id
+            self.reload(selected_patient_id=new_patient_id)
 
     def edit_patient(self):
         """
@@ -297,7 +295,9 @@ class PatientsWidget(QWidget):
                 patient.birth_date = data["birth_date"]
                 patient.notes = data["notes"]
                 session.commit()
-            self.reload()
+            # В кешированных сеансах хранятся данные пациента — перечитаем их при выборе
+            self.sessions_model.invalidate(p.id)
+            self.reload(selected_patient_id=p.id)
 
     def delete_patient(self):
         """
@@ -317,22 +317,21 @@ class PatientsWidget(QWidget):
                 patient = session.query(Patient).get(p.id)
                 session.delete(patient)
                 session.commit()
+            self.sessions_model.invalidate(p.id)
             self.reload()
-            if self.table.rowCount() > 0:
-                self.table.selectRow(0)
 
     def filter_table(self, text):
         """
-        Фильтрует пациентов по ФИО (без изменения данных в self.patients).
+        Перезапускает таймер поиска: фильтр применяется после паузы во вводе.
         """
-        filtered = []
-        t = text.strip().lower()
-        for p in self.patients:
-            if t in p.full_name.lower():
-                filtered.append(p)
-        self.show_patients(filtered)
-        if self.table.rowCount() > 0:
-            self.table.selectRow(0)
+        self.search_timer.start()
+
+    def apply_filter(self):
+        """
+        Применяет строку поиска: полнотекстовый поиск по ФИО и заметкам в SQLite.
+        """
+        if self.patients_model.set_filter(self.search_edit.text()):
+            self.select_patient()
 
     # ==== Работа с сеансами ====
 
@@ -345,83 +344,58 @@ class PatientsWidget(QWidget):
             self.reload_sessions(patient)
             self.sessions_label.setText(f"Сеансы: {patient.full_name}")
         else:
-            self.sessions_table.setRowCount(0)
+            self.sessions_model.set_patient(None)
             self.sessions_label.setText("Сеансы пациента:")
 
         self.update_session_buttons_state()
 
     def reload_sessions(self, patient, selected_session_id=None):
         """
-        Перечитывает список сеансов из БД для указанного пациента.
+        Показывает сеансы указанного пациента (из кеша модели или одним запросом к БД).
         Если передан selected_session_id — выделяет строку с этим сеансом.
         """
-        with get_db_session() as session:
-            sessions = (
-                session.query(Session)
-                .filter_by(patient_id=patient.id)
-                .order_by(Session.date.desc())
-                .all()
-            )
-        self.sessions_table.setRowCount(0)
-        for s in sessions:
-            self.sessions_table.insertRow(self.sessions_table.rowCount())
-            row = self.sessions_table.rowCount() - 1
-            dt_str = s.date.strftime('%d.%m.%Y %H:%M') if s.date else "—"
-            self.sessions_table.setItem(row, 0, QTableWidgetItem(dt_str))
-            self.sessions_table.setItem(row, 1, QTableWidgetItem(s.notes or ""))
-
-        # --- Выделяем строку по ID, если нужно ---
-        selected_row = 0
-        if selected_session_id is not None:
-            for i, s in enumerate(sessions):
-                if s.id == selected_session_id:
-                    selected_row = i
-                    break
-        if self.sessions_table.rowCount() > 0:
-            self.sessions_table.selectRow(selected_row)
+        self.sessions_model.set_patient(patient.id)
+        self.select_session(selected_session_id)
 
+    def select_session(self, session_id=None):
+        """
+        Выделяет строку сеанса по ID или первую строку.
+        """
+        row = self.sessions_model.row_of(session_id) if session_id else -1
+        if row < 0 and self.sessions_model.rowCount() > 0:
+            row = 0
+        if row >= 0:
+            self.sessions_table.selectRow(row)
         self.update_session_buttons_state()
 
     def get_selected_session(self):
         """
         Возвращает выбранный сеанс (Session) для текущего пациента.
+        Сеанс берётся из модели вместе с пациентом, устройством, оператором и результатом.
         """
-        patient = self.get_selected_patient()
-        if not patient:
-            return None
         selected = self.sessions_table.selectionModel().selectedRows()
         if not selected:
             return None
-        row = selected[0].row()
-        with get_db_session() as session:
-            sessions = (
-                session.query(Session)
-                .options(
-                    joinedload(Session.patient),
-                    joinedload(Session.device_binding).joinedload(DeviceBinding.device),
-                    joinedload(Session.operator),
-                    joinedload(Session.result),
-                )
-                .filter_by(patient_id=patient.id)
-                .order_by(Session.date.desc())
-                .all()
-            )
-        if row >= len(sessions):
-            return None
-        return sessions[row]
+        return self.sessions_model.session_at(selected[0].row())
 
     def open_session(self):
         """
         Открывает окно просмотра выбранного сеанса.
-        Передаёт в SessionWidget объект сеанса и API-URL устройства.
+        Сеанс перечитывается из БД (в кеше списка могли остаться устаревшие результат и статус),
+        а изменения, сделанные в окне сеанса, возвращаются в список.
         """
         s = self.get_selected_session()
         if not s:
             QMessageBox.warning(self, "Ошибка", "Выберите сеанс для открытия.")
             return
+        s = self.sessions_model.reload_session(s.id)
+        if s is None:
+            QMessageBox.warning(self, "Ошибка", "Сеанс не найден.")
+            return
 
         # Создаём и показываем окно SessionWidget
         self.session_widget = SessionWidget(session=s)
+        self.session_widget.session_changed.connect(self.sessions_model.reload_session)
         self.session_widget.show()
 
     def add_session(self):
@@ -481,7 +455,8 @@ class PatientsWidget(QWidget):
                 session.commit()
                 new_session_id = new_session.id
 
-            self.reload_sessions(patient, selected_session_id=new_session_id)
+            self.sessions_model.add_session(new_session_id)
+            self.select_session(new_session_id)
 
             self.open_session()
 
@@ -552,9 +527,8 @@ class PatientsWidget(QWidget):
                 session.delete(sess)
                 session.commit()
 
-            self.reload_sessions(patient)
-            if self.sessions_table.rowCount() > 0:
-                self.sessions_table.selectRow(0)
+            self.sessions_model.remove_session(s.id)
+            self.select_session()
 
     def update_session_buttons_state(self):
         """
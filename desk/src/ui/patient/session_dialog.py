@@ -1,11 +1,11 @@
 import logging
 from PyQt6.QtWidgets import QDialog, QFormLayout, QDateEdit, QComboBox, QListWidget, QTextEdit, QHBoxLayout, QPushButton, QLabel
-from PyQt6.QtCore import QDate, Qt, QTimer
+from PyQt6.QtCore import QDate, Qt
 
 from sqlalchemy.orm import joinedload
 from db.db import get_db_session
 from db.models import DeviceBinding, Device
-from ui.patient.device_worker import DeviceStatusWorker
+from services.device_monitor import get_device_monitor, ONLINE
 
 logger = logging.getLogger(__name__)
 
@@ -17,17 +17,10 @@ class SessionDialog(QDialog):
         layout = QFormLayout(self)
         logger.debug("SessionDialog __init__ started")
 
-        # --- Worker для статуса устройства ---
-        self._status_worker = DeviceStatusWorker()
-        self._status_worker.finished.connect(self.on_device_status_checked)
-        self._status_worker.error.connect(self.on_device_status_error)
-
-        # --- Таймер статуса ---
-        self.status_timer = QTimer(self)
-        self.status_timer.setInterval(3000)
-        self.status_timer.timeout.connect(self.check_device_status)
-        self.status_timer.start()
-        logger.debug("Status timer started")
+        # --- Статус устройства из общего монитора ---
+        self.monitor = get_device_monitor()
+        self.monitor.status_changed.connect(self.on_device_status_checked)
+        self._watched_ip = None
 
         # --- Поля выбора ---
         self.date_edit = QDateEdit()
@@ -78,8 +71,6 @@ class SessionDialog(QDialog):
         self.save_btn.clicked.connect(self.accept)
         self.cancel_btn.clicked.connect(self.reject)
         self.device_combo.currentIndexChanged.connect(self.update_spectra_list)
-        self.device_combo.currentIndexChanged.connect(self.check_device_status)
-        self.device_combo.currentIndexChanged.connect(self.on_device_changed)
 
         self.update_spectra_list()
         logger.debug("SessionDialog __init__ finished")
@@ -108,23 +99,34 @@ class SessionDialog(QDialog):
             return
 
         ip = self.devices[idx].ip_address
-        # Прерываем старый запрос, если есть
-        self._status_worker.abort()
-        logger.debug(f"Запуск проверки устройства: {ip}")
-        self.save_btn.setEnabled(False)
-        self._status_worker.check(ip)
+        if ip != self._watched_ip:
+            # Подписываемся на статус выбранного устройства вместо предыдущего
+            self._unwatch()
+            self.monitor.watch(ip)
+            self._watched_ip = ip
+        logger.debug(f"Статус устройства {ip}: {self.monitor.status(ip)}")
+        status = self.monitor.status(ip)
+        if status is None:
+            self.device_status_icon.setText("⏳")
+            self.save_btn.setEnabled(False)
+        else:
+            self.on_device_status_checked(ip, status)
 
     def on_device_status_checked(self, ip, status):
+        if ip != self._watched_ip:
+            return
         logger.debug(f"on_device_status_checked: IP={ip}, status={status}")
-        if status == 'online':
+        if status == ONLINE:
             self.device_status_icon.setText("🟢")
             self.save_btn.setEnabled(True)
         else:
             self.device_status_icon.setText("🔴")
             self.save_btn.setEnabled(False)
 
-    def on_device_status_error(self, ip, message):
-        logger.error(f"on_device_status_error: IP={ip}, error={message}")
+    def _unwatch(self):
+        if self._watched_ip:
+            self.monitor.unwatch(self._watched_ip)
+            self._watched_ip = None
 
     def get_data(self):
         bdate = self.date_edit.date()
@@ -137,13 +139,12 @@ class SessionDialog(QDialog):
             "notes": self.notes_edit.toPlainText().strip()
         }
 
-    def on_device_changed(self):
-        self.check_device_status()
-        self.status_timer.start()
-
     def closeEvent(self, event):
         logger.debug("closeEvent called")
-        self.status_timer.stop()
-        self._status_worker.abort()
-        logger.debug("closeEvent finished")
+        self._unwatch()
         super().closeEvent(event)
+
+    def done(self, result):
+        # accept/reject не вызывают closeEvent — отписываемся от статуса и здесь
+        self._unwatch()
+        super().done(result)
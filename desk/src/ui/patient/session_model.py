@@ -0,0 +1,151 @@
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from sqlalchemy.orm import joinedload
+
+from db.db import get_db_session
+from db.models import Session, DeviceBinding
+
+
+def session_query(session):
+    """
+    Запрос сеансов со всеми связями, которые нужны окну сеанса (SessionWidget),
+    чтобы открытие сеанса не требовало повторного чтения из БД.
+    """
+    return session.query(Session).options(
+        joinedload(Session.patient),
+        joinedload(Session.device_binding).joinedload(DeviceBinding.device),
+        joinedload(Session.operator),
+        joinedload(Session.result),
+    )
+
+
+class SessionTableModel(QAbstractTableModel):
+    """
+    Модель списка сеансов выбранного пациента.
+    Сеансы каждого пациента читаются из БД один раз и кешируются по ID пациента;
+    после создания/удаления сеанса список обновляется точечно, без перечитывания.
+    Строки отсортированы по дате сеанса (новые сверху).
+    """
+    HEADERS = ["Дата", "Заметки"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.patient_id = None
+        self.rows = []      # Сеансы текущего пациента (отсоединённые от сессии БД объекты Session)
+        self._cache = {}    # patient_id => список сеансов
+
+    # --- Управление выборкой ---
+
+    def set_patient(self, patient_id):
+        """
+        Показывает сеансы пациента (None — пустой список). Из БД читаются только
+        сеансы пациента, которого ещё нет в кеше.
+        """
+        self.beginResetModel()
+        self.patient_id = patient_id
+        if patient_id is None:
+            self.rows = []
+        else:
+            if patient_id not in self._cache:
+                with get_db_session() as session:
+                    self._cache[patient_id] = (
+                        session_query(session)
+                        .filter(Session.patient_id == patient_id)
+                        .order_by(Session.date.desc())
+                        .all()
+                    )
+            self.rows = self._cache[patient_id]
+        self.endResetModel()
+
+    def invalidate(self, patient_id=None):
+        """
+        Сбрасывает кеш сеансов пациента (или всех пациентов).
+        """
+        if patient_id is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(patient_id, None)
+
+    def add_session(self, session_id):
+        """
+        Дочитывает один новый сеанс текущего пациента и вставляет его на место по дате.
+        Возвращает номер строки или -1.
+        """
+        with get_db_session() as session:
+            new = session_query(session).filter(Session.id == session_id).one_or_none()
+        if new is None or new.patient_id != self.patient_id:
+            return -1
+        row = 0
+        while row < len(self.rows) and self.rows[row].date and new.date and self.rows[row].date > new.date:
+            row += 1
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.rows.insert(row, new)
+        self.endInsertRows()
+        return row
+
+    def reload_session(self, session_id):
+        """
+        Перечитывает один сеанс из БД со всеми связями и заменяет его в кеше
+        (например, после обработки, загрузки снимков или изменения ROI).
+        Возвращает свежий объект Session или None, если сеанса больше нет.
+        """
+        with get_db_session() as session:
+            fresh = session_query(session).filter(Session.id == session_id).one_or_none()
+        if fresh is None:
+            return None
+        cached = self._cache.get(fresh.patient_id, [])
+        for i, s in enumerate(cached):
+            if s.id == session_id:
+                cached[i] = fresh
+        row = self.row_of(session_id)
+        if row >= 0:
+            self.rows[row] = fresh
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.HEADERS) - 1))
+        return fresh
+
+    def remove_session(self, session_id):
+        row = self.row_of(session_id)
+        if row < 0:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.rows[row]
+        self.endRemoveRows()
+
+    # --- Доступ к строкам ---
+
+    def session_at(self, row):
+        if 0 <= row < len(self.rows):
+            return self.rows[row]
+        return None
+
+    def session_id(self, row):
+        s = self.session_at(row)
+        return s.id if s else None
+
+    def row_of(self, session_id):
+        for i, s in enumerate(self.rows):
+            if s.id == session_id:
+                return i
+        return -1
+
+    # --- QAbstractTableModel ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole):
+            return None
+        s = self.rows[index.row()]
+        if index.column() == 0:
+            return s.date.strftime('%d.%m.%Y %H:%M') if s.date else "—"
+        if index.column() == 1:
+            return s.notes or ""
+        return None
@@ -0,0 +1,143 @@
+import os
+from collections import OrderedDict
+
+from PyQt6.QtCore import pyqtSignal, pyqtSlot, QObject, QSize, Qt
+from PyQt6.QtGui import QImage, QImageReader, QPixmap
+
+
+def preview_key(path: str, width: int, height: int):
+    """
+    Ключ кеша предпросмотра: путь, время изменения, размер файла и целевой размер.
+    Возвращает None, если файла нет
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return path, stat.st_mtime_ns, stat.st_size, width, height
+
+
+def load_scaled_image(path: str, width: int, height: int) -> QImage:
+    """
+    Декодирует изображение сразу в уменьшенном размере с сохранением пропорций.
+    QImage (в отличие от QPixmap) можно создавать вне GUI-потока
+    """
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    size = reader.size()
+    if size.isValid() and (size.width() > width or size.height() > height):
+        # Для JPEG декодер сразу читает уменьшенное изображение, полный кадр не разворачивается
+        reader.setScaledSize(size.scaled(width, height, Qt.AspectRatioMode.KeepAspectRatio))
+    image = reader.read()
+    if image.isNull():
+        return image
+    if image.width() > width or image.height() > height:
+        image = image.scaled(
+            width, height, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation
+        )
+    return image
+
+
+class PreviewCache:
+    """
+    LRU-кеш готовых для отображения QPixmap.
+    Используется только из GUI-потока
+    """
+
+    def __init__(self, capacity: int = 32):
+        self.capacity = capacity
+        self._items = OrderedDict()
+
+    def get(self, key):
+        """ Возвращает pixmap по ключу и помечает его как недавно использованный """
+        if key is None or key not in self._items:
+            return None
+        self._items.move_to_end(key)
+        return self._items[key]
+
+    def put(self, key, pixmap: QPixmap) -> None:
+        """ Добавляет pixmap, вытесняя самые давно использованные записи """
+        if key is None:
+            return
+        self._items[key] = pixmap
+        self._items.move_to_end(key)
+        while len(self._items) > self.capacity:
+            self._items.popitem(last=False)
+
+    def __contains__(self, key) -> bool:
+        return key in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+
+class PreviewLoaderWorker(QObject):
+    """
+    Воркер фонового декодирования и масштабирования снимков для предпросмотра.
+    Живёт в отдельном QThread, запросы приходят через сигнал с очередью событий
+    """
+    loaded = pyqtSignal(object, QImage)   # ключ кеша, готовое изображение (пустое — ошибка чтения)
+
+    @pyqtSlot(object)
+    def load(self, key):
+        # Ответ всегда приходит с ключом запроса: по нему PreviewLoader снимает запрос из ожидающих
+        path, _, _, width, height = key
+        if not os.path.exists(path):  # Файл удалён после запроса
+            self.loaded.emit(key, QImage())
+            return
+        self.loaded.emit(key, load_scaled_image(path, width, height))
+
+
+class PreviewLoader(QObject):
+    """
+    Связывает LRU-кеш и фоновый воркер: отдаёт готовые pixmap сразу,
+    а недостающие (текущий и соседние снимки) заказывает у воркера
+    """
+    request = pyqtSignal(object)          # ключ кеша (путь, mtime, размер файла, ширина, высота)
+    ready = pyqtSignal(str, QPixmap)      # путь, pixmap целевого размера
+    failed = pyqtSignal(str)              # путь снимка, который не удалось прочитать
+
+    def __init__(self, thread, capacity: int = 32, parent=None):
+        super().__init__(parent)
+        self.cache = PreviewCache(capacity)
+        self._pending = set()
+        self._worker = PreviewLoaderWorker()
+        self._worker.moveToThread(thread)
+        self.request.connect(self._worker.load)
+        self._worker.loaded.connect(self._on_loaded)
+        thread.finished.connect(self._worker.deleteLater)
+
+    def get(self, path: str, size: QSize):
+        """ Возвращает pixmap из кеша или None, заказывая фоновую загрузку """
+        key = preview_key(path, size.width(), size.height())
+        if key is None:
+            return None
+        pixmap = self.cache.get(key)
+        if pixmap is None:
+            self._enqueue(key)
+        return pixmap
+
+    def prefetch(self, paths, size: QSize) -> None:
+        """ Заказывает фоновую загрузку снимков, которых ещё нет в кеше """
+        for path in paths:
+            key = preview_key(path, size.width(), size.height())
+            if key is not None and key not in self.cache:
+                self._enqueue(key)
+
+    def _enqueue(self, key) -> None:
+        if key in self._pending:
+            return
+        self._pending.add(key)
+        self.request.emit(key)
+
+    def _on_loaded(self, key, image: QImage):
+        self._pending.discard(key)
+        if image.isNull():
+            self.failed.emit(key[0])
+            return
+        pixmap = QPixmap.fromImage(image)
+        self.cache.put(key, pixmap)
+        self.ready.emit(key[0], pixmap)
@@ -0,0 +1,63 @@
+from PyQt6.QtCore import Qt, QRect, pyqtSignal
+from PyQt6.QtGui import QPainter, QPen, QColor
+from PyQt6.QtWidgets import QLabel
+
+
+class RoiLabel(QLabel):
+    """
+    Предпросмотр снимка с выделением области интереса (ROI) мышью.
+    Нажать и протянуть — прямоугольник; при отпускании испускается roi_selected(QRect)
+    в координатах виджета. Текущая ROI (set_roi) рисуется поверх снимка
+    """
+    roi_selected = pyqtSignal(QRect)
+
+    MIN_SIZE = 8  # Меньшие прямоугольники считаются случайным щелчком
+
+    def __init__(self, text="", parent=None):
+        super().__init__(text, parent)
+        self._origin = None
+        self._drag_rect = None
+        self._roi_rect = None
+
+    def set_roi(self, rect):
+        """ Показывает ROI (QRect в координатах виджета) или убирает её (None) """
+        self._roi_rect = rect
+        self.update()
+
+    def has_image(self) -> bool:
+        pixmap = self.pixmap()
+        return pixmap is not None and not pixmap.isNull()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton and self.has_image():
+            self._origin = event.position().toPoint()
+            self._drag_rect = QRect(self._origin, self._origin)
+            self.update()
+        super().mousePressEvent(event)
+
+    def mouseMoveEvent(self, event):
+        if self._origin is not None:
+            self._drag_rect = QRect(self._origin, event.position().toPoint()).normalized()
+            self.update()
+        super().mouseMoveEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        if self._origin is not None and event.button() == Qt.MouseButton.LeftButton:
+            rect = QRect(self._origin, event.position().toPoint()).normalized()
+            self._origin = None
+            self._drag_rect = None
+            self.update()
+            if rect.width() >= self.MIN_SIZE and rect.height() >= self.MIN_SIZE:
+                self.roi_selected.emit(rect)
+        super().mouseReleaseEvent(event)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        rect = self._drag_rect or self._roi_rect
+        if rect is None or not self.has_image():
+            return
+        painter = QPainter(self)
+        style = Qt.PenStyle.DashLine if self._drag_rect is not None else Qt.PenStyle.SolidLine
+        painter.setPen(QPen(QColor(255, 0, 0), 2, style))
+        painter.drawRect(rect)
+        painter.end()
@@ -8,15 +8,26 @@ from PyQt6.QtWidgets import (
     QTableWidget, QTableWidgetItem, QMessageBox, QHeaderView, QSizePolicy,
     QProgressBar
 )
-from PyQt6.QtCore import Qt, QThread
-from PyQt6.QtGui import QPixmap
+from PyQt6.QtCore import Qt, QThread, QSize, QRect, pyqtSignal
+from PyQt6.QtGui import QPixmap, QImageReader
 
-from core.config import BASE_DIR
+from core.config import (
+    BASE_DIR, is_processing_profiling_enabled, get_unmixing_method, is_band_registration_enabled,
+    get_regularization_weight,
+)
 from db.db import get_db_session
-from db.models import Session, RawImage, DeviceBinding, ReconstructedImage
+from db.matrix import subscribe_matrix_changed, unsubscribe_matrix_changed
+from db.models import Session, RawImage, ReconstructedImage
+from ui.patient.session_model import session_query
 from ui.session.process_worker import ProcessWorker
 from ui.session.download_worker import DownloadWorker
 from ui.session.update_worker import UpdateStatusWorker
+from ui.session.preview_cache import PreviewLoader
+from ui.session.roi_label import RoiLabel
+from services.device_monitor import get_device_monitor
+
+NO_IMAGE_PATH = os.path.join(BASE_DIR, "assets/images/no_image.png")
+PREFETCH_NEIGHBOURS = 2
 
 
 class SessionWidget(QWidget):
@@ -25,6 +36,9 @@ class SessionWidget(QWidget):
     Отображает информацию о пациенте, устройстве, статусе задачи, а также
     позволяет просматривать, загружать и обрабатывать фотографии
     """
+    _placeholders = {}   # Масштабированные заглушки no_image.png по размеру окна предпросмотра
+
+    session_changed = pyqtSignal(str)   # ID сеанса, данные которого изменились в БД
 
     def __init__(self, session: Session, parent=None):
         """
@@ -83,13 +97,24 @@ class SessionWidget(QWidget):
         self.raw_table.itemSelectionChanged.connect(self.on_raw_photo_selected)
         raw_table_block.addWidget(self.raw_table)
 
-        self.raw_view = QLabel("Нет фото")
+        self.raw_view = RoiLabel("Нет фото")
         self.raw_view.setFixedSize(320, 240)
         self.raw_view.setAlignment(Qt.AlignmentFlag.AlignTop)
         self.raw_view.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        self.raw_view.setToolTip("Выделите мышью область интереса (ROI) — обрабатываться будет только она")
+        self.raw_view.roi_selected.connect(self.on_roi_selected)
         raw_table_block.addWidget(self.raw_view)
         raw_photo.addLayout(raw_table_block)
 
+        roi_block = QHBoxLayout()
+        self.roi_label = QLabel()
+        roi_block.addWidget(self.roi_label)
+        self.roi_reset_btn = QPushButton("Весь кадр")
+        self.roi_reset_btn.clicked.connect(lambda: self.save_roi(None))
+        roi_block.addWidget(self.roi_reset_btn)
+        roi_block.addStretch()
+        raw_photo.addLayout(roi_block)
+
         raw_photo_widget = QWidget()
         raw_photo_widget.setLayout(raw_photo)
         upper_layout.addWidget(raw_photo_widget, alignment=Qt.AlignmentFlag.AlignTop)
@@ -200,6 +225,28 @@ class SessionWidget(QWidget):
         self.download_worker = None
         self.processing_thread = None
         self.process_worker = None
+
+        # Фоновое декодирование снимков для предпросмотра с LRU-кешем
+        self._raw_paths = []
+        self._proc_paths = []
+        self._raw_current = None
+        self._proc_current = None
+        self._preview_thread = QThread(self)
+        self.preview_loader = PreviewLoader(self._preview_thread, parent=self)
+        self.preview_loader.ready.connect(self.on_preview_ready)
+        self.preview_loader.failed.connect(self.on_preview_failed)
+        self._preview_thread.start()
+
+        # Подписка на события устройства: статус задачи приходит сам, без опроса
+        self.device_ip = self.session.device_binding.ip_address if self.session.device_binding else None
+        self.monitor = get_device_monitor()
+        self.monitor.events_received.connect(self.on_device_events)
+        self.monitor.watch(self.device_ip, heartbeat=True)
+
+        # Правка коэффициентов перекрытия для спектров сеанса делает результат устаревшим
+        self._raw_spectrum_ids = set()
+        subscribe_matrix_changed(self.on_matrix_changed)
+
         # self.update_task_status()
         self.load_raw_photos()
         self.load_proc_photos()
@@ -207,16 +254,15 @@ class SessionWidget(QWidget):
 
     def refresh_session_data(self):
         """
-        Перезагружает объект сеанса из базы данных (например, после обработки).
+        Перезагружает объект сеанса из базы данных (например, после обработки)
+        и сообщает об изменении списку сеансов.
         """
         with get_db_session() as session_db:
-            self.session = session_db.query(Session).options(
-                joinedload(Session.patient),
-                joinedload(Session.device_binding).joinedload(DeviceBinding.device),
-                joinedload(Session.operator),
-                joinedload(Session.result),
-                ).get(self.session.id)
+            session = session_query(session_db).filter(Session.id == self.session.id).one_or_none()
+        if session is not None:
+            self.session = session
         self.update_analysis_block()
+        self.session_changed.emit(self.session.id)
 
     def log_message(self, message: str):
         """
@@ -232,8 +278,8 @@ class SessionWidget(QWidget):
         """
         result = self.session.result
 
-        pixmap_contour_path = QPixmap(os.path.join(BASE_DIR, "assets/images/no_image.png"))
-        pixmap_thb_path = QPixmap(os.path.join(BASE_DIR, "assets/images/no_image.png"))
+        pixmap_contour_path = self.placeholder_pixmap(self.contour_path_img.size())
+        pixmap_thb_path = self.placeholder_pixmap(self.thb_path_img.size())
 
         if result:
             self.analys_label.setText("Общий анализ: выполнен")
@@ -273,6 +319,23 @@ class SessionWidget(QWidget):
         else:
             self.thb_path_img.setText("Нет данных")
 
+    @classmethod
+    def placeholder_pixmap(cls, size: QSize) -> QPixmap:
+        """
+        Возвращает заглушку no_image.png, масштабированную под размер окна.
+        Файл читается один раз на каждый размер
+        """
+        key = (size.width(), size.height())
+        if key not in cls._placeholders:
+            pixmap = QPixmap(NO_IMAGE_PATH)
+            if not pixmap.isNull():
+                pixmap = pixmap.scaled(
+                    size.width(), size.height(),
+                    Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation
+                )
+            cls._placeholders[key] = pixmap
+        return cls._placeholders[key]
+
     def update_task_status(self):
         """
         Обновляет статус задачи на устройстве через отдельный поток
@@ -316,6 +379,20 @@ class SessionWidget(QWidget):
         self._status_thread = None
         self.progress_bar.setVisible(False)
 
+    def on_device_events(self, ip: str, data: object):
+        """
+        Слот монитора устройств: пришли изменения задач устройства (long-poll /events).
+        Если среди них задача этого сеанса — обновляем статус так же, как после запроса статуса.
+        """
+        if ip != self.device_ip or self.task_id is None:
+            return
+        for task in data.get("tasks", []):
+            if task.get("id") == self.task_id:
+                self.log_message(f"Статус задачи на устройстве: {task.get('status')}")
+                self.task_label.setText(task.get("status", "Статус: —"))
+                self.download_photos_btn.setEnabled(task.get("status") == "completed")
+                self.process_btn.setEnabled(self.has_photos())
+
     def on_status_error(self, message: str):
         """
         Слот вызывается при ошибке обновления статуса задачи
@@ -340,6 +417,7 @@ class SessionWidget(QWidget):
             )
         self.raw_table.setRowCount(0)
         self._raw_paths = []
+        self._raw_spectrum_ids = {photo.spectrum_id for photo in photos}
         for i, photo in enumerate(photos):
             self.raw_table.insertRow(i)
             spec_str = str(photo.spectrum.wavelength) if photo.spectrum and getattr(photo.spectrum, "wavelength", None) is not None else "?"
@@ -347,15 +425,16 @@ class SessionWidget(QWidget):
             self._raw_paths.append(photo.file_path)
 
         # Показываем заглушку, если фото не выбрано
-        pixmap_raw_view = QPixmap(os.path.join(BASE_DIR, "assets/images/no_image.png"))
+        self._raw_current = None
+        pixmap_raw_view = self.placeholder_pixmap(self.raw_view.size())
         if not pixmap_raw_view.isNull():
-            self.raw_view.setPixmap(pixmap_raw_view.scaled(
-                self.raw_view.width(), self.raw_view.height(),
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            ))
+            self.raw_view.setPixmap(pixmap_raw_view)
         else:
             self.raw_view.setText("Нет данных")
+        self.update_roi_view()
+
+        # Заранее декодируем первые снимки, чтобы первый выбор строки был мгновенным
+        self.preview_loader.prefetch(self._raw_paths[:PREFETCH_NEIGHBOURS + 1], self.raw_view.size())
 
         self.process_btn.setEnabled(self.has_photos())
 
@@ -380,20 +459,21 @@ class SessionWidget(QWidget):
             self._proc_paths.append(img.file_path)
 
         # Показываем заглушку, если фото не выбрано
-        pixmap_proc_view = QPixmap(os.path.join(BASE_DIR, "assets/images/no_image.png"))
+        self._proc_current = None
+        pixmap_proc_view = self.placeholder_pixmap(self.proc_view.size())
         if not pixmap_proc_view.isNull():
-            self.proc_view.setPixmap(pixmap_proc_view.scaled(
-                self.proc_view.width(), self.proc_view.height(),
-                Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation
-            ))
+            self.proc_view.setPixmap(pixmap_proc_view)
         else:
             self.proc_view.setText("Нет данных")
 
+        self.preview_loader.prefetch(self._proc_paths[:PREFETCH_NEIGHBOURS + 1], self.proc_view.size())
+
     def on_raw_photo_selected(self):
         """
         Показывает выбранное raw-фото в окне предпросмотра.
         """
         selected = self.raw_table.selectedItems()
+        self._raw_current = None
         if not selected:
             self.raw_view.setText("Выберите фото слева")
             return
@@ -405,20 +485,17 @@ class SessionWidget(QWidget):
         if not os.path.isfile(path):
             self.raw_view.setText("Файл не найден")
             return
-        pixmap = QPixmap(path)
-        if not pixmap.isNull():
-            self.raw_view.setPixmap(pixmap.scaled(
-                self.raw_view.width(), self.raw_view.height(),
-                Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation
-            ))
-        else:
-            self.raw_view.setText("Ошибка загрузки фото")
+        self._raw_current = path
+        self.show_preview(self.raw_view, path)
+        self.update_roi_view()
+        self.preview_loader.prefetch(self.neighbour_paths(self._raw_paths, idx), self.raw_view.size())
 
     def on_proc_photo_selected(self):
         """
         Показывает выбранное обработанное фото в окне предпросмотра
         """
         selected = self.proc_table.selectedItems()
+        self._proc_current = None
         if not selected:
             self.proc_view.setText("Выберите фото слева")
             return
@@ -430,15 +507,133 @@ class SessionWidget(QWidget):
         if not os.path.isfile(path):
             self.proc_view.setText("Файл не найден")
             return
-        pixmap = QPixmap(path)
-        if not pixmap.isNull():
-            self.proc_view.setPixmap(pixmap.scaled(
-                self.proc_view.width(), self.proc_view.height(),
-                Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation
-            ))
+        self._proc_current = path
+        self.show_preview(self.proc_view, path)
+        self.preview_loader.prefetch(self.neighbour_paths(self._proc_paths, idx), self.proc_view.size())
+
+    def show_preview(self, view: QLabel, path: str):
+        """
+        Показывает снимок из кеша предпросмотра. Если его там нет, снимок декодируется
+        в фоновом потоке и будет показан в on_preview_ready
+        """
+        pixmap = self.preview_loader.get(path, view.size())
+        if pixmap is not None:
+            view.setPixmap(pixmap)
         else:
+            view.setText("Загрузка...")
+
+    @staticmethod
+    def neighbour_paths(paths: list, idx: int) -> list:
+        """
+        Возвращает пути соседних строк для предзагрузки при навигации стрелками
+        """
+        lo = max(0, idx - PREFETCH_NEIGHBOURS)
+        hi = min(len(paths), idx + PREFETCH_NEIGHBOURS + 1)
+        return [paths[i] for i in range(lo, hi) if i != idx]
+
+    def on_preview_ready(self, path: str, pixmap: QPixmap):
+        """
+        Слот вызывается, когда фоновый поток подготовил снимок для предпросмотра
+        """
+        if path == self._raw_current:
+            self.raw_view.setPixmap(pixmap)
+            self.update_roi_view()
+        if path == self._proc_current:
+            self.proc_view.setPixmap(pixmap)
+
+    def on_matrix_changed(self, spectrum_ids):
+        """
+        Вызывается после сохранения матрицы коэффициентов перекрытия. Если изменились
+        коэффициенты спектров этого сеанса, имеющийся результат помечается как устаревший
+        """
+        if not self.session.result or not (set(spectrum_ids) & self._raw_spectrum_ids):
+            return
+        self.analys_label.setText("Общий анализ: устарел (изменены коэффициенты перекрытия)")
+        self.log_message("Коэффициенты перекрытия для спектров сеанса изменены — повторите обработку.")
+
+    def on_preview_failed(self, path: str):
+        """
+        Слот вызывается, когда снимок для предпросмотра не удалось прочитать
+        """
+        if path == self._raw_current:
+            self.raw_view.setText("Ошибка загрузки фото")
+        if path == self._proc_current:
             self.proc_view.setText("Ошибка загрузки фото")
 
+    # --- Область интереса (ROI) ---
+
+    def raw_preview_scale(self):
+        """
+        Масштаб (по X, по Y) предпросмотра текущего исходного снимка относительно самого снимка
+        или None, если снимок не показан
+        """
+        pixmap = self.raw_view.pixmap()
+        if not self._raw_current or pixmap is None or pixmap.isNull():
+            return None
+        size = QImageReader(self._raw_current).size()
+        if size.width() <= 0 or size.height() <= 0:
+            return None
+        return pixmap.width() / size.width(), pixmap.height() / size.height()
+
+    def update_roi_view(self):
+        """
+        Обновляет подпись ROI и рамку на предпросмотре исходного снимка
+        """
+        roi = self.session.roi
+        if roi is None:
+            self.roi_label.setText("Область обработки: весь кадр")
+        else:
+            x, y, w, h = roi
+            self.roi_label.setText(f"Область обработки: {w}x{h} с ({x}, {y})")
+        self.roi_reset_btn.setEnabled(roi is not None)
+
+        scale = self.raw_preview_scale()
+        if roi is None or scale is None:
+            self.raw_view.set_roi(None)
+            return
+        sx, sy = scale
+        x, y, w, h = roi
+        self.raw_view.set_roi(QRect(round(x * sx), round(y * sy), round(w * sx), round(h * sy)))
+
+    def on_roi_selected(self, rect: QRect):
+        """
+        Слот: выделена ROI на предпросмотре — переводит её в пиксели исходного снимка и сохраняет
+        """
+        scale = self.raw_preview_scale()
+        if scale is None:
+            return
+        pixmap = self.raw_view.pixmap()
+        rect = rect.intersected(QRect(0, 0, pixmap.width(), pixmap.height()))
+        if rect.isEmpty():
+            return
+        sx, sy = scale
+        x, y = int(rect.x() / sx), int(rect.y() / sy)
+        w, h = int(rect.width() / sx), int(rect.height() / sy)
+        self.save_roi((x, y, w, h))
+
+    def save_roi(self, roi):
+        """
+        Сохраняет ROI сеанса (x, y, ширина, высота) или сбрасывает её (None)
+        """
+        x, y, w, h = roi if roi is not None else (None, None, None, None)
+        try:
+            with get_db_session() as session_db:
+                session = session_db.get(Session, self.session.id)
+                if session is None:
+                    return
+                session.roi_x, session.roi_y, session.roi_width, session.roi_height = x, y, w, h
+                session_db.commit()
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить область обработки: {e}")
+            return
+        self.session.roi_x, self.session.roi_y, self.session.roi_width, self.session.roi_height = x, y, w, h
+        self.update_roi_view()
+        self.session_changed.emit(self.session.id)
+        if roi is None:
+            self.log_message("Область обработки сброшена: обрабатывается весь кадр.")
+        else:
+            self.log_message(f"Область обработки: {w}x{h} с ({x}, {y}). Запустите обработку заново.")
+
     def has_photos(self) -> bool:
         """
         Проверяет, есть ли в таблице загруженные фото
@@ -490,6 +685,7 @@ class SessionWidget(QWidget):
         """
         QMessageBox.information(self, "Загрузка завершена", f"{message}\nСохранено фото: {saved_count}")
         self.load_raw_photos()
+        self.refresh_session_data()
         self.process_btn.setEnabled(self.has_photos())
         self.download_photos_btn.setEnabled(True)
         self.log_message(f"Загрузка завершена. {message}")
@@ -537,7 +733,13 @@ class SessionWidget(QWidget):
             return
 
         self.processing_thread = QThread(self)
-        self.process_worker = ProcessWorker(session_id=self.session.id)
+        self.process_worker = ProcessWorker(
+            session_id=self.session.id,
+            profile=is_processing_profiling_enabled(),
+            unmixing=get_unmixing_method(),
+            registration=is_band_registration_enabled(),
+            regularization=get_regularization_weight(),
+        )
         self.process_worker.moveToThread(self.processing_thread)
 
         self.process_worker.progress.connect(self.on_processing_progress)
@@ -580,6 +782,12 @@ class SessionWidget(QWidget):
             self.load_proc_photos()
             self.refresh_session_data()
 
+            # Сводка профилирования (если оно было включено в настройках)
+            for line in results_dict.get("profile_summary", []):
+                self.log_message(line)
+            if results_dict.get("profile_report"):
+                self.log_message(f"Отчёт профилирования: {results_dict['profile_report']}")
+
             QMessageBox.information(
                 self,
                 "Обработка завершена",
@@ -615,6 +823,16 @@ class SessionWidget(QWidget):
             self.processing_thread.quit()
             self.processing_thread.wait(5000)
 
+        if self.device_ip:
+            self.monitor.unwatch(self.device_ip, heartbeat=True)
+            self.device_ip = None
+
+        unsubscribe_matrix_changed(self.on_matrix_changed)
+
+        if self._preview_thread.isRunning():
+            self._preview_thread.quit()
+            self._preview_thread.wait(3000)
+
         super().closeEvent(event)
 
     def showEvent(self, event):
@@ -4,29 +4,42 @@
 import random
 
 from PyQt6.QtWidgets import QTableWidget, QDoubleSpinBox, QMessageBox, QAbstractSpinBox
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer
 
 from db.db import get_db_session
-from db.models import OverlapCoefficient
+from db.matrix import load_overlap_coefficients, save_overlap_coefficients
+
+AUTOSAVE_DELAY_MS = 1000  # Пауза после последней правки перед автосохранением
 
 class MatrixTableWidget(QTableWidget):
     """
     Матрица коэффициентов перекрытия спектр × хромофор.
-    Автоматически сохраняет изменения в базу при редактировании.
+    Изменённые ячейки копятся в буфере и сохраняются в базу одной транзакцией:
+    автоматически — через AUTOSAVE_DELAY_MS после последней правки, либо явно через save_changes().
     """
     def __init__(self, parent=None):
         super().__init__(0, 0, parent)
         self._internal_fill = False
         self._spinbox_map = {}  # (row, col): spinbox
         self._coefs_map = {}    # (row, col): (spectrum_id, chromophore_id)
+        self._dirty = {}        # (row, col): новое значение, ещё не записанное в БД
         self.spectra = []
         self.chromophores = []
 
+        self._save_timer = QTimer(self)
+        self._save_timer.setSingleShot(True)
+        self._save_timer.setInterval(AUTOSAVE_DELAY_MS)
+        self._save_timer.timeout.connect(self.save_changes)
+
     def fill(self, spectra, chromophores, coefs):
         """
-        Заполняет матрицу коэффициентов
+        Заполняет матрицу коэффициентов.
+        Несохранённые правки предыдущей матрицы отбрасываются — перед перечитыванием
+        вызывающий должен сохранить их через save_changes().
         """
         self._internal_fill = True
+        self._save_timer.stop()
+        self._dirty.clear()
         self.spectra = spectra
         self.chromophores = chromophores
         self.setRowCount(len(spectra))
@@ -66,54 +79,49 @@ class MatrixTableWidget(QTableWidget):
             self._internal_fill = False
             return
 
-        spectrum_id, chromophore_id = self._coefs_map[(row, col)]
+        # Запись в базу откладывается: правки копятся и уходят одной транзакцией
+        self._dirty[(row, col)] = float(new_val)
+        self._save_timer.start()
+
+    def has_changes(self):
+        return bool(self._dirty)
 
-        # Запись в базу данных
+    def save_changes(self, all_cells=False):
+        """
+        Записывает все изменённые ячейки в БД одной транзакцией (upsert по паре спектр-хромофор).
+        all_cells=True — записать всю матрицу, включая ячейки, которых ещё нет в БД.
+        Возвращает True, если сохранять было нечего или сохранение прошло успешно.
+        При ошибке значения изменённых ячеек возвращаются к данным из БД.
+        """
+        self._save_timer.stop()
+        if all_cells:
+            for cell, spin in self._spinbox_map.items():
+                self._dirty[cell] = spin.value()
+        if not self._dirty:
+            return True
+        dirty, self._dirty = self._dirty, {}
+        values = {self._coefs_map[cell]: val for cell, val in dirty.items()}
         try:
             with get_db_session() as session:
-                coef = session.query(OverlapCoefficient).filter_by(
-                    spectrum_id=spectrum_id,
-                    chromophore_id=chromophore_id
-                ).first()
-                if coef:
-                    coef.coefficient = float(new_val)
-                else:
-                    coef = OverlapCoefficient(
-                        spectrum_id=spectrum_id,
-                        chromophore_id=chromophore_id,
-                        coefficient=float(new_val)
-                    )
-                    session.add(coef)
-                session.commit()
-
-                # Проверяем, что записалось правильно
-                checked_coef = session.query(OverlapCoefficient).filter_by(
-                    spectrum_id=spectrum_id,
-                    chromophore_id=chromophore_id
-                ).first()
-                if not checked_coef or abs(checked_coef.coefficient - float(new_val)) > 1e-6:
-                    raise Exception("Ошибка подтверждения записи в базе")
-
+                save_overlap_coefficients(session, values)
         except Exception as e:
-            QMessageBox.warning(self, "Ошибка сохранения", f"Не удалось сохранить коэффициент: {e}")
-            # Откат значения в spinbox на старое (из базы, либо 0.0)
-            self._internal_fill = True
-            old_val = 0.0
+            QMessageBox.warning(self, "Ошибка сохранения", f"Не удалось сохранить коэффициенты: {e}")
+            # Откат значений в spinbox на старые (из базы, либо 0.0)
+            stored = {}
             try:
                 with get_db_session() as session:
-                    coef = session.query(OverlapCoefficient).filter_by(
-                        spectrum_id=spectrum_id,
-                        chromophore_id=chromophore_id
-                    ).first()
-                    if coef:
-                        old_val = coef.coefficient
+                    stored = load_overlap_coefficients(session, {s_id for s_id, _ in values})
             except Exception:
                 pass
-            self._spinbox_map[(row, col)].setValue(old_val)
+            self._internal_fill = True
+            for cell in dirty:
+                self._spinbox_map[cell].setValue(stored.get(self._coefs_map[cell], 0.0))
             self._internal_fill = False
+            return False
+        return True
 
     def set_random_values(self, min_value=0.0, max_value=1.0, decimals=4):
-        """Заполнить матрицу случайными значениями."""
+        """Заполнить матрицу случайными значениями (сохраняются вместе с остальными правками)."""
         self._internal_fill = True
         for i in range(self.rowCount()):
             for j in range(self.columnCount()):
@@ -121,6 +129,7 @@ class MatrixTableWidget(QTableWidget):
                 widget = self.cellWidget(i, j)
                 if widget is not None:
                     widget.setValue(val)
+                    self._dirty[(i, j)] = widget.value()
                 else:
                     item = self.item(i, j)
                     if item is not None:
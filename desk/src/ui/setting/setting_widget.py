@@ -4,10 +4,17 @@
 """
 
 from PyQt6.QtWidgets import (
-    QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QMessageBox, QInputDialog
+    QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QMessageBox, QInputDialog, QCheckBox, QComboBox,
+    QDoubleSpinBox,
 )
+from core.config import (
+    is_processing_profiling_enabled, set_processing_profiling_enabled, get_unmixing_method, set_unmixing_method,
+    is_band_registration_enabled, set_band_registration_enabled, get_regularization_weight, set_regularization_weight,
+)
+from engine.unmixing import UNMIXING_METHODS, REGULARIZED_METHODS
 from db.db import get_db_session
-from db.models import Device, Spectrum, Chromophore, OverlapCoefficient
+from db.models import Device, Spectrum, Chromophore
+from db.matrix import load_overlap_coefficients
 
 from ui.setting.device_table import DeviceTableWidget
 from ui.setting.spectrum_table import SpectrumTableWidget
@@ -71,9 +78,33 @@ class SettingWidget(QDialog):
         self.random_matrix_btn = QPushButton("Заполнить случайно")
         self.random_matrix_btn.setFixedWidth(150)
         self.back_btn = QPushButton("Назад")
+        # Профилирование следующих обработок сеансов (cProfile + память по этапам)
+        self.profiling_check = QCheckBox("Профилирование обработки")
+        self.profiling_check.setChecked(is_processing_profiling_enabled())
+        # Совмещение каналов (компенсация движения пациента между кадрами)
+        self.registration_check = QCheckBox("Совмещение каналов")
+        self.registration_check.setChecked(is_band_registration_enabled())
+        # Метод разложения на хромофоры для обработки сеансов
+        self.unmixing_combo = QComboBox()
+        for method, title in UNMIXING_METHODS.items():
+            self.unmixing_combo.addItem(title, method)
+        self.unmixing_combo.setCurrentIndex(max(self.unmixing_combo.findData(get_unmixing_method()), 0))
+        # Вес регуляризации (только для разложения с регуляризацией)
+        self.regularization_spin = QDoubleSpinBox()
+        self.regularization_spin.setRange(0.0, 10.0)
+        self.regularization_spin.setDecimals(2)
+        self.regularization_spin.setSingleStep(0.05)
+        self.regularization_spin.setValue(get_regularization_weight())
+        self.regularization_spin.setToolTip("Относительный вес регуляризации (Тихонов / TV)")
+        self.regularization_spin.setEnabled(self.unmixing_combo.currentData() in REGULARIZED_METHODS)
         matrix_btns.addWidget(self.random_matrix_btn)
         matrix_btns.addWidget(self.save_matrix_btn)
         matrix_btns.addStretch()
+        matrix_btns.addWidget(QLabel("Разложение:"))
+        matrix_btns.addWidget(self.unmixing_combo)
+        matrix_btns.addWidget(self.regularization_spin)
+        matrix_btns.addWidget(self.registration_check)
+        matrix_btns.addWidget(self.profiling_check)
         matrix_btns.addWidget(self.back_btn)
         matrix_box.addLayout(matrix_btns)
         layout.addLayout(matrix_box, stretch=6)
@@ -93,12 +124,22 @@ class SettingWidget(QDialog):
         self.save_matrix_btn.clicked.connect(self.save_matrix)
         self.random_matrix_btn.clicked.connect(self.fill_matrix_random)
         self.back_btn.clicked.connect(self.close)
+        self.profiling_check.toggled.connect(set_processing_profiling_enabled)
+        self.registration_check.toggled.connect(set_band_registration_enabled)
+        self.unmixing_combo.currentIndexChanged.connect(self.on_unmixing_changed)
+        self.regularization_spin.valueChanged.connect(set_regularization_weight)
 
         # ==== Инициализация таблиц ====
         self.reload_devices()
         self.reload_chroms()
         self.reload_matrix()
 
+    def on_unmixing_changed(self):
+        """Сохраняет метод разложения; вес регуляризации доступен только для tikhonov / tv."""
+        method = self.unmixing_combo.currentData()
+        set_unmixing_method(method)
+        self.regularization_spin.setEnabled(method in REGULARIZED_METHODS)
+
     # ==== КНОПКА РАНДОМИЗАЦИИ ====
     def fill_matrix_random(self):
         """Заполняет матрицу коэффициентов случайными значениями."""
@@ -232,6 +273,8 @@ class SettingWidget(QDialog):
 
     # ==== МАТРИЦА КОЭФФИЦИЕНТОВ ====
     def reload_matrix(self):
+        # Несохранённые правки текущей матрицы записываем до перечитывания
+        self.matrix_table.save_changes()
         d = self.get_selected_device()
         if not d:
             self.matrix_table.setRowCount(0)
@@ -240,44 +283,21 @@ class SettingWidget(QDialog):
         with get_db_session() as session:
             spectra = session.query(Spectrum).filter_by(device_id=d.id).order_by(Spectrum.wavelength).all()
             chromos = session.query(Chromophore).order_by(Chromophore.name).all()
-            spectrum_ids = [s.id for s in spectra]
-            coefs = {
-                (c.spectrum_id, c.chromophore_id): c.coefficient
-                for c in session.query(OverlapCoefficient).filter(
-                    OverlapCoefficient.spectrum_id.in_(spectrum_ids)
-                ).all()
-            }
+            coefs = load_overlap_coefficients(session, [s.id for s in spectra])
         self.matrix_table.fill(spectra, chromos, coefs)
 
     def save_matrix(self):
         d = self.get_selected_device()
         if not d:
             return
-        with get_db_session() as session:
-            chromos = session.query(Chromophore).order_by(Chromophore.name).all()
-            spectra = session.query(Spectrum).filter_by(device_id=d.id).order_by(Spectrum.wavelength).all()
-            for i, s in enumerate(spectra):
-                for j, chrom in enumerate(chromos):
-                    spin = self.matrix_table.cellWidget(i, j)
-                    if spin is None:
-                        continue
-                    val = spin.value()
-                    coef = session.query(OverlapCoefficient).filter_by(
-                        spectrum_id=s.id,
-                        chromophore_id=chrom.id
-                    ).first()
-                    if coef:
-                        coef.coefficient = val
-                    else:
-                        coef = OverlapCoefficient(
-                            spectrum_id=s.id,
-                            chromophore_id=chrom.id,
-                            coefficient=val
-                        )
-                        session.add(coef)
-            session.commit()
-        QMessageBox.information(self, "Готово", "Коэффициенты сохранены.")
+        if self.matrix_table.save_changes(all_cells=True):
+            QMessageBox.information(self, "Готово", "Коэффициенты сохранены.")
 
     def on_device_selected(self):
         self.reload_spectra()
         self.reload_matrix()
+
+    def done(self, result):
+        # Правки, не дождавшиеся автосохранения, не теряем (закрытие крестиком, Esc и «Назад»)
+        self.matrix_table.save_changes()
+        super().done(result)
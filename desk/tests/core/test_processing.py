@@ -0,0 +1,190 @@
+# desk/tests/core/test_processing.py
+import numpy as np
+import pytest
+from PIL import Image
+
+from desk.src.core.processing import (
+    ConcentrationCalculator, AnalysisEngine, BandRegistration, HypercubeBuilder, to_uint8, roi_box
+)
+from engine.unmixing import nnls_batched, regularized_unmix
+
+
+@pytest.fixture
+def synthetic_od():
+    """Матрица перекрытия 5×2 и OD, полученная из известных концентраций."""
+    rng = np.random.default_rng(0)
+    overlap = rng.uniform(0.2, 1.0, (5, 2)).astype(np.float32)
+    concentrations = rng.uniform(0.0, 0.5, (2, 6, 7)).astype(np.float32)
+    od = (overlap @ concentrations.reshape(2, -1)).reshape(5, 6, 7)
+    return overlap, concentrations, od
+
+
+def test_optical_density_matches_formula():
+    cube = np.array([[[0.0, 25.5, 255.0]]], dtype=np.float32)
+    od = ConcentrationCalculator.optical_density(cube)
+    assert od.dtype == np.float32
+    np.testing.assert_allclose(od, -np.log10(np.clip(cube / 255.0, 1e-6, 1.0)), rtol=1e-6)
+
+
+def test_calculate_recovers_known_concentrations(synthetic_od):
+    overlap, concentrations, od = synthetic_od
+    result = ConcentrationCalculator(overlap).calculate(od)
+    assert result.shape == concentrations.shape
+    np.testing.assert_allclose(result, concentrations, atol=1e-4)
+
+
+def test_calculate_matches_per_pixel_lstsq(synthetic_od):
+    overlap, _, od = synthetic_od
+    result = ConcentrationCalculator(overlap).calculate(od)
+    expected, *_ = np.linalg.lstsq(overlap.astype(np.float64), od[:, 2, 3].astype(np.float64), rcond=None)
+    np.testing.assert_allclose(result[:, 2, 3], expected, atol=1e-4)
+
+
+def test_nnls_matches_lstsq_for_positive_concentrations(synthetic_od):
+    overlap, concentrations, od = synthetic_od
+    result = ConcentrationCalculator(overlap, "nnls").calculate(od)
+    np.testing.assert_allclose(result, concentrations, atol=1e-4)
+
+
+def test_nnls_batched_satisfies_optimality_conditions():
+    rng = np.random.default_rng(1)
+    matrix = rng.uniform(0.1, 1.0, (8, 3))
+    matrix[:, 1] = 0.9 * matrix[:, 0] + 0.1 * matrix[:, 1]  # Почти коллинеарные спектры, как у Hb/HbO2
+    rhs = rng.normal(0.0, 1.0, (8, 500))
+
+    x = nnls_batched(matrix, rhs, tile=128).astype(np.float64)
+    gradient = matrix.T @ (rhs - matrix @ x)
+    assert x.min() >= 0
+    # Условия Каруша–Куна–Таккера: градиент ≤ 0, и равен нулю у положительных переменных
+    assert gradient.max() < 1e-4
+    np.testing.assert_allclose(gradient[x > 1e-6], 0.0, atol=1e-4)
+
+
+def test_unknown_unmixing_method_rejected():
+    with pytest.raises(ValueError):
+        ConcentrationCalculator(np.eye(2), "ridge")
+
+
+@pytest.fixture
+def noisy_scene():
+    """Кусочно-постоянные концентрации (очаг на фоне) и OD с шумом."""
+    rng = np.random.default_rng(0)
+    overlap = rng.uniform(0.2, 1.0, (8, 2)).astype(np.float32)
+    overlap[:, 1] = 0.7 * overlap[:, 0] + 0.3 * overlap[:, 1]
+    concentrations = np.empty((2, 60, 80), dtype=np.float32)
+    concentrations[0], concentrations[1] = 0.3, 0.2
+    concentrations[:, 15:45, 20:60] += 0.4
+    od = (overlap @ concentrations.reshape(2, -1)).reshape(8, 60, 80)
+    od += rng.normal(0.0, 0.02, od.shape).astype(np.float32)
+    return overlap, concentrations, od
+
+
+def test_tikhonov_solves_normal_equations(noisy_scene):
+    overlap, _, od = noisy_scene
+    result = regularized_unmix(overlap, od, "tikhonov", weight=1.0).astype(np.float64)
+    a = overlap.astype(np.float64)
+    gram = a.T @ a
+    lam = np.trace(gram) / 2
+    # (G + λ ∇ᵀ∇) c = Aᵀ od, ∇ᵀ∇ — разностный лапласиан с отражающими границами
+    padded = np.pad(result, ((0, 0), (1, 1), (1, 1)), mode="edge")
+    laplacian = 4 * result - padded[:, :-2, 1:-1] - padded[:, 2:, 1:-1] - padded[:, 1:-1, :-2] - padded[:, 1:-1, 2:]
+    lhs = np.einsum("ij,jhw->ihw", gram, result) + lam * laplacian
+    rhs = np.einsum("ij,jhw->ihw", a.T, od.astype(np.float64))
+    np.testing.assert_allclose(lhs, rhs, atol=1e-4 * np.abs(rhs).max())
+
+
+@pytest.mark.parametrize("method", ["tikhonov", "tv"])
+def test_regularized_unmixing_suppresses_noise(noisy_scene, method):
+    overlap, concentrations, od = noisy_scene
+    plain = ConcentrationCalculator(overlap).calculate(od)
+    regularized = ConcentrationCalculator(overlap, method).calculate(od)
+    assert regularized.shape == concentrations.shape
+    error = lambda x: np.sqrt(np.mean((x - concentrations) ** 2))
+    assert error(regularized) < 0.5 * error(plain)
+
+
+def _fourier_shift(img, dy, dx):
+    ky = np.fft.fftfreq(img.shape[0])[:, None]
+    kx = np.fft.fftfreq(img.shape[1])[None, :]
+    return np.real(np.fft.ifft2(np.fft.fft2(img) * np.exp(-2j * np.pi * (ky * dy + kx * dx)))).astype(np.float32)
+
+
+def test_band_registration_recovers_subpixel_shifts():
+    rng = np.random.default_rng(0)
+    texture = rng.uniform(0, 255, (300, 400))
+    # Сглаженная текстура (как кожа на снимке): низкие частоты без высокочастотного шума
+    ky = np.fft.fftfreq(300)[:, None]
+    kx = np.fft.fftfreq(400)[None, :]
+    texture = np.real(np.fft.ifft2(np.fft.fft2(texture) * np.exp(-2 * (np.pi * 2) ** 2 * (ky ** 2 + kx ** 2))))
+    true_shifts = np.array([[3.4, -1.2], [-0.6, 2.25], [0.0, 0.0], [7.8, 5.1], [-4.3, -6.7]])
+    cube = np.stack([_fourier_shift(texture, dy, dx) * (0.7 + 0.1 * i) for i, (dy, dx) in enumerate(true_shifts)])
+
+    registration = BandRegistration(window=128)
+    shifts = registration.estimate(cube)
+    np.testing.assert_allclose(shifts, true_shifts, atol=0.2)
+
+    aligned = registration.apply(cube.copy(), shifts)
+    inner = (slice(20, -20), slice(20, -20))
+    before = np.abs(cube[0][inner] / 0.7 - cube[2][inner] / 0.9).mean()
+    after = np.abs(aligned[0][inner] / 0.7 - aligned[2][inner] / 0.9).mean()
+    assert after < 0.2 * before
+
+
+def test_band_registration_ignores_textureless_bands():
+    rng = np.random.default_rng(0)
+    cube = (120 + rng.normal(0, 1, (4, 300, 300))).astype(np.float32)  # Однородный кадр и шум
+    shifts = BandRegistration(window=128).estimate(cube)
+    np.testing.assert_allclose(shifts, 0.0, atol=0.5)
+
+
+def test_roi_box_clips_to_image():
+    assert roi_box(None, (100, 80)) is None
+    assert roi_box((10, 20, 30, 40), (100, 80)) == (10, 20, 40, 60)
+    assert roi_box((90, 70, 50, 50), (100, 80)) == (90, 70, 100, 80)
+    assert roi_box((0, 0, 100, 80), (100, 80)) is None  # Весь кадр
+    assert roi_box((150, 10, 20, 20), (100, 80)) is None  # Вне кадра
+
+
+def test_hypercube_builder_crops_roi(tmp_path):
+    rng = np.random.default_rng(0)
+    bands = rng.integers(0, 256, (3, 60, 90), dtype=np.uint8)
+    paths = []
+    for i, band in enumerate(bands):
+        path = tmp_path / f"band_{i}.png"
+        Image.fromarray(band).save(path)
+        paths.append(str(path))
+
+    cube = HypercubeBuilder(paths, roi=(10, 5, 40, 30)).build()
+    assert cube.shape == (3, 30, 40)
+    np.testing.assert_array_equal(cube, bands[:, 5:35, 10:50].astype(np.float32))
+
+
+def test_thb_map_uses_both_hemoglobins_or_falls_back():
+    maps = np.array([np.full((2, 2), -1.0), np.full((2, 2), 2.0)])
+    thb, message = AnalysisEngine.thb_map(maps, ["HbO2", "Hb"])
+    np.testing.assert_allclose(thb, 3.0)
+    assert "HbO2" in message
+
+    thb, message = AnalysisEngine.thb_map(maps, ["Mel", "Hb"])
+    np.testing.assert_allclose(thb, 2.0)
+    assert message.startswith("Предупреждение")
+
+    thb, message = AnalysisEngine.thb_map(maps[:0], [])
+    assert thb is None
+
+
+def test_segment_and_statistics_find_bright_lesion():
+    thb = np.full((40, 40), 1.0)
+    thb[10:30, 10:30] = 3.0
+    threshold, mask = AnalysisEngine(gaussian_sigma=1.0).segment(thb)
+    assert mask[20, 20] and not mask[0, 0]
+
+    mean_lesion, mean_skin, s_coefficient = AnalysisEngine.statistics(thb, mask)
+    assert mean_lesion > mean_skin
+    assert s_coefficient == pytest.approx(mean_lesion / mean_skin)
+
+
+def test_to_uint8_spans_full_range():
+    img = to_uint8(np.array([[1.0, 2.0, 3.0]]))
+    assert img.dtype == np.uint8
+    assert img.min() == 0 and img.max() >= 254
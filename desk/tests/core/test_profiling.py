@@ -0,0 +1,37 @@
+# desk/tests/core/test_profiling.py
+import os
+
+from engine.profiling import StageProfiler
+
+
+def test_disabled_profiler_records_nothing(tmp_path):
+    profiler = StageProfiler(enabled=False)
+    profiler.start()
+    profiler.mark("load")
+    profiler.stop()
+    assert profiler.stages == []
+    assert profiler.summary_lines() == []
+    assert profiler.write_report(str(tmp_path)) is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_stages_and_report(tmp_path):
+    profiler = StageProfiler(enabled=True)
+    profiler.start()
+    data = [0] * 100_000
+    profiler.mark("load")
+    sum(data)
+    profiler.mark("od")
+    profiler.stop()
+    profiler.stop()  # Повторная остановка безопасна
+
+    assert [stage for stage, *_ in profiler.stages] == ["load", "od"]
+    assert profiler.stages[0][2] > 0  # Память, выделенная под data, отнесена к этапу load
+    assert len(profiler.summary_lines()) == 2
+
+    report = profiler.write_report(str(tmp_path))
+    assert report == os.path.join(str(tmp_path), "profile.txt")
+    assert os.path.isfile(os.path.join(str(tmp_path), "profile.prof"))
+    with open(report, encoding="utf-8") as f:
+        text = f.read()
+    assert "load" in text and "od" in text
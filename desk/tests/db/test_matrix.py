@@ -0,0 +1,60 @@
+# desk/tests/db/test_matrix.py
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from desk.src.db import matrix
+
+
+@pytest.fixture
+def matrix_session():
+    """Сессия на чистой БД в памяти со схемой моделей."""
+    engine = create_engine('sqlite:///:memory:')
+    matrix.OverlapCoefficient.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, autoflush=False)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def test_save_overlap_coefficients_upserts_in_one_call(matrix_session):
+    matrix.save_overlap_coefficients(matrix_session, {("s1", "c1"): 0.5, ("s1", "c2"): 1.0})
+    matrix.save_overlap_coefficients(matrix_session, {("s1", "c1"): 0.25, ("s2", "c1"): 2.0})
+
+    coefs = matrix.load_overlap_coefficients(matrix_session, ["s1", "s2"])
+    assert coefs == {("s1", "c1"): 0.25, ("s1", "c2"): 1.0, ("s2", "c1"): 2.0}
+    assert matrix_session.query(matrix.OverlapCoefficient).count() == 3
+
+
+def test_save_overlap_coefficients_notifies_changed_spectra(matrix_session):
+    changed = []
+    matrix.subscribe_matrix_changed(changed.append)
+    try:
+        matrix.save_overlap_coefficients(matrix_session, {("s1", "c1"): 0.5, ("s2", "c1"): 0.1})
+        matrix.save_overlap_coefficients(matrix_session, {})
+    finally:
+        matrix.unsubscribe_matrix_changed(changed.append)
+
+    assert changed == [{"s1", "s2"}]
+
+
+def test_init_overlap_index_removes_duplicates():
+    """В старой БД без уникального индекса дубликаты удаляются, остаётся последняя запись."""
+    engine = create_engine('sqlite:///:memory:')
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE overlap_coefficients (id VARCHAR(36) PRIMARY KEY, spectrum_id VARCHAR(36) NOT NULL,"
+            " chromophore_id VARCHAR(36) NOT NULL, coefficient FLOAT NOT NULL)"
+        ))
+        conn.execute(text(
+            "INSERT INTO overlap_coefficients VALUES ('a', 's1', 'c1', 0.1), ('b', 's1', 'c1', 0.2), ('c', 's1', 'c2', 0.3)"
+        ))
+
+    matrix.init_overlap_index(engine)
+
+    session = sessionmaker(bind=engine)()
+    assert matrix.load_overlap_coefficients(session, ["s1"]) == {("s1", "c1"): 0.2, ("s1", "c2"): 0.3}
+    session.close()
+    engine.dispose()
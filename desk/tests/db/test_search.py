@@ -0,0 +1,121 @@
+# desk/tests/db/test_search.py
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from desk.src.db import search
+
+
+@pytest.fixture
+def search_session():
+    """Сессия на чистой БД в памяти с полнотекстовым индексом пациентов."""
+    engine = create_engine('sqlite:///:memory:')
+    search.Patient.metadata.create_all(engine)
+    fts = search.init_patient_search(engine)
+    session = sessionmaker(bind=engine, autoflush=False)()
+    try:
+        yield session, fts
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def add_patients(session, *patients):
+    for full_name, notes, org in patients:
+        session.add(search.Patient(full_name=full_name, birth_date=date(1990, 1, 1), notes=notes, organization_id=org))
+    session.commit()
+
+
+def test_make_match_query_uses_prefix_terms():
+    assert search.make_match_query("  иван  пет ") == '"иван"* "пет"*'
+    assert search.make_match_query('a"b') == '"a""b"*'
+
+
+def test_search_by_name_prefix_and_notes(search_session):
+    session, _ = search_session
+    add_patients(
+        session,
+        ("Иванов Иван", "аллергия", None),
+        ("Петров Пётр", None, None),
+        ("Сидорова Анна", "ожог правой руки", None),
+    )
+
+    names = [p.full_name for p in search.fetch_patients(session, search="иван")]
+    assert names == ["Иванов Иван"]
+
+    names = [p.full_name for p in search.fetch_patients(session, search="ожог")]
+    assert names == ["Сидорова Анна"]
+    assert search.count_patients(session, search="ожог") == 1
+
+
+def test_search_index_follows_updates_and_deletes(search_session):
+    session, fts = search_session
+    if not fts:
+        pytest.skip("SQLite собран без FTS5")
+    add_patients(session, ("Иванов Иван", None, None))
+    patient = session.query(search.Patient).one()
+
+    patient.full_name = "Смирнов Иван"
+    session.commit()
+    assert search.count_patients(session, search="иванов") == 0
+    assert search.count_patients(session, search="смирнов") == 1
+
+    session.delete(patient)
+    session.commit()
+    assert search.count_patients(session, search="смирнов") == 0
+
+
+def test_search_survives_rowid_renumbering(search_session):
+    """Неявный rowid пациентов может смениться (VACUUM) — индекс связан с ними по id."""
+    session, fts = search_session
+    if not fts:
+        pytest.skip("SQLite собран без FTS5")
+    add_patients(session, ("Иванов Иван", None, None), ("Петров Пётр", None, None))
+    session.execute(text("UPDATE patients SET rowid = 1000 - rowid"))
+    session.commit()
+
+    names = [p.full_name for p in search.fetch_patients(session, search="петров")]
+    assert names == ["Петров Пётр"]
+
+
+def test_legacy_rowid_index_is_rebuilt(tmp_path):
+    """Индекс прежнего формата (по rowid) пересоздаётся и заполняется по id."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    search.Patient.metadata.create_all(engine)
+    with engine.begin() as conn:
+        try:
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE {search.FTS_TABLE} USING fts5("
+                f"full_name, notes, content='patients', content_rowid='rowid')"
+            ))
+        except Exception:
+            pytest.skip("SQLite собран без FTS5")
+    session = sessionmaker(bind=engine, autoflush=False)()
+    try:
+        add_patients(session, ("Иванов Иван", None, None))
+        assert search.init_patient_search(engine)
+        assert [p.full_name for p in search.fetch_patients(session, search="иван")] == ["Иванов Иван"]
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def test_fetch_patients_pages_sorted_within_organization(search_session):
+    session, _ = search_session
+    add_patients(
+        session,
+        ("Б", None, "org-1"),
+        ("А", None, "org-1"),
+        ("В", None, "org-1"),
+        ("Г", None, "org-2"),
+    )
+
+    first = search.fetch_patients(session, "org-1", limit=2)
+    rest = search.fetch_patients(session, "org-1", offset=2, limit=2)
+    assert [p.full_name for p in first + rest] == ["А", "Б", "В"]
+
+    desc = search.fetch_patients(session, "org-1", sort_column=0, descending=True)
+    assert [p.full_name for p in desc] == ["В", "Б", "А"]
+    assert search.count_patients(session, "org-2") == 1
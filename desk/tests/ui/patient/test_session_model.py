@@ -0,0 +1,51 @@
+# desk/tests/ui/patient/test_session_model.py
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from desk.src.ui.patient import session_model
+
+
+@pytest.fixture
+def model(qtbot, monkeypatch):
+    """Модель списка сеансов поверх чистой БД в памяти."""
+    engine = create_engine('sqlite:///:memory:')
+    session_model.Session.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False)
+
+    @contextmanager
+    def get_db_session():
+        session = SessionLocal()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    monkeypatch.setattr(session_model, "get_db_session", get_db_session)
+    yield session_model.SessionTableModel(), get_db_session
+    engine.dispose()
+
+
+def test_reload_session_replaces_cached_row(model):
+    """После изменения сеанса в БД кеш модели обновляется точечно."""
+    sessions, get_db_session = model
+    with get_db_session() as db:
+        db.add(session_model.Session(id="s1", patient_id="p1", device_binding_id="b1", operator_id="u1", notes="до"))
+        db.commit()
+    sessions.set_patient("p1")
+    assert sessions.session_at(0).notes == "до"
+
+    with get_db_session() as db:
+        db.get(session_model.Session, "s1").notes = "после"
+        db.commit()
+    assert sessions.session_at(0).notes == "до"  # Кеш ещё не знает об изменении
+
+    fresh = sessions.reload_session("s1")
+    assert fresh.notes == "после"
+    assert sessions.session_at(0) is fresh
+    sessions.set_patient(None)
+    sessions.set_patient("p1")
+    assert sessions.session_at(0).notes == "после"
+    assert sessions.reload_session("missing") is None
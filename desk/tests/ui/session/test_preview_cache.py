@@ -0,0 +1,97 @@
+# desk/tests/ui/session/test_preview_cache.py
+import os
+
+from PyQt6.QtCore import QThread, QSize
+from PyQt6.QtGui import QImage, QPixmap, QColor
+
+from desk.src.ui.session.preview_cache import PreviewCache, PreviewLoader, preview_key, load_scaled_image
+
+
+def test_preview_cache_evicts_least_recently_used(qtbot):
+    """Кеш вытесняет самую давно использованную запись."""
+    cache = PreviewCache(capacity=2)
+    cache.put("a", QPixmap(1, 1))
+    cache.put("b", QPixmap(1, 1))
+
+    assert cache.get("a") is not None  # "a" становится недавно использованной
+    cache.put("c", QPixmap(1, 1))
+
+    assert "a" in cache
+    assert "c" in cache
+    assert "b" not in cache
+    assert len(cache) == 2
+
+
+def test_preview_cache_ignores_missing_key(qtbot):
+    """Запись без ключа (файл не найден) в кеш не попадает."""
+    cache = PreviewCache()
+    cache.put(None, QPixmap(1, 1))
+    assert len(cache) == 0
+    assert cache.get(None) is None
+
+
+def test_preview_key_changes_with_file_and_size(tmp_path):
+    """Ключ зависит от mtime, размера файла и целевого размера."""
+    path = tmp_path / "img.bin"
+    path.write_bytes(b"1")
+    key = preview_key(str(path), 320, 240)
+
+    assert key is not None
+    assert preview_key(str(path), 160, 120) != key
+
+    path.write_bytes(b"12")
+    os.utime(path, ns=(key[1] + 1_000_000_000, key[1] + 1_000_000_000))
+    assert preview_key(str(path), 320, 240) != key
+
+    assert preview_key(str(tmp_path / "missing.png"), 320, 240) is None
+
+
+def test_load_scaled_image_keeps_aspect_ratio(qtbot, tmp_path):
+    """Изображение уменьшается до целевого размера с сохранением пропорций."""
+    path = str(tmp_path / "big.png")
+    image = QImage(1920, 1080, QImage.Format.Format_RGB32)
+    image.fill(QColor("red"))
+    assert image.save(path)
+
+    scaled = load_scaled_image(path, 320, 240)
+
+    assert not scaled.isNull()
+    assert scaled.width() == 320
+    assert scaled.height() == 180
+
+
+def test_preview_loader_reports_unreadable_file(qtbot, tmp_path):
+    """О файле, который не удалось декодировать, сообщает сигнал failed."""
+    path = tmp_path / "broken.jpg"
+    path.write_bytes(b"not an image")
+    thread = QThread()
+    thread.start()
+    loader = PreviewLoader(thread)
+    try:
+        with qtbot.waitSignal(loader.failed, timeout=5000) as blocker:
+            assert loader.get(str(path), QSize(320, 240)) is None
+        assert blocker.args == [str(path)]
+        assert len(loader.cache) == 0
+    finally:
+        thread.quit()
+        thread.wait()
+
+
+def test_preview_loader_releases_pending_key_of_removed_file(qtbot, tmp_path):
+    """Если файл удалён до декодирования, запрос снимается с ожидания по исходному ключу."""
+    path = tmp_path / "removed.png"
+    image = QImage(40, 30, QImage.Format.Format_RGB32)
+    image.fill(QColor("red"))
+    image.save(str(path))
+    thread = QThread()
+    thread.start()
+    loader = PreviewLoader(thread)
+    try:
+        key = preview_key(str(path), 320, 240)
+        os.remove(path)
+        with qtbot.waitSignal(loader.failed, timeout=5000):
+            loader._enqueue(key)
+        assert key not in loader._pending
+    finally:
+        thread.quit()
+        thread.wait()
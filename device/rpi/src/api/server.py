@@ -1,11 +1,18 @@
 import os
-from typing import List
+import asyncio
+import hashlib
+import datetime
+from typing import List, Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Depends, Request, Response, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import FileResponse
 from pydantic import BaseModel
+from sqlalchemy import or_, and_
+from sqlalchemy.orm import Session, selectinload
 
-from models.db import SessionLocal, PhotoTask, Photo, init_db
+from models.db import SessionLocal, PhotoTask, Photo, init_db, get_db
+from services import task_events
 
 app = FastAPI()
 
@@ -23,6 +30,92 @@ class PhotoTaskOut(BaseModel):
     spectra: List[int]
     status: str
 
+class PhotoOut(BaseModel):
+    # Фото задачи: спектр, ссылка для скачивания, время съёмки
+    spectrum_id: str
+    download_url: str
+    taken_at: Optional[datetime.datetime] = None
+
+class PhotoTaskChangeOut(PhotoTaskOut):
+    # Изменённая задача вместе с фото — всё, что нужно клиенту, одним запросом
+    updated_at: Optional[datetime.datetime] = None
+    photos: List[PhotoOut] = []
+
+class TaskChangesOut(BaseModel):
+    # Порция изменений: задачи, курсор для следующего запроса, есть ли ещё изменения
+    tasks: List[PhotoTaskChangeOut]
+    cursor: Optional[str] = None
+    has_more: bool = False
+
+# ----------------------- Инкрементальная синхронизация ----------------------------
+
+# Ограничения размера страницы и времени ожидания long-poll (сек)
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+EVENTS_MAX_TIMEOUT = 60
+
+def encode_cursor(task):
+    """ Курсор — позиция последней отданной задачи в порядке (updated_at, id) """
+    return f"{task.updated_at.isoformat()}|{task.id}"
+
+def decode_cursor(cursor):
+    try:
+        updated_at, task_id = cursor.split("|", 1)
+        return datetime.datetime.fromisoformat(updated_at), task_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+
+def photo_out(task_id, photo):
+    return PhotoOut(
+        spectrum_id=photo.spectrum_id,
+        download_url=f"/tasks/{task_id}/photos/{photo.spectrum_id}/download",
+        taken_at=photo.taken_at,
+    )
+
+def load_task_changes(db, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Задачи, изменённые после курсора, с их фото (фото подгружаются одним запросом).
+    Без курсора возвращаются все задачи с начала.
+    """
+    query = db.query(PhotoTask).options(selectinload(PhotoTask.photos))
+    if cursor:
+        updated_at, task_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            PhotoTask.updated_at > updated_at,
+            and_(PhotoTask.updated_at == updated_at, PhotoTask.id > task_id),
+        ))
+    tasks = query.order_by(PhotoTask.updated_at, PhotoTask.id).limit(limit + 1).all()
+    has_more = len(tasks) > limit
+    tasks = tasks[:limit]
+    return TaskChangesOut(
+        tasks=[
+            PhotoTaskChangeOut(
+                id=t.id, title=t.title, spectra=t.spectra, status=t.status, updated_at=t.updated_at,
+                photos=[photo_out(t.id, p) for p in sorted(t.photos, key=lambda p: p.spectrum_id)],
+            )
+            for t in tasks
+        ],
+        cursor=encode_cursor(tasks[-1]) if tasks else cursor,
+        has_more=has_more,
+    )
+
+def load_task_changes_once(cursor, limit):
+    db = SessionLocal()
+    try:
+        return load_task_changes(db, cursor, limit)
+    finally:
+        db.close()
+
+# Ожидающие long-poll запросы: asyncio.Event и цикл событий, в котором его нужно выставить
+_event_waiters = set()
+
+def _wake_waiters(event, task_id):
+    """ Подписчик шины событий: будит ожидающие /events запросы (вызывается из любого потока) """
+    for loop, waiter in list(_event_waiters):
+        loop.call_soon_threadsafe(waiter.set)
+
+task_events.subscribe(_wake_waiters)
+
 # ----------------------- API эндпойнты ----------------------------
 
 @app.api_route("/", methods=["GET", "HEAD"])
@@ -33,123 +126,182 @@ def root():
     return {"status": "ok"}
 
 @app.get("/tasks", response_model=List[PhotoTaskOut])
-def list_tasks():
+def list_tasks(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
     """
-    Получить список всех задач.
-    Возвращает все задачи с их спектрами и статусами.
+    Получить список задач.
+    Возвращает задачи с их спектрами и статусами; limit/offset — постраничная выдача
+    (без limit — все задачи, как раньше).
     """
-    db = SessionLocal()
-    try:
-        tasks = db.query(PhotoTask).all()
-        # Поскольку spectra хранится как JSON-список dict'ов, отдаём его как есть
-        result = [
-            PhotoTaskOut(id=task.id, title=task.title, spectra=task.spectra, status=task.status)
-            for task in tasks
-        ]
-        return result
-    finally:
-        db.close()
+    query = db.query(PhotoTask).order_by(PhotoTask.created_at, PhotoTask.id)
+    if limit is not None:
+        query = query.offset(offset).limit(limit)
+    tasks = query.all()
+    # Поскольку spectra хранится как JSON-список dict'ов, отдаём его как есть
+    return [
+        PhotoTaskOut(id=task.id, title=task.title, spectra=task.spectra, status=task.status)
+        for task in tasks
+    ]
 
 @app.post("/tasks", response_model=PhotoTaskOut)
-def create_task(task: PhotoTaskIn):
+def create_task(task: PhotoTaskIn, db: Session = Depends(get_db)):
     """
     Создать новую задачу (серия спектров).
     - title: строка (название задачи)
     - spectra: список объектов {"id": ..., "rgb": [...]}
     """
-    db = SessionLocal()
+    obj = PhotoTask(title=task.title, spectra=task.spectra)
+    db.add(obj)
+    db.commit()
+    db.refresh(obj)
+    task_events.publish(task_events.TASK_CREATED, obj.id)
+    return PhotoTaskOut(
+        id=obj.id, title=obj.title, spectra=obj.spectra, status=obj.status
+    )
+
+@app.get("/tasks/changes", response_model=TaskChangesOut)
+def list_task_changes(
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    """
+    Инкрементальная синхронизация: задачи (вместе с фото), изменённые после курсора.
+    Клиент сохраняет cursor из ответа и передаёт его в следующий запрос;
+    has_more=true — изменения не поместились в страницу, нужно запросить ещё.
+    """
+    return load_task_changes(db, cursor, limit)
+
+@app.get("/events", response_model=TaskChangesOut)
+async def wait_task_events(
+    cursor: Optional[str] = None,
+    timeout: float = Query(25, ge=0, le=EVENTS_MAX_TIMEOUT),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    """
+    Long-poll: если после курсора есть изменения — сразу возвращает их,
+    иначе ждёт события задачи (создание, удаление, завершение съёмки) до timeout секунд.
+    Пустой список задач в ответе означает, что за время ожидания ничего не изменилось.
+    """
+    waiter = asyncio.Event()
+    entry = (asyncio.get_running_loop(), waiter)
+    # Регистрируемся до первой проверки, чтобы не пропустить событие между ними
+    _event_waiters.add(entry)
     try:
-        obj = PhotoTask(title=task.title, spectra=task.spectra)
-        db.add(obj)
-        db.commit()
-        db.refresh(obj)
-        return PhotoTaskOut(
-            id=obj.id, title=obj.title, spectra=obj.spectra, status=obj.status
-        )
+        changes = await run_in_threadpool(load_task_changes_once, cursor, limit)
+        if changes.tasks or timeout == 0:
+            return changes
+        try:
+            await asyncio.wait_for(waiter.wait(), timeout)
+        except asyncio.TimeoutError:
+            return changes
     finally:
-        db.close()
+        _event_waiters.discard(entry)
+    return await run_in_threadpool(load_task_changes_once, cursor, limit)
 
 @app.delete("/tasks/{task_id}")
-def delete_task(task_id: str):
+def delete_task(task_id: str, db: Session = Depends(get_db)):
     """
     Удалить задачу и все связанные с ней фото.
     """
-    db = SessionLocal()
-    try:
-        task = db.query(PhotoTask).get(task_id)
-        if not task:
-            raise HTTPException(status_code=404, detail="Задача не найдена")
-        # Если есть каскад в модели, можно удалить только task
-        db.query(Photo).filter(Photo.task_id == task_id).delete()
-        db.delete(task)
-        db.commit()
-        return {"ok": True}
-    finally:
-        db.close()
+    task = db.get(PhotoTask, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    # Если есть каскад в модели, можно удалить только task
+    db.query(Photo).filter(Photo.task_id == task_id).delete()
+    db.delete(task)
+    db.commit()
+    task_events.publish(task_events.TASK_DELETED, task_id)
+    return {"ok": True}
 
-@app.get("/tasks/{task_id}/photos")
-def get_photos(task_id: str):
+@app.get("/tasks/{task_id}/photos", response_model=List[PhotoOut])
+def get_photos(
+    task_id: str,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
     """
-    Получить список фото по задаче.
+    Получить список фото по задаче (limit/offset — постраничная выдача).
     Возвращает список словарей:
     - spectrum_id: id спектра из справочника
     - download_url: относительный путь для скачивания через API
+    - taken_at: время съёмки
     """
-    db = SessionLocal()
-    try:
-        photos = db.query(Photo).filter(Photo.task_id == task_id).order_by(Photo.spectrum_id).all()
-        result = []
-        for p in photos:
-            result.append({
-                "spectrum_id": p.spectrum_id,
-                "download_url": f"/tasks/{task_id}/photos/{p.spectrum_id}/download"
-            })
-        return result
-    finally:
-        db.close()
+    query = db.query(Photo).filter(Photo.task_id == task_id).order_by(Photo.spectrum_id)
+    if limit is not None:
+        query = query.offset(offset).limit(limit)
+    return [photo_out(task_id, p) for p in query.all()]
 
 @app.get("/tasks/{task_id}/status")
-def get_task_status(task_id: str):
+def get_task_status(task_id: str, db: Session = Depends(get_db)):
     """
     Получить статус задачи по её ID.
     Статус может быть, например: "pending", "completed"
     """
-    db = SessionLocal()
-    try:
-        task = db.query(PhotoTask).get(task_id)
-        if not task:
-            raise HTTPException(status_code=404, detail="Задача не найдена")
-        return {"id": task.id, "title": task.title, "status": task.status}
-    finally:
-        db.close()
+    task = db.get(PhotoTask, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    return {"id": task.id, "title": task.title, "status": task.status}
+
+def make_etag(stat_result):
+    """
+    ETag файла по времени изменения и размеру: меняется при перезаписи снимка.
+    """
+    return '"' + hashlib.md5(f"{stat_result.st_mtime_ns}-{stat_result.st_size}".encode()).hexdigest() + '"'
+
+def etag_matches(if_none_match, etag):
+    """
+    Проверка заголовка If-None-Match (список ETag через запятую, возможно слабых, или "*").
+    """
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
 
 @app.get("/tasks/{task_id}/photos/{spectrum_id}/download")
-def download_photo(task_id: str, spectrum_id: str):
+def download_photo(task_id: str, spectrum_id: str, request: Request, db: Session = Depends(get_db)):
     """
     Скачать фото по идентификатору спектра (spectrum_id), если задача завершена.
     - Проверяет, что задача существует и завершена.
     - Находит фото с этим спектром.
-    - Если файл существует — возвращает его с корректным именем и типом.
+    - Если снимок не изменился (If-None-Match совпал с ETag) — отвечает 304 без тела.
+    - Иначе отдаёт файл потоково; заголовок Range позволяет докачать часть файла (206).
     """
-    db = SessionLocal()
+    task = db.get(PhotoTask, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    if task.status != "completed":
+        raise HTTPException(status_code=400, detail="Задача ещё не завершена")
+    # Ищем фото с нужным spectrum_id (индекс по task_id + spectrum_id)
+    photo = db.query(Photo).filter(Photo.task_id == task_id, Photo.spectrum_id == spectrum_id).first()
+    if not photo:
+        raise HTTPException(status_code=404, detail="Фото не найдено")
     try:
-        task = db.query(PhotoTask).get(task_id)
-        if not task:
-            raise HTTPException(status_code=404, detail="Задача не найдена")
-        if task.status != "completed":
-            raise HTTPException(status_code=400, detail="Задача ещё не завершена")
-        # Ищем фото с нужным spectrum_id
-        photo = db.query(Photo).filter(Photo.task_id == task_id, Photo.spectrum_id == spectrum_id).first()
-        if not photo or not os.path.exists(photo.path):
-            raise HTTPException(status_code=404, detail="Фото не найдено")
-        fname = os.path.basename(photo.path)
-        return FileResponse(photo.path, filename=fname, media_type="image/jpeg")
-    finally:
-        db.close()
+        stat_result = os.stat(photo.path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Фото не найдено")
+
+    etag = make_etag(stat_result)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    fname = os.path.basename(photo.path)
+    # FileResponse читает файл асинхронно частями и обрабатывает Range
+    return FileResponse(
+        photo.path,
+        filename=fname,
+        media_type="image/jpeg",
+        stat_result=stat_result,
+        headers={"ETag": etag},
+    )
 
 # -------------------- ВАЖНО --------------------
 # - Во всех ответах используется spectrum_id для идентификации фото.
 # - На клиенте для скачивания фото используйте download_url.
 # - В Photo должны быть поля: task_id, spectrum_id (id справочника спектров), path (путь к файлу).
 # - В PhotoTask.spectra хранится список объектов с id и rgb, чтобы знать параметры и порядок спектров для задачи.
-# - Все доступы к БД обёрнуты в try/finally для гарантированного закрытия сессии.
+# - Сессия БД выдаётся зависимостью get_db и закрывается после ответа.
@@ -13,6 +13,11 @@ if not os.path.exists(PHOTO_DIR):
 
 ICON_DIR = os.path.join(BASE_DIR, 'assets', 'icons')
 
+# Уменьшенные копии снимков для галереи (хранятся в подпапке задачи)
+PREVIEW_DIR_NAME = 'previews'
+PREVIEW_SIZE = (800, 450)
+PREVIEW_JPEG_QUALITY = 80
+
 def icon_path(name):
     """
     Возвращает путь к иконке с именем name. Цвет иконок: #018073
@@ -1,7 +1,7 @@
 import os
 import datetime
 import uuid
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, create_engine
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, create_engine, event, Index, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
 
@@ -12,17 +12,40 @@ from sqlalchemy.orm import relationship, sessionmaker
 Base = declarative_base()
 
 DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "tasks.db"))
-engine = create_engine(f"sqlite:///{DB_PATH}", connect_args={"check_same_thread": False})
+# Ожидание блокировки (сек): БД одновременно используют процесс интерфейса и процесс API
+DB_BUSY_TIMEOUT = 5
+engine = create_engine(
+    f"sqlite:///{DB_PATH}",
+    connect_args={"check_same_thread": False, "timeout": DB_BUSY_TIMEOUT},
+)
 SessionLocal = sessionmaker(bind=engine)
 
+
+@event.listens_for(engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Настройки SQLite для работы из двух процессов:
+    WAL — читатели не блокируют писателя; synchronous=NORMAL достаточно для WAL
+    и не делает fsync на каждую транзакцию (важно для SD-карты).
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT * 1000}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-8000")  # ~8 МБ
+    cursor.close()
+
 class PhotoTask(Base):
     """
-    Модель задачи на фотосессию: название, список спектров, статус, время создания.
+    Модель задачи на фотосессию: название, список спектров, статус, время создания и изменения.
     """
     __tablename__ = 'photo_tasks'
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     title = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # Время последнего изменения — курсор инкрементальной синхронизации (/tasks/changes, /events)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow, index=True)
     spectra = Column(JSON, nullable=False) # [470, 660, 810]
     status = Column(String, default="pending")  # pending/completed
     photos = relationship("Photo", back_populates="task", cascade="all, delete-orphan")
@@ -40,8 +63,40 @@ class Photo(Base):
 
     task = relationship("PhotoTask", back_populates="photos")
 
+    __table_args__ = (
+        # Фото ищутся по задаче и спектру (скачивание, список фото задачи)
+        Index("ix_photos_task_id_spectrum_id", "task_id", "spectrum_id"),
+    )
+
 def init_db():
     """
     Инициализация БД: создание всех таблиц при первом запуске.
+    Индексы создаются отдельно: create_all не добавляет их в уже существующие таблицы.
     """
     Base.metadata.create_all(engine)
+    _add_missing_columns()
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+def _add_missing_columns():
+    """
+    Простейшая миграция для БД, созданных до появления новых колонок.
+    """
+    columns = {c["name"] for c in inspect(engine).get_columns("photo_tasks")}
+    if "updated_at" not in columns:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE photo_tasks ADD COLUMN updated_at DATETIME"))
+            conn.execute(text("UPDATE photo_tasks SET updated_at = created_at"))
+
+
+def get_db():
+    """
+    Зависимость FastAPI: сессия БД на время запроса, закрывается после ответа.
+    """
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
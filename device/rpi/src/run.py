@@ -1,46 +1,128 @@
 import os
 os.environ['LIBGL_DEBUG'] = 'quiet'
 import sys
-import threading
-
-from models.db import init_db
-
-from PyQt5.QtWidgets import QApplication
-from PyQt5.QtCore import Qt, QTimer
-from ui.main import CameraApp
-
-import signal
+import time
+import multiprocessing
 
+import logging
 import logging.config
 from config.logging import LOGGING
 
 logging.config.dictConfig(LOGGING)
+logger = logging.getLogger(__name__)
 
-def handle_sigint(*args):
-    QApplication.quit()
+# Период проверки процесса API и ограничения паузы перед его перезапуском
+API_CHECK_INTERVAL = 2000
+API_RESTART_MIN_DELAY = 1.0
+API_RESTART_MAX_DELAY = 30.0
 
-signal.signal(signal.SIGINT, handle_sigint)
+# PyQt и камера импортируются только в main(): процесс API запускается методом spawn
+# и импортирует этот модуль заново — ему они не нужны
 
-def start_api():
+
+def start_api(to_ui, from_ui):
     """
-    Запускает FastAPI-сервер в отдельном потоке.
+    Точка входа процесса API: FastAPI-сервер со своим GIL,
+    не мешающий предпросмотру и съёмке в процессе интерфейса.
     """
+    logging.config.dictConfig(LOGGING)
     import uvicorn
     from api.server import app
+    from services.ipc import EventChannel
+
+    channel = EventChannel(inbox=from_ui, outbox=to_ui)
+    channel.start()
     uvicorn.run(app, host="0.0.0.0", port=8080, log_level="info")
 
-if __name__ == "__main__":
+
+class ApiSupervisor:
+    """
+    Запускает процесс API и перезапускает его при падении с нарастающей паузой.
+    """
+    def __init__(self):
+        self.ctx = multiprocessing.get_context("spawn")
+        self.to_ui = self.ctx.Queue()
+        self.from_ui = self.ctx.Queue()
+        self.process = None
+        self.restart_delay = API_RESTART_MIN_DELAY
+        self.next_start = 0.0
+        self.started_at = 0.0
+        self.stopping = False
+
+    def start(self):
+        self.process = self.ctx.Process(
+            target=start_api, args=(self.to_ui, self.from_ui), name="device-api", daemon=True
+        )
+        self.process.start()
+        self.started_at = time.monotonic()
+        logger.info(f"Процесс API запущен, pid={self.process.pid}")
+
+    def check(self):
+        """Вызывается таймером: перезапускает процесс API, если он завершился."""
+        if self.stopping or (self.process is not None and self.process.is_alive()):
+            return
+        now = time.monotonic()
+        if self.next_start == 0.0:
+            code = self.process.exitcode if self.process is not None else None
+            # Процесс проработал долго — считаем падение случайным и сбрасываем паузу
+            if now - self.started_at > API_RESTART_MAX_DELAY:
+                self.restart_delay = API_RESTART_MIN_DELAY
+            logger.warning(f"Процесс API завершился (код {code}), перезапуск через {self.restart_delay:.0f} с")
+            self.next_start = now + self.restart_delay
+            self.restart_delay = min(self.restart_delay * 2, API_RESTART_MAX_DELAY)
+        if now >= self.next_start:
+            self.next_start = 0.0
+            self.start()
+
+    def stop(self):
+        self.stopping = True
+        if self.process is not None and self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout=3)
+            if self.process.is_alive():
+                self.process.kill()
+        logger.info("Процесс API остановлен")
+
+
+def main():
+    import signal
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import Qt, QTimer
+
+    from models.db import init_db
+    from services.ipc import EventChannel
+    from ui.main import CameraApp
+
+    def handle_sigint(*args):
+        QApplication.quit()
+
+    signal.signal(signal.SIGINT, handle_sigint)
 
     init_db()
-    # Стартуем API сервер в фоне
-    api_thread = threading.Thread(target=start_api, daemon=True)
-    api_thread.start()
+    # Стартуем API сервер в отдельном процессе под присмотром супервизора
+    supervisor = ApiSupervisor()
+    supervisor.start()
+    channel = EventChannel(inbox=supervisor.to_ui, outbox=supervisor.from_ui)
+    channel.start()
+
     # Стартуем PyQt-приложение
     app = QApplication(sys.argv)
     timer = QTimer()
     timer.timeout.connect(lambda: None)
     timer.start(100)
+    supervisor_timer = QTimer()
+    supervisor_timer.timeout.connect(supervisor.check)
+    supervisor_timer.start(API_CHECK_INTERVAL)
     app.setOverrideCursor(Qt.BlankCursor)
     win = CameraApp()
     win.showFullScreen()
-    sys.exit(app.exec_())
+    code = app.exec_()
+
+    supervisor_timer.stop()
+    channel.stop()
+    supervisor.stop()
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
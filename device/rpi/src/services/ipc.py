@@ -0,0 +1,60 @@
+import queue
+import threading
+import logging
+
+from services import task_events
+
+logger = logging.getLogger(__name__)
+
+"""
+Канал событий между процессом интерфейса и процессом API.
+Пересылает события шины task_events в соседний процесс через пару очередей multiprocessing
+и публикует пришедшие события в локальную шину.
+"""
+
+# Признак того, что текущий поток публикует событие, пришедшее из соседнего процесса
+_relay = threading.local()
+
+
+class EventChannel:
+    """
+    Двунаправленный канал событий задач между процессами.
+    inbox — очередь входящих событий, outbox — очередь исходящих.
+    """
+    def __init__(self, inbox, outbox):
+        self.inbox = inbox
+        self.outbox = outbox
+        self._thread = None
+
+    def start(self):
+        task_events.subscribe(self._forward)
+        self._thread = threading.Thread(target=self._receive, name="ipc-events", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        task_events.unsubscribe(self._forward)
+        if self._thread is not None:
+            self.inbox.put(None)
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _forward(self, event, task_id):
+        # Не отправляем обратно событие, которое только что пришло из соседнего процесса
+        if getattr(_relay, "active", False):
+            return
+        try:
+            self.outbox.put_nowait((event, task_id))
+        except queue.Full:
+            logger.warning(f"Очередь событий переполнена, событие {event} {task_id} пропущено")
+
+    def _receive(self):
+        while True:
+            item = self.inbox.get()
+            if item is None:
+                break
+            event, task_id = item
+            _relay.active = True
+            try:
+                task_events.publish(event, task_id)
+            finally:
+                _relay.active = False
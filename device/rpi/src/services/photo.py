@@ -4,7 +4,7 @@ import cv2
 import logging
 from datetime import datetime
 from models.db import SessionLocal, Photo
-from config.settings import PHOTO_DIR
+from config.settings import PHOTO_DIR, PREVIEW_DIR_NAME, PREVIEW_SIZE, PREVIEW_JPEG_QUALITY
 
 logger = logging.getLogger(__name__)
 
@@ -12,7 +12,8 @@ logger = logging.getLogger(__name__)
 Модуль для работы с фотографиями задач (и тестовой задачи):
 - сохранение кадра;
 - очистка всех фото задачи;
-- выборка путей к фото задачи (или тестовой задачи).
+- выборка путей к фото задачи (или тестовой задачи);
+- уменьшенные копии снимков (превью) для галереи.
 """
 
 def get_task_dir(task_id):
@@ -20,6 +21,47 @@ def get_task_dir(task_id):
         return os.path.join(PHOTO_DIR, "test_task")
     return os.path.join(PHOTO_DIR, f"task_{task_id}")
 
+def get_preview_path(photo_path):
+    """
+    Возвращает путь к превью снимка: <папка задачи>/previews/<имя снимка>
+    """
+    task_dir, filename = os.path.split(photo_path)
+    return os.path.join(task_dir, PREVIEW_DIR_NAME, filename)
+
+def _resize_for_preview(frame):
+    h, w = frame.shape[:2]
+    scale = min(PREVIEW_SIZE[0] / w, PREVIEW_SIZE[1] / h, 1.0)
+    if scale >= 1.0:
+        return frame
+    return cv2.resize(frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+
+def save_preview(photo_path, frame):
+    """
+    Сохраняет превью для уже снятого кадра (кадр берётся из памяти, без повторного чтения файла).
+    """
+    preview_path = get_preview_path(photo_path)
+    os.makedirs(os.path.dirname(preview_path), exist_ok=True)
+    cv2.imwrite(preview_path, _resize_for_preview(frame), [cv2.IMWRITE_JPEG_QUALITY, PREVIEW_JPEG_QUALITY])
+    return preview_path
+
+def ensure_preview(photo_path):
+    """
+    Возвращает путь к актуальному превью снимка, при необходимости создаёт его.
+    Превью считается актуальным, если оно не старше исходного файла.
+    Возвращает None, если снимок недоступен.
+    """
+    if not os.path.isfile(photo_path):
+        return None
+    preview_path = get_preview_path(photo_path)
+    if os.path.isfile(preview_path) and os.path.getmtime(preview_path) >= os.path.getmtime(photo_path):
+        return preview_path
+    # Декодер JPEG сразу читает кадр в половинном разрешении — вдвое меньше работы для CPU
+    frame = cv2.imread(photo_path, cv2.IMREAD_REDUCED_COLOR_2)
+    if frame is None:
+        logger.warning(f"Не удалось прочитать снимок для превью: {photo_path}")
+        return None
+    return save_preview(photo_path, frame)
+
 def clear_photos_for_task(task_id):
     """
     Удаляет все фото задачи (и записи в БД для обычных задач).
@@ -41,6 +83,9 @@ def clear_photos_for_task(task_id):
         db.delete(photo)
     db.commit()
     db.close()
+    preview_dir = os.path.join(task_dir, PREVIEW_DIR_NAME)
+    if os.path.isdir(preview_dir):
+        shutil.rmtree(preview_dir, ignore_errors=True)
     if os.path.isdir(task_dir):
         try:
             os.rmdir(task_dir)
@@ -60,15 +105,18 @@ def save_photo_for_task(task_id, frame, spectrum_id):
         filename = f"spectrum_{spectrum_id}_{timestamp}.jpg"
         path = os.path.join(task_dir, filename)
         cv2.imwrite(path, frame)
+        save_preview(path, frame)
         return path
 
     filename = f"spectrum_{spectrum_id}.jpg"
     path = os.path.join(task_dir, filename)
     cv2.imwrite(path, frame)
+    save_preview(path, frame)
     db = SessionLocal()
     photo = db.query(Photo).filter(Photo.task_id == task_id, Photo.spectrum_id == spectrum_id).first()
     if photo:
         photo.path = path
+        photo.taken_at = datetime.utcnow()
     else:
         photo = Photo(task_id=task_id, path=path, spectrum_id=spectrum_id)
         db.add(photo)
@@ -0,0 +1,27 @@
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot, Qt
+from PyQt5.QtGui import QImage
+import logging
+
+from services.photo import ensure_preview
+
+logger = logging.getLogger(__name__)
+
+
+class PreviewWorker(QObject):
+    """
+    Воркер галереи: в фоновом потоке готовит превью снимка (создаёт при отсутствии),
+    декодирует и масштабирует его под размер окна просмотра.
+    """
+    loaded = pyqtSignal(str, int, int, QImage)  # путь к снимку, ширина и высота окна, изображение
+
+    @pyqtSlot(str, int, int)
+    def load(self, photo_path, width, height):
+        try:
+            preview_path = ensure_preview(photo_path)
+            image = QImage(preview_path) if preview_path else QImage()
+            if not image.isNull() and width > 0 and height > 0:
+                image = image.scaled(width, height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        except Exception as e:
+            logger.exception(f"Ошибка подготовки превью {photo_path}: {e}")
+            image = QImage()
+        self.loaded.emit(photo_path, width, height, image)
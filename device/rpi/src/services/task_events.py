@@ -0,0 +1,58 @@
+import threading
+import logging
+
+from sqlalchemy import func
+
+from models.db import PhotoTask
+
+logger = logging.getLogger(__name__)
+
+"""
+Шина событий об изменении задач.
+API публикует события о создании/удалении задач, интерфейс подписывается на них
+и обновляет список задач точечно, без периодического перечитывания всей таблицы.
+Модуль не зависит от Qt: подписчик сам переносит событие в свой поток.
+"""
+
+TASK_CREATED = "created"
+TASK_UPDATED = "updated"
+TASK_DELETED = "deleted"
+
+_listeners = []
+_lock = threading.Lock()
+
+
+def subscribe(callback):
+    """
+    Подписывает callback(event, task_id) на события задач.
+    """
+    with _lock:
+        _listeners.append(callback)
+
+
+def unsubscribe(callback):
+    with _lock:
+        if callback in _listeners:
+            _listeners.remove(callback)
+
+
+def publish(event, task_id):
+    """
+    Рассылает событие всем подписчикам. Вызывается из потока API.
+    Ошибка подписчика не должна ломать обработку запроса.
+    """
+    with _lock:
+        listeners = list(_listeners)
+    for callback in listeners:
+        try:
+            callback(event, task_id)
+        except Exception as e:
+            logger.warning(f"Ошибка обработчика события задачи {event} {task_id}: {e}")
+
+
+def get_tasks_signature(db):
+    """
+    Дешёвая «подпись» таблицы задач для резервной проверки изменений:
+    количество задач и время создания последней.
+    """
+    return db.query(func.count(PhotoTask.id), func.max(PhotoTask.created_at)).one()
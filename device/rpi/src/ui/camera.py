@@ -9,9 +9,21 @@ import logging
 from PyQt5.QtWidgets import QWidget, QLabel, QVBoxLayout, QSizePolicy
 from PyQt5.QtCore import QTimer, Qt
 from PyQt5.QtGui import QImage, QPixmap
+from PyQt5 import sip
 
 logger = logging.getLogger(__name__)
 
+# Формат предпросмотра: 32-битный кадр напрямую соответствует QImage.Format_RGB32
+PREVIEW_FORMAT = "XRGB8888"
+PREVIEW_ASPECT = 16 / 9
+# Границы периода обновления предпросмотра, мс
+MIN_FRAME_INTERVAL_MS = 30
+MAX_FRAME_INTERVAL_MS = 150
+# Отрисовка должна занимать не больше 1 / RENDER_BUDGET_FACTOR периода таймера
+RENDER_BUDGET_FACTOR = 4
+RENDER_TIME_SMOOTHING = 0.2
+RECONFIGURE_DELAY_MS = 300
+
 
 class CameraWidget(QWidget):
     """Видеовиджет камеры: показывает поток и предоставляет кадры."""
@@ -22,7 +34,7 @@ class CameraWidget(QWidget):
         self.picam2 = Picamera2()
 
         self.preview_config = self.picam2.create_preview_configuration(
-            main={"format": "RGB888", "size": (640, 360)}
+            main={"format": PREVIEW_FORMAT, "size": (640, 360)}
         )
         self.capture_config = self.picam2.create_still_configuration(
             main={"format": "RGB888", "size": (1920, 1080)}  # подставь своё max
@@ -45,10 +57,12 @@ class CameraWidget(QWidget):
 
         # Виджет для отображения кадров
         self.label = QLabel()
-        # Прижимаем изображение к верху и по центру
-        self.label.setAlignment(Qt.AlignTop | Qt.AlignLeft)
+        # Прижимаем изображение к верху и по центру: кадр шире окна QLabel обрезает по центру сам
+        self.label.setAlignment(Qt.AlignTop | Qt.AlignHCenter)
         self.label.setScaledContents(False)
         self.label.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        # Размер pixmap не должен раздвигать окно
+        self.label.setMinimumSize(1, 1)
 
         layout = QVBoxLayout()
         layout.setContentsMargins(0, 6, 0, 6)
@@ -56,63 +70,93 @@ class CameraWidget(QWidget):
         layout.addWidget(self.label)
         self.setLayout(layout)
 
+        self._capturing = False
+        self._scaled_size = None
+        self._render_time = None
+
+        # Перенастройка размера потока после изменения размера окна
+        self.reconfigure_timer = QTimer()
+        self.reconfigure_timer.setSingleShot(True)
+        self.reconfigure_timer.timeout.connect(self.reconfigure_preview)
+
         # Таймер периодически обновляет кадр
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_frame)
-        self.timer.start(30)
+        self.timer.start(MIN_FRAME_INTERVAL_MS)
+
+    def preview_size_for_label(self):
+        """
+        Размер кадра предпросмотра под текущий label: высота равна высоте label
+        (режим "height" — растянуть по высоте и обрезать по ширине), пропорции 16:9.
+        """
+        height = max(self.label.height(), 2)
+        width = int(height * PREVIEW_ASPECT)
+        # ISP требует выравнивания ширины, высота должна быть чётной
+        return (width + 31) // 32 * 32, height // 2 * 2
 
-    def make_pixmap(self, label: QLabel, img: QImage, mode: str = "cover") -> QPixmap:
+    def schedule_reconfigure(self):
+        """Откладывает перенастройку предпросмотра, пока размер окна не перестанет меняться."""
+        self.reconfigure_timer.start(RECONFIGURE_DELAY_MS)
+
+    def reconfigure_preview(self):
         """
-        Масштабирует изображение под label.
-        mode:
-        - "cover"  : Заполнение по ширине, обрезка по высоте (default)
-        - "contain": Вписать полностью без обрезки (KeepAspectRatio)
-        - "width"  : Растянуть по ширине, центрировать и обрезать по высоте
-        - "height" : Растянуть по высоте, центрировать и обрезать по ширине
+        Перенастраивает поток предпросмотра под размер label, чтобы кадр не приходилось масштабировать.
         """
-        label_width = label.width()
-        label_height = label.height()
-        img_width = img.width()
-        img_height = img.height()
-
-        if mode == "cover" or mode == "width":
-            scale_factor = label_width / img_width
-            new_height = int(img_height * scale_factor)
-            scaled_img = img.scaled(label_width, new_height, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-            if new_height > label_height:
-                y_offset = (new_height - label_height) // 2
-                pixmap = QPixmap.fromImage(scaled_img).copy(0, y_offset, label_width, label_height)
-            else:
-                pixmap = QPixmap.fromImage(scaled_img)
-        elif mode == "height":
-            scale_factor = label_height / img_height
-            new_width = int(img_width * scale_factor)
-            scaled_img = img.scaled(new_width, label_height, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-            if new_width > label_width:
-                x_offset = (new_width - label_width) // 2
-                pixmap = QPixmap.fromImage(scaled_img).copy(x_offset, 0, label_width, label_height)
-            else:
-                pixmap = QPixmap.fromImage(scaled_img)
-        elif mode == "contain":
-            scaled_img = img.scaled(label_width, label_height, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-            pixmap = QPixmap.fromImage(scaled_img)
-        else:
-            # Fallback — обычное поведение
-            scaled_img = img.scaled(label_width, label_height, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-            pixmap = QPixmap.fromImage(scaled_img)
-        return pixmap
+        if self._capturing:
+            # Во время съёмки камеру не трогаем, повторим позже
+            self.schedule_reconfigure()
+            return
+        size = self.preview_size_for_label()
+        if size == tuple(self.preview_config["main"]["size"]):
+            return
+        config = self.picam2.create_preview_configuration(main={"format": PREVIEW_FORMAT, "size": size})
+        self.picam2.align_configuration(config)
+        self.picam2.stop()
+        self.picam2.configure(config)
+        self.picam2.start()
+        self.preview_config = config
+        self._scaled_size = None
+        logger.info(f"Предпросмотр перенастроен под окно: {config['main']['size']}")
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.schedule_reconfigure()
 
     def update_frame(self):
         """Считывает кадр с камеры и выводит его на экран."""
         frame = self.picam2.capture_array()
-        if frame is not None:
-            rgb = frame[..., ::-1]
-            h, w, ch = rgb.shape
-            img = QImage(rgb.tobytes(), w, h, ch * w, QImage.Format_RGB888)
+        if frame is None:
+            return
+        started = time.perf_counter()
+
+        # XRGB8888 в памяти лежит как B, G, R, X — это формат QImage.Format_RGB32,
+        # поэтому буфер оборачивается без перестановки каналов и копирования
+        h, w = frame.shape[:2]
+        img = QImage(sip.voidptr(frame.ctypes.data), w, h, frame.strides[0], QImage.Format_RGB32)
+
+        label_height = self.label.height()
+        if h != label_height and label_height > 0:
+            # Размер потока ещё не совпал с окном (окно меняется) — быстрое масштабирование
+            if self._scaled_size is None or self._scaled_size[1] != label_height:
+                self._scaled_size = (int(w * label_height / h), label_height)
+            img = img.scaled(*self._scaled_size, Qt.IgnoreAspectRatio, Qt.FastTransformation)
+
+        # fromImage копирует данные, поэтому кадр picamera2 можно отпускать
+        self.label.setPixmap(QPixmap.fromImage(img))
 
-            # crop=True — "cover", crop=False — стандартное поведение
-            pixmap = self.make_pixmap(self.label, img, mode = "height")
-            self.label.setPixmap(pixmap)
+        self.adapt_frame_rate(time.perf_counter() - started)
+
+    def adapt_frame_rate(self, render_time):
+        """
+        Подстраивает период таймера под измеренное время отрисовки,
+        чтобы предпросмотр не отнимал процессор у съёмки.
+        """
+        self._render_time = render_time if self._render_time is None else (
+            RENDER_TIME_SMOOTHING * render_time + (1 - RENDER_TIME_SMOOTHING) * self._render_time
+        )
+        interval = int(min(MAX_FRAME_INTERVAL_MS, max(MIN_FRAME_INTERVAL_MS, self._render_time * 1000 * RENDER_BUDGET_FACTOR)))
+        if abs(interval - self.timer.interval()) >= 5:
+            self.timer.setInterval(interval)
 
     def get_frame(self, spec):
         """
@@ -124,8 +168,12 @@ class CameraWidget(QWidget):
             "AnalogueGain": self.controls[spec][1]
         })
         # time.sleep(0.2)
-        self.wait_for_controls(self.controls[spec][0], self.controls[spec][1])
-        frame = self.picam2.switch_mode_and_capture_array(self.capture_config)
+        self._capturing = True
+        try:
+            self.wait_for_controls(self.controls[spec][0], self.controls[spec][1])
+            frame = self.picam2.switch_mode_and_capture_array(self.capture_config)
+        finally:
+            self._capturing = False
         return frame
 
     def wait_for_controls(self, target_exposure, target_gain, timeout=1.0):
@@ -142,4 +190,5 @@ class CameraWidget(QWidget):
     def close(self):
         """Останавливает камеру и освобождает ресурсы."""
         self.timer.stop()
+        self.reconfigure_timer.stop()
         self.picam2.close()
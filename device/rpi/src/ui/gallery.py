@@ -1,9 +1,10 @@
 from PyQt5.QtWidgets import (
-    QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QSizePolicy
+    QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QSizePolicy, QScrollArea
 )
 from PyQt5.QtGui import QPixmap, QIcon
-from PyQt5.QtCore import Qt, QSize, QTimer
+from PyQt5.QtCore import Qt, QSize, QThread, pyqtSignal
 from services.photo import get_photos_for_task
+from services.preview_worker import PreviewWorker
 from config.settings import icon_path
 import os
 import logging
@@ -14,12 +15,51 @@ logger = logging.getLogger(__name__)
 
 """
 Виджет галереи для просмотра фото выбранной задачи.
+Показывает уменьшенные превью (готовятся в фоновом потоке, соседние кадры — заранее),
+полный кадр открывается по нажатию на изображение.
 """
 
+# Сколько подготовленных превью держать в памяти (текущее и соседние)
+PREVIEW_CACHE_SIZE = 5
+
+
+class ClickableLabel(QLabel):
+    """
+    QLabel с сигналом нажатия (для тачскрина).
+    """
+    clicked = pyqtSignal()
+
+    def mouseReleaseEvent(self, event):
+        self.clicked.emit()
+        super().mouseReleaseEvent(event)
+
+
+class FullFrameWidget(QScrollArea):
+    """
+    Просмотр снимка в исходном разрешении с прокруткой.
+    """
+    def __init__(self, photo_path):
+        super().__init__()
+        self.setWindowTitle(os.path.basename(photo_path))
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        label = ClickableLabel()
+        label.setAlignment(Qt.AlignCenter)
+        pixmap = QPixmap(photo_path)
+        if pixmap.isNull():
+            label.setText("Ошибка загрузки")
+        else:
+            label.setPixmap(pixmap)
+        label.clicked.connect(self.close)
+        self.setWidget(label)
+        self.setWidgetResizable(True)
+
+
 class GalleryWidget(QWidget):
     """
     Окно галереи для просмотра фото по задаче.
     """
+    request_preview = pyqtSignal(str, int, int)
+
     def __init__(self, task_id):
         super().__init__()
         self.setWindowTitle("Галерея")
@@ -27,8 +67,21 @@ class GalleryWidget(QWidget):
         self.task_id = task_id
         self.photos = get_photos_for_task(task_id)
         self.index = 0
-
-        self.image_label = QLabel()
+        self.full_frame = None
+
+        # Кеш готовых превью: (путь, ширина, высота) -> QPixmap; порядок — по давности использования
+        self._cache = {}
+        self._pending = set()
+        self._preview_thread = QThread()
+        self._preview_worker = PreviewWorker()
+        self._preview_worker.moveToThread(self._preview_thread)
+        self.request_preview.connect(self._preview_worker.load)
+        self._preview_worker.loaded.connect(self.on_preview_loaded)
+        self._preview_thread.finished.connect(self._preview_worker.deleteLater)
+        self._preview_thread.start()
+
+        self.image_label = ClickableLabel()
+        self.image_label.clicked.connect(self.open_full_frame)
         self.image_label.setAlignment(Qt.AlignCenter)
         self.image_label.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred)
         self.image_label.setMaximumHeight(int(self.height() * 0.76))
@@ -95,8 +148,6 @@ class GalleryWidget(QWidget):
             self.next_btn.setEnabled(False)
             return
 
-        logger.info(f"Размеры label: {self.image_label.width()}x{self.image_label.height()}")
-
         # Убедимся, что индекс в допустимом диапазоне
         self.index = min(max(0, self.index), total - 1)
         photo_path = self.photos[self.index]
@@ -107,25 +158,85 @@ class GalleryWidget(QWidget):
             self.filename_label.setText(photo_path)
             self.image_label.setPixmap(QPixmap())
         else:
-            pixmap = QPixmap(photo_path)
-            if not pixmap.isNull():
-                label_w = self.image_label.width()
-                label_h = self.image_label.height()
-                logger.info(f"Размеры фото: {label_w}x{label_h}")
-                scaled = pixmap.scaled(
-                    label_w, label_h,
-                    Qt.KeepAspectRatio, Qt.SmoothTransformation
-                )
-                self.image_label.setPixmap(scaled)
+            pixmap = self._cached_preview(photo_path)
+            if pixmap is not None:
+                self.image_label.setPixmap(pixmap)
             else:
-                self.image_label.setText("Ошибка загрузки")
+                self.image_label.setText("Загрузка...")
+                self._request(photo_path)
             self.filename_label.setText(os.path.basename(photo_path))
+
+        # Заранее готовим соседние кадры, чтобы листание было мгновенным
+        for i in (self.index + 1, self.index - 1):
+            if 0 <= i < total:
+                self._request(self.photos[i])
         self.counter_label.setText(f"Фото {self.index + 1} / {total}")
 
         # Кнопки влево-вправо
         self.prev_btn.setEnabled(self.index > 0)
         self.next_btn.setEnabled(self.index < total - 1)
 
+    def _preview_key(self, photo_path):
+        return photo_path, self.image_label.width(), self.image_label.height()
+
+    def _cached_preview(self, photo_path):
+        key = self._preview_key(photo_path)
+        pixmap = self._cache.pop(key, None)
+        if pixmap is not None:
+            self._cache[key] = pixmap  # помечаем как недавно использованное
+        return pixmap
+
+    def _request(self, photo_path):
+        """
+        Заказывает превью у фонового потока, если его ещё нет в кеше и оно не готовится.
+        """
+        key = self._preview_key(photo_path)
+        if key in self._cache or key in self._pending or not os.path.isfile(photo_path):
+            return
+        self._pending.add(key)
+        self.request_preview.emit(*key)
+
+    def on_preview_loaded(self, photo_path, width, height, image):
+        """
+        Слот: фоновый поток подготовил превью.
+        """
+        key = (photo_path, width, height)
+        self._pending.discard(key)
+        if image.isNull():
+            if self.photos and self.photos[self.index] == photo_path:
+                self.image_label.setText("Ошибка загрузки")
+            return
+        self._cache[key] = QPixmap.fromImage(image)
+        while len(self._cache) > PREVIEW_CACHE_SIZE:
+            self._cache.pop(next(iter(self._cache)))
+        if self.photos and self.photos[self.index] == photo_path and key == self._preview_key(photo_path):
+            self.image_label.setPixmap(self._cache[key])
+
+    def open_full_frame(self):
+        """
+        Открывает текущий снимок в исходном разрешении.
+        """
+        if not self.photos:
+            return
+        photo_path = self.photos[self.index]
+        if not os.path.isfile(photo_path):
+            return
+        self.full_frame = FullFrameWidget(photo_path)
+        self.full_frame.showFullScreen()
+
+    def resizeEvent(self, event):
+        """
+        Превью готовятся под размер окна просмотра — при его изменении перезапрашиваем текущее.
+        """
+        super().resizeEvent(event)
+        if self.photos:
+            self.update_image()
+
+    def closeEvent(self, event):
+        self._preview_thread.quit()
+        self._preview_thread.wait(2000)
+        super().closeEvent(event)
+
     def show_previous(self):
         if self.index > 0:
             self.index -= 1
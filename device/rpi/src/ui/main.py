@@ -9,7 +9,7 @@ from PyQt5.QtWidgets import (
     QVBoxLayout, QHBoxLayout, QSizePolicy, QComboBox, QCheckBox
 )
 from PyQt5.QtGui import QIcon
-from PyQt5.QtCore import QSize, QTimer, QThread
+from PyQt5.QtCore import QSize, QTimer, QThread, QObject, pyqtSignal
 
 from config.settings import icon_path
 from services.photo import save_photo_for_task, clear_photos_for_task, get_photos_for_task
@@ -17,6 +17,7 @@ from services.photo import save_photo_for_task, clear_photos_for_task, get_photo
 from services.leds import LedController
 from services.hotspot import enable_hotspot, disable_hotspot
 from services.shoot_worker import ShootWorker
+from services import task_events
 from ui.camera import CameraWidget
 from ui.gallery import GalleryWidget
 from ui.confirm import ConfirmDialog
@@ -25,6 +26,30 @@ from models.db import SessionLocal, PhotoTask
 
 logger = logging.getLogger(__name__)
 
+# Резервная проверка изменений задач (на случай пропущенного события), мс
+TASK_FALLBACK_CHECK_INTERVAL = 15000
+
+
+def make_test_task():
+    """Синтетическая тестовая задача, всегда первая в списке."""
+    return PhotoTask(
+        id="test_task",
+        title="Тестовая задача",
+        status="test",
+        spectra=[520, 660, 810, 850, 900, 940],
+        created_at=datetime.utcnow()
+    )
+
+
+class TaskEventBridge(QObject):
+    """
+    Переносит события задач из потока API в GUI-поток через сигнал Qt (queued connection).
+    """
+    task_changed = pyqtSignal(str, str)  # событие, id задачи
+
+    def __call__(self, event, task_id):
+        self.task_changed.emit(event, task_id)
+
 
 class CameraApp(QWidget):
     """Главное окно: камера, задачи, точка доступа и съёмка с подсветкой.
@@ -157,10 +182,17 @@ class CameraApp(QWidget):
         main_layout.addWidget(self.status_bar)
         self.setLayout(main_layout)
 
-        # --- Автоматическое обновление задач ---
+        # --- Обновление задач по событиям API ---
+        self.test_task = make_test_task()
+        self._tasks_signature = None
+        self.task_events_bridge = TaskEventBridge()
+        self.task_events_bridge.task_changed.connect(self.on_task_event)
+        task_events.subscribe(self.task_events_bridge)
+
+        # Резервная проверка: одно агрегирующее обращение к БД вместо чтения всех задач
         self.task_update_timer = QTimer()
-        self.task_update_timer.timeout.connect(self.update_tasks)
-        self.task_update_timer.start(3000)
+        self.task_update_timer.timeout.connect(self.check_tasks_changed)
+        self.task_update_timer.start(TASK_FALLBACK_CHECK_INTERVAL)
 
         self.update_tasks()
 
@@ -193,22 +225,16 @@ class CameraApp(QWidget):
 
     def update_tasks(self):
         """
-        Обновляет выпадающий список задач.
+        Полностью перестраивает выпадающий список задач (при запуске и по резервной проверке).
         Если задач нет — показывает "Нет задач" и блокирует действия.
         """
         db = SessionLocal()
         tasks = db.query(PhotoTask).order_by(PhotoTask.created_at.desc()).all()
+        self._tasks_signature = tuple(task_events.get_tasks_signature(db))
         db.close()
 
         # --- Добавляем вручную тестовую задачу ---
-        test_task = PhotoTask(
-            id="test_task",
-            title="Тестовая задача",
-            status="test",
-            spectra=[520, 660, 810, 850, 900, 940],
-            created_at=datetime.utcnow()
-        )
-        tasks.insert(0, test_task)
+        tasks.insert(0, self.test_task)
 
         # Запомним текущий выбор и количество задач до обновления
         prev_task_id = self.task_combo.currentData()
@@ -248,6 +274,80 @@ class CameraApp(QWidget):
         self.task_combo.blockSignals(False)
         self.clear_tasks_btn.setEnabled(len(tasks) > 1)
 
+    @staticmethod
+    def task_item_text(task):
+        return f"{task.title} [{task.status}]"
+
+    def on_task_event(self, event, task_id):
+        """
+        Точечно обновляет список задач по событию API.
+        """
+        logger.info(f"Событие задачи: {event} {task_id}")
+        if event == task_events.TASK_DELETED:
+            self.remove_task_item(task_id)
+        else:
+            self.refresh_task_item(task_id, select=(event == task_events.TASK_CREATED))
+        self.update_buttons_state()
+
+    def refresh_task_item(self, task_id, select=False):
+        """
+        Перечитывает одну задачу из БД и обновляет (или добавляет) её строку в списке.
+        Новые задачи встают сразу после тестовой — список отсортирован от новых к старым.
+        """
+        db = SessionLocal()
+        task = db.query(PhotoTask).get(task_id)
+        if task is not None:
+            db.expunge(task)
+        self._tasks_signature = tuple(task_events.get_tasks_signature(db))
+        db.close()
+        if task is None:
+            self.remove_task_item(task_id)
+            return
+
+        self.task_combo.blockSignals(True)
+        idx = self.task_combo.findData(task_id)
+        if idx == -1:
+            idx = 1
+            self.task_combo.insertItem(idx, self.task_item_text(task), task.id)
+        else:
+            self.task_combo.setItemText(idx, self.task_item_text(task))
+        self.tasks_map[task.id] = task
+        if select:
+            self.task_combo.setCurrentIndex(idx)
+        self.task_combo.blockSignals(False)
+        self.clear_tasks_btn.setEnabled(len(self.tasks_map) > 1)
+
+    def remove_task_item(self, task_id):
+        """
+        Убирает задачу из списка; если она была выбрана — выбирает последнюю.
+        """
+        idx = self.task_combo.findData(task_id)
+        self.tasks_map.pop(task_id, None)
+        if idx == -1:
+            return
+        was_current = idx == self.task_combo.currentIndex()
+        self.task_combo.blockSignals(True)
+        self.task_combo.removeItem(idx)
+        if was_current:
+            self.task_combo.setCurrentIndex(self.task_combo.count() - 1)
+        self.task_combo.blockSignals(False)
+        self.clear_tasks_btn.setEnabled(len(self.tasks_map) > 1)
+
+    def check_tasks_changed(self):
+        """
+        Резервная проверка: если количество задач или время последней изменились
+        (событие было пропущено), список перестраивается целиком.
+        """
+        if self.shooting_in_progress:
+            return
+        db = SessionLocal()
+        signature = tuple(task_events.get_tasks_signature(db))
+        db.close()
+        if signature != self._tasks_signature:
+            logger.info("Список задач изменился без события, полное обновление")
+            self.update_tasks()
+            self.update_buttons_state()
+
     def clear_all_tasks(self):
         """Удаляет все задачи и связанные фотографии."""
         reply = QMessageBox.question(
@@ -265,6 +365,8 @@ class CameraApp(QWidget):
             db.delete(task)
         db.commit()
         db.close()
+        for task_id in task_ids:
+            task_events.publish(task_events.TASK_DELETED, task_id)
 
         # Теперь удаляем папки
         from config.settings import PHOTO_DIR  # или свой путь
@@ -373,7 +475,9 @@ class CameraApp(QWidget):
             self.status_bar.setText("Тестовая съёмка завершена")
         self.shooting_in_progress = False
 
-        self.update_tasks()
+        if self.current_task_id != "test_task":
+            # Событие обновит строку задачи здесь и уйдёт в процесс API
+            task_events.publish(task_events.TASK_UPDATED, self.current_task_id)
         self.update_buttons_state()
 
         self.led_controller.button.when_pressed = self.on_gpio_photo_button
@@ -415,7 +519,8 @@ class CameraApp(QWidget):
                 db.commit()
             db.close()
             self.status_bar.setText("Фотографии удалены")
-            self.update_tasks()
+            if task.id != "test_task":
+                task_events.publish(task_events.TASK_UPDATED, task.id)
             self.update_buttons_state()
 
     def show_photos(self):
@@ -491,6 +596,8 @@ class CameraApp(QWidget):
 
     def closeEvent(self, event):
         """Закрытие приложения и освобождение ресурсов."""
+        task_events.unsubscribe(self.task_events_bridge)
+        self.task_update_timer.stop()
         if self.worker_thread and self.worker_thread.isRunning():
             self.worker_thread.quit()
             self.worker_thread.wait()
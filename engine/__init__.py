@@ -0,0 +1,7 @@
+"""
+Общий вычислительный код обработки сеансов для настольного приложения (desk) и сервера (web):
+только numpy/scipy/OpenCV, без Qt, БД и Celery.
+
+Пакет лежит в корне репозитория и подключается через PYTHONPATH: desk запускается
+с PYTHONPATH=src:.., в образ сервера каталог копируется в /usr/src/app/engine.
+"""
@@ -0,0 +1,114 @@
+import cProfile
+import io
+import os
+import pstats
+import time
+import tracemalloc
+
+"""
+Профилирование обработки сеанса по запросу пользователя.
+Весь прогон записывается cProfile (файл .prof открывается в snakeviz или
+преобразуется во flame graph, например flameprof), а на границах этапов
+фиксируются время и память, выделенная за этап (tracemalloc).
+Включается для отдельного запуска: в desk — флажком в настройках, на сервере —
+аргументом profile задачи process_session. Выключенный профилировщик ничего не делает
+и не замедляет обработку.
+"""
+
+MB = 2 ** 20
+TOP_FUNCTIONS = 25      # Функций в отчёте (по суммарному времени)
+TOP_ALLOCATIONS = 10    # Строк кода с наибольшим объёмом живой памяти
+
+
+class StageProfiler:
+    """
+    Профиль прогона с разбивкой по этапам: start() — mark(этап) ... — stop() — write_report().
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.stages: list[tuple[str, float, float, float]] = []  # (этап, секунды, прирост памяти МБ, пик МБ)
+        self._profile: cProfile.Profile | None = None
+        self._snapshot: tracemalloc.Snapshot | None = None
+        self._own_tracing = False
+        self._running = False
+        self._last_time = 0.0
+        self._last_memory = 0
+
+    def start(self) -> None:
+        if not self.enabled:
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._own_tracing = True
+        tracemalloc.reset_peak()
+        self._last_time = time.perf_counter()
+        self._last_memory = tracemalloc.get_traced_memory()[0]
+        self._profile = cProfile.Profile()
+        self._running = True
+        self._profile.enable()
+
+    def mark(self, stage: str) -> None:
+        """ Закрывает этап: время и память с предыдущей отметки """
+        if not self._running:
+            return
+        now = time.perf_counter()
+        current, peak = tracemalloc.get_traced_memory()
+        self.stages.append((
+            stage,
+            now - self._last_time,
+            (current - self._last_memory) / MB,
+            (peak - self._last_memory) / MB,
+        ))
+        tracemalloc.reset_peak()
+        self._last_time = now
+        self._last_memory = current
+
+    def stop(self) -> None:
+        if not self._running:
+            return
+        self._running = False
+        self._profile.disable()
+        if tracemalloc.is_tracing():
+            self._snapshot = tracemalloc.take_snapshot()
+        if self._own_tracing:
+            tracemalloc.stop()
+            self._own_tracing = False
+
+    def summary_lines(self) -> list[str]:
+        """ Краткая сводка по этапам для журнала """
+        return [
+            f"Профиль: {stage} — {seconds:.3f} с, память {allocated:+.1f} МБ (пик {peak:.1f} МБ)"
+            for stage, seconds, allocated, peak in self.stages
+        ]
+
+    def write_report(self, directory: str, name: str = "profile") -> str | None:
+        """
+        Сохраняет <name>.prof (cProfile) и <name>.txt (этапы, функции, память) в directory.
+        Возвращает путь к текстовому отчёту или None, если профилирование выключено.
+        """
+        if self._profile is None:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        self._profile.dump_stats(os.path.join(directory, f"{name}.prof"))
+
+        total = sum(seconds for _, seconds, _, _ in self.stages)
+        lines = ["Этапы:", f"{'этап':<16}{'время, с':>10}{'доля':>8}{'память, МБ':>13}{'пик, МБ':>10}"]
+        for stage, seconds, allocated, peak in self.stages:
+            share = seconds / total if total else 0.0
+            lines.append(f"{stage:<16}{seconds:>10.3f}{share:>8.0%}{allocated:>+13.1f}{peak:>10.1f}")
+        lines.append(f"{'итого':<16}{total:>10.3f}")
+
+        stream = io.StringIO()
+        pstats.Stats(self._profile, stream=stream).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        lines += ["", "Функции (по суммарному времени):", stream.getvalue().strip()]
+
+        if self._snapshot is not None:
+            lines += ["", "Живая память по строкам кода на конец обработки:"]
+            for stat in self._snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+                lines.append(f"{stat.size / MB:>10.1f} МБ  {stat.count:>8} блоков  {stat.traceback}")
+
+        report_path = os.path.join(directory, f"{name}.txt")
+        with open(report_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        return report_path
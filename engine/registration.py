@@ -0,0 +1,109 @@
+import cv2
+import numpy as np
+
+"""
+Совмещение каналов гиперкуба (компенсация смещения пациента между кадрами) — общее для desk и web.
+Сдвиг каждого канала относительно опорного (среднего по длине волны) оценивается фазовой
+корреляцией по пирамиде, затем каждый канал один раз сдвигается.
+"""
+
+REGISTRATION_WINDOW = 256      # Сторона окна фазовой корреляции на каждом уровне пирамиды
+REGISTRATION_MAX_SHIFT = 0.1   # Сдвиг больше этой доли стороны снимка считается ошибкой оценки
+PEAK_SIGMA = 1.0               # Ширина (сглаживание) пика фазовой корреляции, пиксели
+REGISTRATION_MIN_CONFIDENCE = 0.2  # Минимальная высота пика (доля идеальной): ниже — окно без текстуры
+
+
+def estimate_shifts(
+        cube: np.ndarray,
+        window: int = REGISTRATION_WINDOW,
+        max_shift: float = REGISTRATION_MAX_SHIFT,
+) -> np.ndarray:
+    """
+    Сдвиги каналов (каналы, 2) — (dy, dx) в пикселях относительно опорного (среднего) канала:
+    канал[y, x] ≈ опорный[y - dy, x - dx]. Фазовая корреляция по пирамиде: грубый уровень —
+    уменьшенный снимок целиком, следующие — окно той же стороны в удвоенном разрешении,
+    вырезанное с учётом уже найденного сдвига. Каналы уровня обрабатываются одним пакетным FFT
+    """
+    n_bands, h, w = cube.shape
+    reference = n_bands // 2
+    side = min(h, w)
+    window = min(window, side)
+    factor = 1
+    while window * factor * 2 <= side:
+        factor *= 2
+
+    shifts = np.zeros((n_bands, 2))
+    while factor >= 1:
+        size = window * factor
+        ref_top, ref_left = (h - size) // 2, (w - size) // 2
+        windows, offsets = [], []
+        for band, (dy, dx) in zip(cube, shifts):
+            top = int(np.clip(ref_top + round(dy), 0, h - size))
+            left = int(np.clip(ref_left + round(dx), 0, w - size))
+            crop = band[top:top + size, left:left + size]
+            windows.append(crop.reshape(window, factor, window, factor).mean(axis=(1, 3)))
+            offsets.append((top - ref_top, left - ref_left))
+        stacked = np.stack(windows).astype(np.float32)
+        residual, confidence = phase_correlation(stacked, stacked[reference])
+        # Окно без текстуры (например, внутри однородного очага) сдвиг не уточняет
+        residual[confidence < REGISTRATION_MIN_CONFIDENCE] = 0.0
+        shifts = np.asarray(offsets, dtype=np.float64) + residual * factor
+        shifts -= shifts[reference]
+        factor //= 2
+
+    # Слишком большой сдвиг — скорее ошибка оценки (например, канал почти без текстуры)
+    shifts[np.abs(shifts).max(axis=1) > max_shift * side] = 0.0
+    return shifts
+
+
+def apply_shifts(cube: np.ndarray, shifts: np.ndarray) -> np.ndarray:
+    """
+    Сдвигает каналы (на месте) так, чтобы они совпали с опорным: билинейно, с отражением у краёв
+    """
+    h, w = cube.shape[1:]
+    for band, (dy, dx) in zip(cube, shifts):
+        if abs(dy) < 0.01 and abs(dx) < 0.01:
+            continue
+        matrix = np.float32([[1, 0, dx], [0, 1, dy]])
+        band[:] = cv2.warpAffine(
+            band, matrix, (w, h),
+            flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP, borderMode=cv2.BORDER_REFLECT,
+        )
+    return cube
+
+
+def phase_correlation(windows: np.ndarray, reference: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Сдвиги (dy, dx) окон (n, s, s) относительно reference (s, s) по пику фазовой корреляции
+    с субпиксельным уточнением (парабола по логарифму соседей пика). Возвращает (сдвиги, уверенность)
+    """
+    n, s, _ = windows.shape
+    taper = np.outer(np.hanning(s), np.hanning(s)).astype(np.float32)
+    f_ref = np.fft.rfft2((reference - reference.mean()) * taper)
+    spectra = np.fft.rfft2((windows - windows.mean(axis=(1, 2), keepdims=True)) * taper, axes=(1, 2))
+    spectra *= np.conj(f_ref)
+    spectra /= np.maximum(np.abs(spectra), 1e-12)
+    # Гауссов фильтр нормированного спектра подавляет шум высоких частот и делает пик гауссовым
+    ky = np.fft.fftfreq(s)[:, None]
+    kx = np.fft.rfftfreq(s)[None, :]
+    peak_filter = np.exp(-2 * (np.pi * PEAK_SIGMA) ** 2 * (ky ** 2 + kx ** 2)).astype(np.float32)
+    spectra *= peak_filter
+    corr = np.fft.irfft2(spectra, s=(s, s), axes=(1, 2))
+
+    idx = np.arange(n)
+    py, px = np.unravel_index(corr.reshape(n, -1).argmax(axis=1), (s, s))
+    # Высота пика относительно пика совпадающих окон: около 1 — уверенная оценка, около 0 — шум
+    confidence = corr[idx, py, px] / np.fft.irfft2(peak_filter, s=(s, s))[0, 0]
+    corr = np.log(np.maximum(corr, 1e-12 * corr[idx, py, px][:, None, None]))
+    peak = corr[idx, py, px]
+
+    def refine(before: np.ndarray, after: np.ndarray) -> np.ndarray:
+        denominator = before - 2 * peak + after
+        safe = np.where(np.abs(denominator) > 1e-12, denominator, 1.0)
+        return np.where(np.abs(denominator) > 1e-12, 0.5 * (before - after) / safe, 0.0)
+
+    dy = refine(corr[idx, (py - 1) % s, px], corr[idx, (py + 1) % s, px])
+    dx = refine(corr[idx, py, (px - 1) % s], corr[idx, py, (px + 1) % s])
+    # Пик в правой/нижней половине — отрицательный сдвиг (циклическая корреляция)
+    shifts = np.stack([(py + s // 2) % s - s // 2 + dy, (px + s // 2) % s - s // 2 + dx], axis=1)
+    return shifts, confidence
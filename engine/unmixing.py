@@ -0,0 +1,209 @@
+import numpy as np
+from scipy import fft
+
+"""
+Разложение оптической плотности на концентрации хромофоров — общее для desk и web.
+"""
+
+# Методы разложения на хромофоры: МНК без ограничений, МНК с неотрицательными концентрациями
+# и МНК с пространственной регуляризацией (сглаживание по Тихонову или полная вариация)
+UNMIXING_METHODS = {
+    "lstsq": "МНК",
+    "nnls": "МНК, концентрации ≥ 0",
+    "tikhonov": "МНК + сглаживание (Тихонов)",
+    "tv": "МНК + полная вариация (TV)",
+}
+# Методы, которые сами подавляют шум: размытие перед сегментацией для них не нужно
+REGULARIZED_METHODS = ("tikhonov", "tv")
+
+REGULARIZATION_WEIGHT = 0.3  # Вес регуляризации (относительный, см. regularized_unmix)
+TV_ITERATIONS = 10           # Итераций split Bregman для полной вариации
+NNLS_TILE = 1 << 18         # Пикселей в одном блоке неотрицательного МНК (ограничивает память)
+NNLS_FULL_EXCHANGE = 5      # Итераций с обменом всех недопустимых переменных, дальше — по одной
+
+
+def unmix(
+        matrix: np.ndarray,
+        od: np.ndarray,
+        method: str = "lstsq",
+        regularization: float = REGULARIZATION_WEIGHT,
+) -> np.ndarray:
+    """
+    Концентрации хромофоров (хромофоры, H, W) float32 по матрице перекрытия (спектры × хромофоры)
+    и оптической плотности od (спектры, H, W).
+
+    lstsq — МНК для всех пикселей сразу: псевдообратная матрица считается один раз
+    (то же решение, что у np.linalg.lstsq для каждого пикселя) и применяется одним умножением;
+    nnls — МНК с концентрациями ≥ 0 (nnls_batched); tikhonov/tv — решение для всего снимка
+    с пространственной регуляризацией веса regularization (regularized_unmix)
+    """
+    if method not in UNMIXING_METHODS:
+        raise ValueError(f"Неизвестный метод разложения: {method}")
+    n_spectra, h, w = od.shape
+    if method in REGULARIZED_METHODS:
+        return regularized_unmix(matrix, od, method, regularization)
+    if method == "nnls":
+        return nnls_batched(matrix, od.reshape(n_spectra, -1)).reshape(-1, h, w)
+    try:
+        pinv = np.linalg.pinv(np.asarray(matrix, dtype=np.float64)).astype(np.float32)
+    except np.linalg.LinAlgError:
+        return np.zeros((np.shape(matrix)[1], h, w), dtype=np.float32)
+    return (pinv @ od.reshape(n_spectra, -1).astype(np.float32, copy=False)).reshape(-1, h, w)
+
+
+def nnls_batched(matrix: np.ndarray, rhs: np.ndarray, tile: int = NNLS_TILE) -> np.ndarray:
+    """
+    Неотрицательный МНК min ||matrix @ x - b|| при x ≥ 0 для каждого столбца b из rhs
+    (спектры × пиксели), результат (хромофоры × пиксели) float32.
+
+    Блочный метод главных поворотов (Kim, Park) с тёплым стартом: начальное множество
+    свободных переменных пикселя — положительные компоненты решения без ограничений.
+    Пиксели с одинаковым множеством решаются одной обращённой подматрицей Грама, затем
+    у пикселей с нарушенными условиями оптимальности недопустимые переменные меняют
+    множество, и пересчитываются только они. После NNLS_FULL_EXCHANGE итераций
+    переменные меняются по одной (правило Мёрти), что исключает зацикливание
+    """
+    a = np.asarray(matrix, dtype=np.float64)
+    n_chroms = a.shape[1]
+    n_pixels = rhs.shape[1]
+    gram = a.T @ a
+    pinv = np.linalg.pinv(a)
+    weights = 1 << np.arange(n_chroms)
+    max_iter = NNLS_FULL_EXCHANGE + 2 ** n_chroms
+    inverses: dict[int, tuple[list[int], np.ndarray | None]] = {}
+
+    def subsystem(code: int) -> tuple[list[int], np.ndarray | None]:
+        if code not in inverses:
+            idx = [j for j in range(n_chroms) if code >> j & 1]
+            inverses[code] = (idx, np.linalg.pinv(gram[np.ix_(idx, idx)]) if idx else None)
+        return inverses[code]
+
+    result = np.empty((n_chroms, n_pixels), dtype=np.float32)
+    for start in range(0, n_pixels, tile):
+        y = np.asarray(rhs[:, start:start + tile], dtype=np.float64)
+        b = a.T @ y
+        x = pinv @ y
+        tol = 1e-10 * max(float(np.abs(b).max(initial=0.0)), 1.0)
+        passive = x > 0
+        todo = np.arange(y.shape[1])
+
+        for iteration in range(max_iter):
+            codes = weights @ passive[:, todo]
+            for code in np.unique(codes):
+                cols = todo[codes == code]
+                idx, inverse = subsystem(int(code))
+                x[:, cols] = 0.0
+                if idx:
+                    x[np.ix_(idx, cols)] = inverse @ b[np.ix_(idx, cols)]
+
+            # Оптимальность: свободные x ≥ 0, у зафиксированных нулём градиент b - Gx ≤ 0
+            x_todo = x[:, todo]
+            gradient = b[:, todo] - gram @ x_todo
+            infeasible = np.where(passive[:, todo], x_todo < -tol, gradient > tol)
+            bad = infeasible.any(axis=0)
+            if not bad.any():
+                break
+            todo, infeasible = todo[bad], infeasible[:, bad]
+            if iteration >= NNLS_FULL_EXCHANGE:
+                last = n_chroms - 1 - np.argmax(infeasible[::-1], axis=0)
+                infeasible = np.zeros_like(infeasible)
+                infeasible[last, np.arange(todo.size)] = True
+            passive[:, todo] ^= infeasible
+
+        np.maximum(x, 0.0, out=x)
+        result[:, start:start + tile] = x
+    return result
+
+
+def regularized_unmix(
+        matrix: np.ndarray,
+        od: np.ndarray,
+        method: str = "tikhonov",
+        weight: float = REGULARIZATION_WEIGHT,
+        iterations: int = TV_ITERATIONS,
+) -> np.ndarray:
+    """
+    Разложение сразу для всего снимка: min Σ ||A c(p) - od(p)||² + штраф за градиент карт c.
+
+    tikhonov — штраф λ ||∇c||²: система (G + λ ∇ᵀ∇) c = Aᵀ od, G = AᵀA, решается точно.
+    При отражающих границах ∇ᵀ∇ диагонализуется DCT-II, G — своими собственными векторами:
+    поворот в базис G, DCT, деление на d_i + λμ(частота), обратное DCT — O(N log N).
+    tv — штраф α ||∇c||₁ (сохраняет границы очага): split Bregman с той же DCT-системой
+    и мягким порогом градиентов на каждой итерации.
+
+    weight безразмерен: λ = weight · tr(G)/k; для TV порог — weight медианных модулей
+    градиента решения без регуляризации (уровень шума). Результат (k, H, W) float32
+    """
+    a = np.asarray(matrix, dtype=np.float64)
+    n_spectra, h, w = od.shape
+    n_chroms = a.shape[1]
+    eigenvalues, eigenvectors = np.linalg.eigh(a.T @ a)
+    scale = max(float(eigenvalues.sum()) / n_chroms, 1e-12)
+    # Aᵀ od в базисе собственных векторов G
+    rhs = ((eigenvectors.T @ a.T).astype(np.float32) @ od.reshape(n_spectra, -1).astype(np.float32))
+    rhs = rhs.reshape(n_chroms, h, w)
+    # Собственные значения -Δ с отражающими границами для каждой частоты DCT
+    laplacian = (
+        (2 - 2 * np.cos(np.pi * np.arange(h) / h))[:, None]
+        + (2 - 2 * np.cos(np.pi * np.arange(w) / w))[None, :]
+    ).astype(np.float32)
+    denominators: dict[float, np.ndarray] = {}
+
+    def solve(right: np.ndarray, penalty: float) -> np.ndarray:
+        """ (G + penalty · ∇ᵀ∇)⁻¹ right, right — в базисе собственных векторов G """
+        if penalty not in denominators:
+            denominator = eigenvalues.astype(np.float32)[:, None, None] + np.float32(penalty) * laplacian
+            denominators[penalty] = np.maximum(denominator, np.float32(1e-12 * scale))
+        spectrum = fft.dctn(right, type=2, axes=(1, 2), norm="ortho", workers=-1)
+        spectrum /= denominators[penalty]
+        return fft.idctn(spectrum, type=2, axes=(1, 2), norm="ortho", workers=-1)
+
+    def rotate(x: np.ndarray, basis: np.ndarray) -> np.ndarray:
+        return (basis.astype(np.float32) @ x.reshape(n_chroms, -1)).reshape(n_chroms, h, w)
+
+    if method == "tikhonov":
+        return rotate(solve(rhs, weight * scale), eigenvectors)
+    if method != "tv":
+        raise ValueError(f"Неизвестный метод регуляризации: {method}")
+
+    # Split Bregman: вспомогательные d ≈ ∇c и накопленные невязки e (в базисе хромофоров)
+    c = rotate(solve(rhs, 0.0), eigenvectors)
+    gx, gy = _gradient(c)
+    noise = float(np.median(np.abs(np.concatenate([gx.ravel(), gy.ravel()]))))
+    threshold = np.float32(weight * max(noise, 1e-12))
+    dx, dy = np.zeros_like(c), np.zeros_like(c)
+    ex, ey = np.zeros_like(c), np.zeros_like(c)
+    for _ in range(iterations):
+        penalty = rotate(_gradient_adjoint(dx - ex, dy - ey), eigenvectors.T)
+        c = rotate(solve(rhs + np.float32(scale) * penalty, scale), eigenvectors)
+        gx, gy = _gradient(c)
+        ex += gx
+        ey += gy
+        dx, dy = _shrink(ex, threshold), _shrink(ey, threshold)
+        ex -= dx
+        ey -= dy
+    return c
+
+
+def _gradient(z: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """ Прямые разности по осям H и W (на последней строке/столбце — 0) """
+    gx = np.zeros_like(z)
+    gy = np.zeros_like(z)
+    gx[:, :, :-1] = z[:, :, 1:] - z[:, :, :-1]
+    gy[:, :-1, :] = z[:, 1:, :] - z[:, :-1, :]
+    return gx, gy
+
+
+def _gradient_adjoint(px: np.ndarray, py: np.ndarray) -> np.ndarray:
+    """ ∇ᵀ(px, py) — сопряжённый к _gradient оператор """
+    result = np.zeros_like(px)
+    result[:, :, 1:] += px[:, :, :-1]
+    result[:, :, :-1] -= px[:, :, :-1]
+    result[:, 1:, :] += py[:, :-1, :]
+    result[:, :-1, :] -= py[:, :-1, :]
+    return result
+
+
+def _shrink(values: np.ndarray, threshold: np.float32) -> np.ndarray:
+    """ Мягкий порог sign(v) · max(|v| - t, 0) = v - clip(v, -t, t) """
+    return values - np.clip(values, -threshold, threshold)
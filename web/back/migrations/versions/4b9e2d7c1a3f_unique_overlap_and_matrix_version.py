@@ -0,0 +1,43 @@
+"""unique overlap and matrix version
+
+Revision ID: 4b9e2d7c1a3f
+Revises: a75663848cb2
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b9e2d7c1a3f'
+down_revision: Union[str, None] = 'a75663848cb2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Дубликаты пар спектр-хромофор мешают уникальному индексу: оставляем по одной записи
+    op.execute("""
+        DELETE FROM overlap_coefficients a
+        USING overlap_coefficients b
+        WHERE a.spectrum_id = b.spectrum_id
+          AND a.chromophore_id = b.chromophore_id
+          AND a.ctid < b.ctid
+    """)
+    op.create_index(
+        'uq_overlap_coefficients_spectrum_chromophore',
+        'overlap_coefficients',
+        ['spectrum_id', 'chromophore_id'],
+        unique=True,
+    )
+    op.add_column('devices', sa.Column('overlap_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('devices', 'overlap_version')
+    op.drop_index('uq_overlap_coefficients_spectrum_chromophore', table_name='overlap_coefficients')
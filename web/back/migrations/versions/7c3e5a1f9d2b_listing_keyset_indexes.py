@@ -0,0 +1,42 @@
+"""listing keyset indexes
+
+Revision ID: 7c3e5a1f9d2b
+Revises: 4b9e2d7c1a3f
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3e5a1f9d2b'
+down_revision: Union[str, None] = '4b9e2d7c1a3f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_patients_full_name_id', 'patients', ['full_name', 'id'])
+    op.create_index('ix_patients_organization_full_name_id', 'patients', ['organization_id', 'full_name', 'id'])
+    op.create_index(
+        'ix_users_sort_key',
+        'users',
+        [sa.text("coalesce(last_name, '')"), sa.text("coalesce(first_name, '')"), 'id'],
+    )
+    op.create_index(
+        'ix_users_organization_sort_key',
+        'users',
+        ['organization_id', sa.text("coalesce(last_name, '')"), sa.text("coalesce(first_name, '')"), 'id'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_organization_sort_key', table_name='users')
+    op.drop_index('ix_users_sort_key', table_name='users')
+    op.drop_index('ix_patients_organization_full_name_id', table_name='patients')
+    op.drop_index('ix_patients_full_name_id', table_name='patients')
@@ -0,0 +1,29 @@
+"""result registration shifts
+
+Revision ID: 9e4f2b6c8d1a
+Revises: 7c3e5a1f9d2b
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4f2b6c8d1a'
+down_revision: Union[str, None] = '7c3e5a1f9d2b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('results', sa.Column('registration_shifts', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('results', 'registration_shifts')
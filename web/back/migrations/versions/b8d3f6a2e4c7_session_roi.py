@@ -0,0 +1,34 @@
+"""session roi
+
+Revision ID: b8d3f6a2e4c7
+Revises: 9e4f2b6c8d1a
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d3f6a2e4c7'
+down_revision: Union[str, None] = '9e4f2b6c8d1a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('sessions', sa.Column('roi_x', sa.Integer(), nullable=True))
+    op.add_column('sessions', sa.Column('roi_y', sa.Integer(), nullable=True))
+    op.add_column('sessions', sa.Column('roi_width', sa.Integer(), nullable=True))
+    op.add_column('sessions', sa.Column('roi_height', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('sessions', 'roi_height')
+    op.drop_column('sessions', 'roi_width')
+    op.drop_column('sessions', 'roi_y')
+    op.drop_column('sessions', 'roi_x')
@@ -0,0 +1,32 @@
+"""image derivatives flag
+
+Revision ID: e2a7c4b9f613
+Revises: b8d3f6a2e4c7
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a7c4b9f613'
+down_revision: Union[str, None] = 'b8d3f6a2e4c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('raw_images', sa.Column('has_derivatives', sa.Boolean(), server_default='false', nullable=False))
+    op.add_column('reconstructed_images', sa.Column('has_derivatives', sa.Boolean(), server_default='false', nullable=False))
+    op.add_column('results', sa.Column('contour_has_derivatives', sa.Boolean(), server_default='false', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('results', 'contour_has_derivatives')
+    op.drop_column('reconstructed_images', 'has_derivatives')
+    op.drop_column('raw_images', 'has_derivatives')
@@ -0,0 +1,22 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from redis.asyncio import Redis
+
+from src.core.metrics import REGISTRY, load_shared_values
+from src.db.redis import get_redis
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics(redis: Annotated[Redis, Depends(get_redis)]):
+    """
+    Метрики API и воркеров обработки в текстовом формате Prometheus
+    """
+    shared_values = await load_shared_values(redis)
+    return PlainTextResponse(
+        REGISTRY.render(shared_values),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -12,13 +12,51 @@ from src.core.schemas import UserJWT
 from src.constants.role import RoleName
 from src.core.security import JWTBearer
 from src.modules.parameters.dependencies.overlap import get_overlap_coefficient_service
-from src.modules.parameters.schemas.overlap import OverlapCoefficientSchema, OverlapCoefficientCreateSchema, OverlapCoefficientUpdateSchema
+from src.modules.parameters.schemas.overlap import (
+    OverlapCoefficientSchema, OverlapCoefficientCreateSchema, OverlapCoefficientUpdateSchema,
+    OverlapMatrixSchema, OverlapMatrixUpdateSchema,
+)
 from src.modules.parameters.services.overlap import OverlapCoefficientService
 
 
 router = APIRouter()
 
 
+@router.get(
+    path='/matrix/{device_id}/',
+    summary='Получить матрицу коэффициентов перекрытия устройства',
+    response_model=OverlapMatrixSchema,
+    status_code=status.HTTP_200_OK,
+)
+async def get_overlap_matrix(
+        device_id: UUID,
+        service: Annotated[OverlapCoefficientService, Depends(get_overlap_coefficient_service)],
+        user: Annotated[UserJWT, Depends(JWTBearer(allowed_roles={RoleName.EMPLOYEE, RoleName.ADMIN}))],
+) -> OverlapMatrixSchema:
+    """
+    Возвращает всю матрицу коэффициентов устройства плотным массивом вместе с её версией
+    """
+    return await service.get_matrix(device_id)
+
+
+@router.put(
+    path='/matrix/{device_id}/',
+    summary='Сохранить матрицу коэффициентов перекрытия устройства',
+    response_model=OverlapMatrixSchema,
+    status_code=status.HTTP_200_OK,
+)
+async def update_overlap_matrix(
+        device_id: UUID,
+        body: OverlapMatrixUpdateSchema,
+        service: Annotated[OverlapCoefficientService, Depends(get_overlap_coefficient_service)],
+        user: Annotated[UserJWT, Depends(JWTBearer(allowed_roles={RoleName.ADMIN}))],
+) -> OverlapMatrixSchema:
+    """
+    Сохраняет матрицу коэффициентов устройства одной транзакцией и возвращает её новую версию
+    """
+    return await service.update_matrix(device_id, body)
+
+
 @router.post(
     path='/',
     summary='Создать коэффициент перекрытия',
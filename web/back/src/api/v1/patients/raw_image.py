@@ -3,7 +3,7 @@
 """
 
 from typing import Annotated, List
-from uuid import UUID
+from uuid import UUID, uuid4
 
 from fastapi import APIRouter, Depends, UploadFile, File, Form
 from starlette import status
@@ -43,8 +43,9 @@ async def upload_raw_image(
     raw_images = await service.upload_files(session_id, spectrum_ids, files)
 
     if session_id:
-        celery_task = process_session.delay(str(session_id))
-        await service_session.set_processing_task_id(session_id, celery_task.id)
+        task_id = str(uuid4())
+        await service_session.set_processing_task_id(session_id, task_id)
+        process_session.apply_async(args=(str(session_id),), task_id=task_id)
 
     return raw_images
 
@@ -65,8 +66,9 @@ async def delete_raw_image(
     session_id = await service.delete(raw_image_id)
 
     if session_id:
-        celery_task = process_session.delay(str(session_id))
-        await service_session.set_processing_task_id(session_id, celery_task.id)
+        task_id = str(uuid4())
+        await service_session.set_processing_task_id(session_id, task_id)
+        process_session.apply_async(args=(str(session_id),), task_id=task_id)
 
 @router.post(
     path='/delete/',
@@ -86,5 +88,6 @@ async def delete_raw_images(
 
     for session_id in set(session_ids or []):
         if session_id:
-            celery_task = process_session.delay(str(session_id))
-            await service_session.set_processing_task_id(session_id, celery_task.id)
\ No newline at end of file
+            task_id = str(uuid4())
+            await service_session.set_processing_task_id(session_id, task_id)
+            process_session.apply_async(args=(str(session_id),), task_id=task_id)
\ No newline at end of file
@@ -3,16 +3,18 @@
 """
 
 from typing import Annotated
-from uuid import UUID
+from uuid import UUID, uuid4
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from starlette import status
 
 from src.core.schemas import UserJWT
 from src.constants.role import RoleName
 from src.core.security import JWTBearer
 from src.modules.patients.dependencies.session import get_session_service
-from src.modules.patients.schemas.session import SessionCreateSchema, SessionUpdateSchema, SessionDetailSchema
+from src.modules.patients.schemas.session import (
+    SessionCreateSchema, SessionUpdateSchema, SessionDetailSchema, SessionStatusSchema
+)
 from src.modules.patients.services.session import SessionService
 
 from src.tasks.session import process_session
@@ -39,6 +41,24 @@ async def get_session(
     return session
 
 
+@router.get(
+    path='/{session_id}/status/',
+    summary='Получить статус обработки сеанса',
+    response_model=SessionStatusSchema,
+    status_code=status.HTTP_200_OK,
+)
+async def get_session_status(
+        patient_id: UUID,
+        session_id: UUID,
+        service: Annotated[SessionService, Depends(get_session_service)],
+        user: Annotated[UserJWT, Depends(JWTBearer(allowed_roles={RoleName.EMPLOYEE, RoleName.ADMIN}))],
+) -> SessionStatusSchema:
+    """
+    Возвращает только статус обработки сеанса (для частого опроса во время обработки)
+    """
+    return await service.get_status(patient_id, session_id)
+
+
 @router.post(
     path='/',
     summary='Создать сеанс',
@@ -104,13 +124,16 @@ async def set_processing_session(
         session_id: UUID,
         user: Annotated[UserJWT, Depends(JWTBearer(allowed_roles={RoleName.EMPLOYEE, RoleName.ADMIN}))],
         service: Annotated[SessionService, Depends(get_session_service)],
+        profile: Annotated[bool, Query(description='Профилировать обработку (отчёт в media/profiles)')] = False,
 ):
     """
     Запускает обработку данных и вычисление результата сеанса
     """
-    celery_task = process_session.delay(str(session_id))
-    await service.set_processing_task_id(session_id, celery_task.id)
-    return {"message": "Обработка запущена", "task_id": celery_task.id}
+    # Статус PENDING пишется до отправки задачи: иначе он может затереть статус, уже записанный воркером
+    task_id = str(uuid4())
+    await service.set_processing_task_id(session_id, task_id)
+    process_session.apply_async(args=(str(session_id),), kwargs={"profile": profile}, task_id=task_id)
+    return {"message": "Обработка запущена", "task_id": task_id}
 
 
 @router.get(
@@ -5,7 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.sql import text
 
-from src.db.postgres import get_db_session
+from src.db.postgres import get_db_session, get_pool_stats
 from src.db.redis import get_redis
 
 router = APIRouter()
@@ -34,6 +34,14 @@ async def postgres_health_check(db_session: AsyncSession = Depends(get_db_sessio
             detail={"status": "error", "message": f"Postgres check failed: {str(e)}"},
         )
 
+@router.get("/ping/postgres/pool/", status_code=status.HTTP_200_OK)
+async def postgres_pool_stats():
+    """
+    Эндпоинт загрузки пулов соединений PostgreSQL этого процесса
+    """
+    return {"status": "ok", "pools": get_pool_stats()}
+
+
 @router.get("/ping/redis/", status_code=status.HTTP_200_OK)
 async def redis_health_check(redis: Redis = Depends(get_redis)):
     """
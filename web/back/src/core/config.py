@@ -1,5 +1,5 @@
 import os
-from typing import List
+from typing import List, Literal
 from datetime import timedelta
 
 from pydantic import Field
@@ -17,6 +17,18 @@ class DBSettings(BaseSettings):
     port: int = Field(alias='DB_PORT', default=5432)
     show_query: bool = Field(alias='SHOW_SQL_QUERY', default=False)
 
+    # Пул соединений API (async) и воркеров Celery (sync) настраивается отдельно:
+    # суммарно процессы не должны превышать max_connections Postgres
+    pool_size: int = Field(alias='DB_POOL_SIZE', default=10)
+    max_overflow: int = Field(alias='DB_MAX_OVERFLOW', default=10)
+    sync_pool_size: int = Field(alias='DB_SYNC_POOL_SIZE', default=2)
+    sync_max_overflow: int = Field(alias='DB_SYNC_MAX_OVERFLOW', default=2)
+    pool_timeout: float = Field(alias='DB_POOL_TIMEOUT', default=30.0)  # Ожидание свободного соединения, сек
+    pool_recycle: int = Field(alias='DB_POOL_RECYCLE', default=1800)  # Пересоздание соединения, сек (-1 — не пересоздавать)
+    pool_pre_ping: bool = Field(alias='DB_POOL_PRE_PING', default=True)
+    # Кеш подготовленных выражений asyncpg на соединение; 0 — для pgbouncer в режиме transaction
+    statement_cache_size: int = Field(alias='DB_STATEMENT_CACHE_SIZE', default=100)
+
     @property
     def _base_url(self) -> str:
         """ Формирует базовый URL для подключения к базе данных """
@@ -34,6 +46,7 @@ class RedisSettings(BaseSettings):
     """
     host: str = Field(alias='REDIS_HOST', default='127.0.0.1')
     port: int = Field(alias='REDIS_PORT', default=6379)
+    count_cache_ttl: int = Field(alias='COUNT_CACHE_TTL', default=300)  # Время жизни кеша количества записей, сек
 
     @property
     def url(self):
@@ -65,6 +78,32 @@ class JWTSettings(BaseSettings):
     algorithm: str = Field(alias='JWT_ALGORITHM', default='HS256')
     access_token_expire_time: timedelta = Field(default=timedelta(minutes=15))
     refresh_token_expire_time: timedelta = Field(default=timedelta(days=10))
+    verify_cache_size: int = Field(alias='JWT_VERIFY_CACHE_SIZE', default=10000)  # Проверенных токенов в памяти процесса
+
+
+class PasswordSettings(BaseSettings):
+    """
+    Конфигурация хеширования паролей
+    """
+    # Метод werkzeug; хеши, полученные другим методом, пересчитываются при входе пользователя
+    hash_method: str = Field(alias='PASSWORD_HASH_METHOD', default='scrypt:32768:8:1')
+    hash_workers: int = Field(alias='PASSWORD_HASH_WORKERS', default=2)  # Потоков пула хеширования
+
+
+class ProcessingSettings(BaseSettings):
+    """
+    Конфигурация обработки сеансов воркером Celery
+    """
+    # Подробная диагностика (min/max/mean/std массивов, число обусловленности):
+    # каждая строка — дополнительный проход по данным, поэтому по умолчанию выключена
+    debug: bool = Field(alias='PROCESSING_DEBUG', default=False)
+    # Разложение на хромофоры: lstsq — МНК, nnls — МНК с неотрицательными концентрациями,
+    # tikhonov / tv — МНК с пространственной регуляризацией (заменяет размытие перед сегментацией)
+    unmixing: Literal['lstsq', 'nnls', 'tikhonov', 'tv'] = Field(alias='PROCESSING_UNMIXING', default='lstsq')
+    # Совмещение каналов перед разложением (компенсация движения пациента между кадрами)
+    registration: bool = Field(alias='PROCESSING_REGISTRATION', default=True)
+    # Относительный вес регуляризации для tikhonov / tv
+    regularization: float = Field(alias='PROCESSING_REGULARIZATION', default=0.3)
 
 
 class MediaSettings(BaseSettings):
@@ -96,6 +135,8 @@ class Settings(BaseSettings):
     db: DBSettings = DBSettings()
     redis: RedisSettings = RedisSettings()
     rabbit: RabbitSettings = RabbitSettings()
+    password: PasswordSettings = PasswordSettings()
+    processing: ProcessingSettings = ProcessingSettings()
     media: MediaSettings = MediaSettings()
 
     default_host: str = "0.0.0.0"
@@ -0,0 +1,319 @@
+import math
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+"""
+Метрики в текстовом формате Prometheus (без внешних зависимостей).
+Метрики API хранятся в памяти процесса. Метрики воркеров Celery (shared=True) копятся
+в процессе воркера и после каждой задачи сбрасываются приращениями в хеш Redis
+(HINCRBYFLOAT), поэтому суммируются по всем воркерам; эндпоинт /metrics API
+отдаёт их вместе со своими.
+"""
+
+SHARED_METRICS_KEY = "metrics:worker"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(labels: Iterable[tuple[str, str]]) -> str:
+    items = [f'{name}="{str(value)}"'.replace("\n", " ") for name, value in labels]
+    return "{" + ",".join(items) + "}" if items else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class Metric:
+    """
+    Базовый класс метрики: имя, описание, имена меток и хранилище значений
+    """
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), shared: bool = False):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.shared = shared
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _label_values(self, labels: dict) -> tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: ожидаются метки {self.labelnames}, переданы {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _record(self, sample: str, labels: Iterable[tuple[str, str]], amount: float) -> None:
+        if self.shared:
+            REGISTRY.add_pending(f"{sample}{_format_labels(labels)}", amount)
+
+    def samples(self) -> list[tuple[str, float]]:
+        """ Строки сэмплов: [(имя{метки}, значение)] """
+        return []
+
+    def render(self, shared_values: dict[str, float] | None = None) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        if self.shared:
+            samples = sorted(
+                (key, value) for key, value in (shared_values or {}).items()
+                if key.split("{", 1)[0] in self._sample_names()
+            )
+        else:
+            samples = self.samples()
+        lines.extend(f"{key} {_format_value(value)}" for key, value in samples)
+        return lines
+
+    def _sample_names(self) -> set[str]:
+        return {self.name}
+
+
+class Counter(Metric):
+    """ Монотонно растущий счётчик """
+    type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+        self._record(self.name, zip(self.labelnames, key), amount)
+
+    def samples(self) -> list[tuple[str, float]]:
+        with self._lock:
+            return [
+                (f"{self.name}{_format_labels(zip(self.labelnames, key))}", value)
+                for key, value in sorted(self._values.items())
+            ]
+
+
+class Gauge(Metric):
+    """
+    Текущее значение. Может вычисляться в момент запроса метрик функцией collector,
+    возвращающей {значения меток: значение}
+    """
+    type = "gauge"
+
+    def __init__(self, *args, collector: Callable[[], dict[tuple[str, ...], float]] | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple[str, ...], float] = {}
+        self.collector = collector
+
+    def set(self, value: float, **labels) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self) -> list[tuple[str, float]]:
+        if self.collector is not None:
+            try:
+                values = self.collector()
+            except Exception as exc:
+                logger.warning(f"Не удалось получить значение метрики {self.name}: {exc}")
+                values = {}
+        else:
+            with self._lock:
+                values = dict(self._values)
+        return [
+            (f"{self.name}{_format_labels(zip(self.labelnames, key))}", value)
+            for key, value in sorted(values.items())
+        ]
+
+
+class Histogram(Metric):
+    """ Распределение значений по корзинам (le) с суммой и количеством """
+    type = "histogram"
+
+    def __init__(self, *args, buckets: tuple[float, ...] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._values: dict[tuple[str, ...], list[float]] = {}  # метки => [корзины..., сумма, количество]
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            item = self._values.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    item[i] += 1
+            item[-2] += value
+            item[-1] += 1
+        if self.shared:
+            base = list(zip(self.labelnames, key))
+            for bound in self.buckets:
+                if value <= bound:
+                    self._record(f"{self.name}_bucket", base + [("le", _format_value(bound))], 1)
+            self._record(f"{self.name}_sum", base, value)
+            self._record(f"{self.name}_count", base, 1)
+
+    @contextmanager
+    def time(self, **labels):
+        """ Измеряет длительность блока with в секундах """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> list[tuple[str, float]]:
+        result = []
+        with self._lock:
+            for key, item in sorted(self._values.items()):
+                base = list(zip(self.labelnames, key))
+                for i, bound in enumerate(self.buckets):
+                    result.append((f"{self.name}_bucket{_format_labels(base + [('le', _format_value(bound))])}", item[i]))
+                result.append((f"{self.name}_sum{_format_labels(base)}", item[-2]))
+                result.append((f"{self.name}_count{_format_labels(base)}", item[-1]))
+        return result
+
+    def _sample_names(self) -> set[str]:
+        return {f"{self.name}_bucket", f"{self.name}_sum", f"{self.name}_count"}
+
+
+class StageTimer:
+    """
+    Последовательные этапы одного процесса: mark(этап) записывает в гистограмму
+    время с предыдущей отметки с меткой stage=этап
+    """
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+        self.started = time.perf_counter()
+
+    def mark(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.histogram.observe(now - self.started, stage=stage)
+        self.started = now
+
+    def restart(self) -> None:
+        """ Начинает отсчёт заново (время до этого не относится ни к одному этапу) """
+        self.started = time.perf_counter()
+
+
+class Registry:
+    """
+    Набор метрик процесса и накопленные приращения метрик воркера для сброса в Redis
+    """
+
+    def __init__(self):
+        self.metrics: list[Metric] = []
+        self._pending: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> None:
+        self.metrics.append(metric)
+
+    def add_pending(self, key: str, amount: float) -> None:
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0.0) + amount
+
+    def flush_shared(self, redis_client) -> None:
+        """
+        Переносит приращения метрик воркера в Redis одним pipeline.
+        При ошибке Redis приращения сохраняются до следующего сброса
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            for key, amount in pending.items():
+                pipe.hincrbyfloat(SHARED_METRICS_KEY, key, amount)
+            pipe.execute()
+        except Exception as exc:
+            logger.warning(f"Не удалось сохранить метрики воркера в Redis: {exc}")
+            for key, amount in pending.items():
+                self.add_pending(key, amount)
+
+    def render(self, shared_values: dict[str, float] | None = None) -> str:
+        """ Текст всех метрик в формате Prometheus """
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render(shared_values))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+async def load_shared_values(redis) -> dict[str, float]:
+    """ Читает метрики воркеров из Redis (async-клиент API) """
+    if redis is None:
+        return {}
+    try:
+        raw = await redis.hgetall(SHARED_METRICS_KEY)
+    except Exception as exc:
+        logger.warning(f"Не удалось прочитать метрики воркеров из Redis: {exc}")
+        return {}
+    return {key.decode(): float(value) for key, value in raw.items()}
+
+
+# --- Метрики приложения ---
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "hyperspectrus_http_request_seconds",
+    "Время обработки HTTP-запроса API",
+    ("method", "route", "status"),
+)
+
+PASSWORD_HASH_SECONDS = Histogram(
+    "hyperspectrus_password_hash_seconds",
+    "Время хеширования/проверки пароля с ожиданием в пуле",
+    ("operation",),
+)
+
+
+def _collect_db_pool() -> dict[tuple[str, ...], float]:
+    from src.db.postgres import get_pool_stats
+
+    return {
+        (engine, field): value
+        for engine, stats in get_pool_stats().items()
+        for field, value in stats.items()
+    }
+
+
+DB_POOL_CONNECTIONS = Gauge(
+    "hyperspectrus_db_pool_connections",
+    "Соединения пулов Postgres процесса API",
+    ("engine", "state"),
+    collector=_collect_db_pool,
+)
+
+PROCESSING_STAGE_SECONDS = Histogram(
+    "hyperspectrus_processing_stage_seconds",
+    "Длительность этапов обработки сеанса (load, register, od, unmix, segment, encode, db)",
+    ("stage",),
+    shared=True,
+)
+
+PROCESSING_SECONDS = Histogram(
+    "hyperspectrus_processing_seconds",
+    "Полная длительность обработки сеанса",
+    shared=True,
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0),
+)
+
+PROCESSING_QUEUE_WAIT_SECONDS = Histogram(
+    "hyperspectrus_processing_queue_wait_seconds",
+    "Время ожидания задачи обработки в очереди",
+    shared=True,
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0),
+)
+
+SESSIONS_PROCESSED = Counter(
+    "hyperspectrus_sessions_processed_total",
+    "Обработанные сеансы по итогу (success, skipped, failure)",
+    ("status",),
+    shared=True,
+)
@@ -0,0 +1,82 @@
+import json
+import base64
+import logging
+from datetime import date, datetime
+from typing import Awaitable, Callable
+from uuid import UUID
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.core.config import settings
+from src.exceptions.base import BaseException
+
+logger = logging.getLogger(__name__)
+
+"""
+Курсорная (keyset) пагинация и кеширование общего количества записей в Redis.
+Курсор — непрозрачная для клиента строка с ключом сортировки последней записи страницы:
+следующая страница выбирается условием (ключ) > (ключ курсора) по составному индексу,
+без OFFSET, поэтому глубокие страницы не медленнее первой.
+"""
+
+COUNT_KEY_PREFIX = "count"
+
+
+def encode_cursor(values: list) -> str:
+    """ Кодирует ключ сортировки последней записи страницы в курсор """
+    raw = json.dumps([str(v) if isinstance(v, (UUID, date, datetime)) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """ Раскодирует курсор в список значений ключа сортировки """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except (ValueError, UnicodeError) as exc:
+        raise BaseException("Некорректный курсор пагинации") from exc
+    if not isinstance(values, list) or len(values) != size:
+        raise BaseException("Некорректный курсор пагинации")
+    return values
+
+
+def count_key(entity: str, scope=None) -> str:
+    """ Ключ Redis для количества записей сущности (в пределах организации или всех) """
+    return f"{COUNT_KEY_PREFIX}:{entity}:{scope or 'all'}"
+
+
+async def get_cached_count(redis: Redis | None, key: str, loader: Callable[[], Awaitable[int]]) -> int:
+    """
+    Возвращает количество записей из Redis, а при промахе считает его через loader
+    и кладёт в кеш. Без Redis (или при его ошибке) количество считается запросом к БД
+    """
+    if redis is not None:
+        try:
+            cached = await redis.get(key)
+            if cached is not None:
+                return int(cached)
+        except (RedisError, ValueError) as exc:
+            logger.warning(f"Не удалось прочитать {key} из Redis: {exc}")
+    total = await loader()
+    if redis is not None:
+        try:
+            await redis.set(key, total, ex=settings.redis.count_cache_ttl)
+        except RedisError as exc:
+            logger.warning(f"Не удалось записать {key} в Redis: {exc}")
+    return total
+
+
+async def invalidate_counts(redis: Redis | None, entity: str) -> None:
+    """
+    Сбрасывает все кешированные счётчики сущности (по всем организациям и общий).
+    Вызывается после создания, удаления или переноса записи в другую организацию
+    """
+    if redis is None:
+        return
+    try:
+        keys = [key async for key in redis.scan_iter(match=f"{COUNT_KEY_PREFIX}:{entity}:*")]
+        if keys:
+            await redis.delete(*keys)
+    except RedisError as exc:
+        logger.warning(f"Не удалось сбросить счётчики {entity} в Redis: {exc}")
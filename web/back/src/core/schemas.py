@@ -14,6 +14,7 @@ class PaginatedResponse(BaseModel, Generic[T]):
     offset: int = Field(..., description="Смещение от начала коллекции")
     has_next: bool = Field(..., description="Есть ли следующая страница")
     has_previous: bool = Field(..., description="Есть ли предыдущая страница")
+    next_cursor: str | None = Field(None, description="Курсор следующей страницы (для параметра cursor)")
 
 
 class BasePaginationParams(BaseModel):
@@ -46,5 +46,5 @@ class JWTBearer(HTTPBearer):
 
     @staticmethod
     def parse_token(jwt_token: str) -> Optional[dict]:
-        payload = JWTHelper().decode(jwt_token)
+        payload = JWTHelper.decode(jwt_token)
         return payload
\ No newline at end of file
@@ -11,6 +11,16 @@ engine = create_async_engine(
     settings.db.dsn,
     echo=settings.db.show_query,
     future=True,
+    pool_size=settings.db.pool_size,
+    max_overflow=settings.db.max_overflow,
+    pool_timeout=settings.db.pool_timeout,
+    pool_recycle=settings.db.pool_recycle,
+    pool_pre_ping=settings.db.pool_pre_ping,
+    connect_args={
+        # Кеш asyncpg и кеш подготовленных выражений диалекта SQLAlchemy
+        "statement_cache_size": settings.db.statement_cache_size,
+        "prepared_statement_cache_size": settings.db.statement_cache_size,
+    },
     )
 
 async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
@@ -32,6 +42,30 @@ sync_engine = create_engine(
     settings.db.dsn.replace("+asyncpg", ""),
     echo=settings.db.show_query,
     future=True,
+    pool_size=settings.db.sync_pool_size,
+    max_overflow=settings.db.sync_max_overflow,
+    pool_timeout=settings.db.pool_timeout,
+    pool_recycle=settings.db.pool_recycle,
+    pool_pre_ping=settings.db.pool_pre_ping,
 )
 
-SyncSessionLocal = orm.sessionmaker(sync_engine, expire_on_commit=False)
\ No newline at end of file
+SyncSessionLocal = orm.sessionmaker(sync_engine, expire_on_commit=False)
+
+
+def _pool_stats(pool) -> dict:
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+    }
+
+
+def get_pool_stats() -> dict:
+    """
+    Загрузка пулов соединений процесса: async (API) и sync (Celery)
+    """
+    return {
+        "async": _pool_stats(engine.sync_engine.pool),
+        "sync": _pool_stats(sync_engine.pool),
+    }
\ No newline at end of file
@@ -1,9 +1,10 @@
 import uvicorn
 import logging
 import os
+import time
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
@@ -13,7 +14,10 @@ from src.db import redis
 from src.core.config import settings
 from src.core.logger import LOGGING
 from src.api.v1 import router
+from src.api import metrics
+from src.core.metrics import HTTP_REQUEST_SECONDS
 from src.exceptions.handlers import register_exception_handlers
+from src.utils.password import shutdown_executor
 
 
 @asynccontextmanager
@@ -25,6 +29,7 @@ async def lifespan(app: FastAPI):
     redis.redis = Redis(host=settings.redis.host, port=settings.redis.port)
     yield
     await redis.redis.close()
+    shutdown_executor()
 
 
 # Инициализация FastAPI-приложения
@@ -49,10 +54,32 @@ app.add_middleware(
     allow_headers=["*"],  # Разрешить все заголовки
 )
 
+
+@app.middleware("http")
+async def observe_request_time(request: Request, call_next):
+    """
+    Учитывает время обработки запроса в метрике hyperspectrus_http_request_seconds.
+    Метка route — шаблон пути (/patients/{patient_id}/), а не сам путь, чтобы не плодить ряды
+    """
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            method=request.method, route=route, status=status_code,
+        )
+
+
 app.mount("/media", StaticFiles(directory=os.path.abspath("media")), name="media")
 
 # Подключение роутера для версии v1
 app.include_router(router, prefix="/api/v1")
+app.include_router(metrics.router, tags=["metrics"])
 
 
 # Точка входа в приложение
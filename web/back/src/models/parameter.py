@@ -1,6 +1,6 @@
 import uuid
 
-from sqlalchemy import Column, String, Float, Integer, ForeignKey
+from sqlalchemy import Column, String, Float, Integer, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 
@@ -15,6 +15,9 @@ class Device(Base):
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String(255), unique=True, nullable=False)  # Модель устройства
+    # Версия матрицы коэффициентов перекрытий: растёт при каждом её изменении,
+    # по ней кеши обработки понимают, что матрица устарела
+    overlap_version = Column(Integer, nullable=False, default=0, server_default='0')
 
     spectra = relationship("Spectrum", back_populates="device", cascade="all, delete-orphan")
     sessions = relationship("Session", back_populates="device")
@@ -63,4 +66,9 @@ class OverlapCoefficient(Base):
     coefficient = Column(Float, nullable=False)  # Коэффициент перекрытия
 
     spectrum = relationship("Spectrum", back_populates="overlaps")
-    chromophore = relationship("Chromophore", back_populates="overlaps")
\ No newline at end of file
+    chromophore = relationship("Chromophore", back_populates="overlaps")
+
+    __table_args__ = (
+        # Одна ячейка матрицы на пару спектр-хромофор; ключ для INSERT ... ON CONFLICT
+        Index("uq_overlap_coefficients_spectrum_chromophore", "spectrum_id", "chromophore_id", unique=True),
+    )
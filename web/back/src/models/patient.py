@@ -2,9 +2,9 @@ import uuid
 import enum
 
 from sqlalchemy import Enum as SAEnum
-from sqlalchemy import Column, String, func, ForeignKey, Float, DateTime, Date
+from sqlalchemy import Column, String, func, ForeignKey, Float, Integer, DateTime, Date, Index, Boolean
 from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 
 from src.db.postgres import Base
 from src.constants.celery import CeleryStatus
@@ -26,6 +26,12 @@ class Patient(Base):
     sessions = relationship("Session", back_populates="patient")
     organization = relationship("Organization", back_populates="patients")
 
+    __table_args__ = (
+        # Порядок списка пациентов (full_name, id) — для курсорной пагинации
+        Index("ix_patients_full_name_id", "full_name", "id"),
+        Index("ix_patients_organization_full_name_id", "organization_id", "full_name", "id"),
+    )
+
     def __repr__(self) -> str:
         return f'<Patient {self.full_name}>'
 
@@ -45,6 +51,11 @@ class Session(Base):
     notes = Column(String)  # Дополнительные заметки
     processing_task_id = Column(String, nullable=True)
     processing_status = Column(SAEnum(CeleryStatus), nullable=True)
+    # Область интереса (ROI) в пикселях исходных снимков; если не задана — обрабатывается весь кадр
+    roi_x = Column(Integer, nullable=True)
+    roi_y = Column(Integer, nullable=True)
+    roi_width = Column(Integer, nullable=True)
+    roi_height = Column(Integer, nullable=True)
 
     patient = relationship("Patient", back_populates="sessions")
     device = relationship("Device", back_populates="sessions")
@@ -53,6 +64,13 @@ class Session(Base):
     reconstructed_images = relationship("ReconstructedImage", back_populates="session", cascade="all, delete-orphan")
     result = relationship("Result", back_populates="session", uselist=False, single_parent=True, cascade="all, delete-orphan")
 
+    @property
+    def roi(self) -> tuple[int, int, int, int] | None:
+        """ ROI (x, y, ширина, высота) или None """
+        if None in (self.roi_x, self.roi_y, self.roi_width, self.roi_height):
+            return None
+        return self.roi_x, self.roi_y, self.roi_width, self.roi_height
+
 
 class RawImage(Base):
     """
@@ -65,6 +83,8 @@ class RawImage(Base):
     session_id = Column(UUID(as_uuid=True), ForeignKey('sessions.id'))
     spectrum_id = Column(UUID(as_uuid=True), ForeignKey('spectra.id'))
     file_path = Column(String, nullable=False)
+    # Построены ли миниатюра и пирамида тайлов (URL производных отдаются без проверки диска)
+    has_derivatives = Column(Boolean, nullable=False, default=False, server_default='false')
 
     session = relationship("Session", back_populates="raw_images")
     spectrum = relationship("Spectrum", back_populates="raw_images")
@@ -81,6 +101,8 @@ class ReconstructedImage(Base):
     session_id = Column(UUID(as_uuid=True), ForeignKey('sessions.id'))
     chromophore_id = Column(UUID(as_uuid=True), ForeignKey('chromophores.id'))
     file_path = Column(String, nullable=False)
+    # Построены ли миниатюра и пирамида тайлов (URL производных отдаются без проверки диска)
+    has_derivatives = Column(Boolean, nullable=False, default=False, server_default='false')
 
     session = relationship("Session", back_populates="reconstructed_images")
     chromophore = relationship("Chromophore", back_populates="reconstructed_images")
@@ -96,8 +118,12 @@ class Result(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     session_id = Column(UUID(as_uuid=True), ForeignKey('sessions.id'), unique=True)
     contour_path = Column(String, nullable=True)
+    # Построены ли миниатюра и пирамида тайлов изображения контура
+    contour_has_derivatives = Column(Boolean, nullable=False, default=False, server_default='false')
     s_coefficient = Column(Float, nullable=False)
     mean_lesion_thb = Column(Float, nullable=False)
     mean_skin_thb = Column(Float, nullable=False)
+    # Сдвиги каналов при совмещении: [{"wavelength", "dy", "dx"}] в пикселях обрабатываемого снимка
+    registration_shifts = Column(JSONB, nullable=True)
 
     session = relationship("Session", back_populates="result")
\ No newline at end of file
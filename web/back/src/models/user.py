@@ -1,7 +1,7 @@
 import uuid
 from typing import Optional
 
-from sqlalchemy import Column, DateTime, String, Boolean, ForeignKey, Table, func
+from sqlalchemy import Column, DateTime, String, Boolean, ForeignKey, Table, Index, func
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 from werkzeug.security import check_password_hash, generate_password_hash
@@ -45,6 +45,15 @@ class User(Base):
 
     sessions = relationship("Session", back_populates="operator")
 
+    __table_args__ = (
+        # Порядок списка пользователей (фамилия, имя, id) — для курсорной пагинации
+        Index("ix_users_sort_key", func.coalesce(last_name, ''), func.coalesce(first_name, ''), id),
+        Index(
+            "ix_users_organization_sort_key",
+            organization_id, func.coalesce(last_name, ''), func.coalesce(first_name, ''), id,
+        ),
+    )
+
     def __init__(self, username: str,
                  password: str,
                  email: str,
@@ -52,10 +61,12 @@ class User(Base):
                  last_name: str = "",
                  is_active: bool = True,
                  is_superuser: bool = False,
-                 organization_id: Optional[UUID] = None
+                 organization_id: Optional[UUID] = None,
+                 hashed_password: Optional[str] = None,
                  ) -> None:
         self.username = username
-        self.hashed_password = generate_password_hash(password)
+        # Готовый хеш передаётся из async-кода (см. src.utils.password), чтобы не хешировать в цикле событий
+        self.hashed_password = hashed_password or generate_password_hash(password)
         self.first_name = first_name
         self.last_name = last_name
         self.email = email
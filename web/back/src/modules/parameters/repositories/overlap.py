@@ -1,11 +1,13 @@
+import uuid
 from uuid import UUID
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import update, select
 from sqlalchemy.orm import joinedload
 from sqlalchemy.exc import NoResultFound
+from sqlalchemy.dialects.postgresql import insert
 
-from src.models.parameter import OverlapCoefficient
+from src.models.parameter import Device, Spectrum, OverlapCoefficient
 from src.modules.parameters.schemas.overlap import OverlapCoefficientUpdateSchema
 
 
@@ -54,3 +56,63 @@ class OverlapCoefficientRepository:
         )
         result = await self.session.execute(query)
         return result.scalars().one_or_none()
+
+    async def get_values(self, spectrum_ids: list[UUID]) -> dict[tuple[UUID, UUID], float]:
+        """ Получает коэффициенты спектров одним запросом: {(spectrum_id, chromophore_id): коэффициент} """
+        if not spectrum_ids:
+            return {}
+        query = (
+            select(OverlapCoefficient.spectrum_id, OverlapCoefficient.chromophore_id, OverlapCoefficient.coefficient)
+            .where(OverlapCoefficient.spectrum_id.in_(spectrum_ids))
+        )
+        result = await self.session.execute(query)
+        return {(s_id, c_id): coef for s_id, c_id, coef in result.all()}
+
+    async def get_device_spectra(self, device_id: UUID) -> list[Spectrum]:
+        """ Получает спектры устройства (строки матрицы) по возрастанию длины волны """
+        query = select(Spectrum).where(Spectrum.device_id == device_id).order_by(Spectrum.wavelength.asc())
+        result = await self.session.execute(query)
+        return result.scalars().all()
+
+    async def upsert_many(self, values: dict[tuple[UUID, UUID], float]) -> None:
+        """ Создаёт или обновляет коэффициенты одним запросом INSERT ... ON CONFLICT """
+        if not values:
+            return
+        stmt = insert(OverlapCoefficient).values([
+            {"id": uuid.uuid4(), "spectrum_id": s_id, "chromophore_id": c_id, "coefficient": coef}
+            for (s_id, c_id), coef in values.items()
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[OverlapCoefficient.spectrum_id, OverlapCoefficient.chromophore_id],
+            set_={"coefficient": stmt.excluded.coefficient},
+        )
+        await self.session.execute(stmt)
+
+    async def get_version(self, device_id: UUID) -> int | None:
+        """ Получает текущую версию матрицы устройства """
+        query = select(Device.overlap_version).where(Device.id == device_id)
+        result = await self.session.execute(query)
+        return result.scalar_one_or_none()
+
+    async def bump_version(self, device_id: UUID, expected: int | None = None) -> int | None:
+        """
+        Увеличивает версию матрицы устройства и возвращает новое значение.
+        Если задана expected — только при совпадении с текущей версией (проверка и увеличение
+        одним UPDATE), иначе возвращает None; None также, если устройства нет
+        """
+        stmt = update(Device).where(Device.id == device_id)
+        if expected is not None:
+            stmt = stmt.where(Device.overlap_version == expected)
+        stmt = stmt.values(overlap_version=Device.overlap_version + 1).returning(Device.overlap_version)
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def bump_version_by_spectrum(self, spectrum_id: UUID) -> None:
+        """ Увеличивает версию матрицы устройства, которому принадлежит спектр """
+        device_id = select(Spectrum.device_id).where(Spectrum.id == spectrum_id).scalar_subquery()
+        stmt = (
+            update(Device)
+            .where(Device.id == device_id)
+            .values(overlap_version=Device.overlap_version + 1)
+        )
+        await self.session.execute(stmt)
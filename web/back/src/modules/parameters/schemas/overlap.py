@@ -22,3 +22,36 @@ class OverlapCoefficientUpdateSchema(BaseModel):
     spectrum_id: UUID | None = Field(None, description="Новый ID спектра")
     chromophore_id: UUID | None = Field(None, description="Новый ID хромофора")
     coefficient: float | None = Field(None, description="Новый коэффициент")
+
+
+class OverlapMatrixSpectrumSchema(BaseModel):
+    id: UUID = Field(..., description="ID спектра")
+    wavelength: int = Field(..., description="Длина волны в нанометрах")
+    name: str | None = Field(None, description="Название спектра")
+
+    class Config:
+        from_attributes = True
+
+
+class OverlapMatrixChromophoreSchema(BaseModel):
+    id: UUID = Field(..., description="ID хромофора")
+    name: str = Field(..., description="Название хромофора")
+    symbol: str = Field(..., description="Обозначение хромофора")
+
+    class Config:
+        from_attributes = True
+
+
+class OverlapMatrixSchema(BaseModel):
+    device_id: UUID = Field(..., description="ID устройства")
+    version: int = Field(..., description="Версия матрицы (растёт при каждом изменении)")
+    spectra: list[OverlapMatrixSpectrumSchema] = Field(..., description="Строки матрицы: спектры устройства по возрастанию длины волны")
+    chromophores: list[OverlapMatrixChromophoreSchema] = Field(..., description="Столбцы матрицы: хромофоры по названию")
+    coefficients: list[list[float]] = Field(..., description="Плотная матрица коэффициентов [спектр][хромофор], отсутствующие — 0")
+
+
+class OverlapMatrixUpdateSchema(BaseModel):
+    spectrum_ids: list[UUID] = Field(..., description="ID спектров устройства (строки матрицы)")
+    chromophore_ids: list[UUID] = Field(..., description="ID хромофоров (столбцы матрицы)")
+    coefficients: list[list[float]] = Field(..., description="Плотная матрица коэффициентов [спектр][хромофор]")
+    version: int | None = Field(None, description="Версия, с которой начиналось редактирование (для обнаружения конфликта)")
@@ -20,7 +20,7 @@ class ChromophoreService:
         """
         Выдаёт список всех хромофор
         """
-        async with self.uow:
+        async with self.uow.read_only():
             chromophores = await self.uow.chromophore.get_all()
 
         return chromophores
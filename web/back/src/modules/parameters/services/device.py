@@ -5,10 +5,9 @@ import random
 from sqlalchemy.exc import IntegrityError, NoResultFound
 
 from src.exceptions.base import BaseException
-from src.models.parameter import Device, OverlapCoefficient
+from src.models.parameter import Device
 from src.modules.parameters.repositories.uow import UnitOfWork
 from src.modules.parameters.schemas.device import DeviceSchema, DeviceUpdateSchema, DeviceDetailSchema
-from src.modules.parameters.schemas.overlap import OverlapCoefficientUpdateSchema
 
 
 class DeviceService:
@@ -22,7 +21,7 @@ class DeviceService:
         """
         Выдаёт список всех устройств
         """
-        async with self.uow:
+        async with self.uow.read_only():
             devices = await self.uow.device.get_all()
 
         return devices
@@ -31,7 +30,7 @@ class DeviceService:
         """
         Выдаёт детальную информацию об устройстве по его ID
         """
-        async with self.uow:
+        async with self.uow.read_only():
             device = await self.uow.device.get_detail_by_id(device_id)
 
             device.spectra.sort(key=lambda s: s.wavelength if s.wavelength is not None else 0)
@@ -79,31 +78,20 @@ class DeviceService:
         Заполнить все коэффициенты перекрытия устройства случайными числами (0...50000, 2 знака)
         """
         async with self.uow:
-            device = await self.uow.device.get_detail_by_id(device_id)
-            if not device:
+            spectra = await self.uow.overlap.get_device_spectra(device_id)
+            if await self.uow.overlap.get_version(device_id) is None:
                 raise BaseException(f"Устройство с ID {device_id} не найдено")
 
             chromophores = await self.uow.chromophore.get_all()
 
-            for spectrum in device.spectra:
+            values = {}
+            for spectrum in spectra:
                 for chromophore in chromophores:
                     if chromophore.symbol.lower() == "bkg":
                         coefficient_value = 100
                     else:
                         coefficient_value = random.randint(0, 50000)
-                    overlap = await self.uow.overlap.get_by_spec_and_chrom(
-                        spectrum.id, chromophore.id
-                    )
-                    if overlap:
-                        await self.uow.overlap.update(
-                            overlap.id,
-                            OverlapCoefficientUpdateSchema(coefficient=coefficient_value)
-                        )
-                    else:
-                        await self.uow.overlap.create(
-                            OverlapCoefficient(
-                                spectrum_id=spectrum.id,
-                                chromophore_id=chromophore.id,
-                                coefficient=coefficient_value,
-                            )
-                        )
\ No newline at end of file
+                    values[(spectrum.id, chromophore.id)] = coefficient_value
+            # Вся матрица записывается одним запросом INSERT ... ON CONFLICT
+            await self.uow.overlap.upsert_many(values)
+            await self.uow.overlap.bump_version(device_id)
@@ -6,7 +6,9 @@ from sqlalchemy.exc import IntegrityError, NoResultFound
 from src.exceptions.base import BaseException
 from src.models.parameter import OverlapCoefficient
 from src.modules.parameters.repositories.uow import UnitOfWork
-from src.modules.parameters.schemas.overlap import OverlapCoefficientSchema, OverlapCoefficientUpdateSchema
+from src.modules.parameters.schemas.overlap import (
+    OverlapCoefficientSchema, OverlapCoefficientUpdateSchema, OverlapMatrixSchema, OverlapMatrixUpdateSchema
+)
 
 
 class OverlapCoefficientService:
@@ -28,6 +30,7 @@ class OverlapCoefficientService:
                     coefficient=body.coefficient,
                 )
                 await self.uow.overlap.create(overlap_coefficient)
+                await self.uow.overlap.bump_version_by_spectrum(body.spectrum_id)
             except IntegrityError as exc:
                 raise BaseException("Коэффициент перекрытия уже существует") from exc
 
@@ -40,6 +43,8 @@ class OverlapCoefficientService:
         async with self.uow:
             try:
                 overlap_coefficient = await self.uow.overlap.update(overlap_coefficient_id, body)
+                if overlap_coefficient:
+                    await self.uow.overlap.bump_version_by_spectrum(overlap_coefficient.spectrum_id)
             except NoResultFound as exc:
                 raise BaseException(f"Коэффициент перекрытия с ID {overlap_coefficient_id} не найден") from exc
         return overlap_coefficient
@@ -50,6 +55,69 @@ class OverlapCoefficientService:
         """
         async with self.uow:
             try:
+                overlap_coefficient = await self.uow.overlap.get_by_id(overlap_coefficient_id)
                 await self.uow.overlap.delete(overlap_coefficient_id)
+                await self.uow.overlap.bump_version_by_spectrum(overlap_coefficient.spectrum_id)
             except NoResultFound as exc:
-                raise BaseException(f"Коэффициент перекрытия с ID {overlap_coefficient_id} не найден") from exc
\ No newline at end of file
+                raise BaseException(f"Коэффициент перекрытия с ID {overlap_coefficient_id} не найден") from exc
+
+    async def get_matrix(self, device_id: UUID) -> OverlapMatrixSchema:
+        """
+        Выдаёт всю матрицу коэффициентов устройства плотным массивом [спектр][хромофор]
+        """
+        async with self.uow.read_only():
+            version = await self.uow.overlap.get_version(device_id)
+            if version is None:
+                raise BaseException(f"Устройство с ID {device_id} не найдено")
+            return await self._load_matrix(device_id, version)
+
+    async def update_matrix(self, device_id: UUID, body: OverlapMatrixUpdateSchema) -> OverlapMatrixSchema:
+        """
+        Сохраняет матрицу коэффициентов устройства одной транзакцией (INSERT ... ON CONFLICT)
+        и увеличивает её версию. Если передана версия и она устарела — изменения не применяются
+        """
+        if len(body.coefficients) != len(body.spectrum_ids) or any(
+            len(row) != len(body.chromophore_ids) for row in body.coefficients
+        ):
+            raise BaseException("Размер матрицы не совпадает с числом спектров и хромофоров")
+        if len(set(body.spectrum_ids)) != len(body.spectrum_ids) or len(set(body.chromophore_ids)) != len(body.chromophore_ids):
+            raise BaseException("Спектры и хромофоры в матрице не должны повторяться")
+
+        async with self.uow:
+            # Проверка версии и её увеличение — один условный UPDATE: он же блокирует строку устройства
+            # до конца транзакции, и два запроса с одной версией не могут оба пройти проверку
+            version = await self.uow.overlap.bump_version(device_id, body.version)
+            if version is None:
+                current = await self.uow.overlap.get_version(device_id)
+                if current is None:
+                    raise BaseException(f"Устройство с ID {device_id} не найдено")
+                raise BaseException(
+                    f"Матрица была изменена (версия {current}, ожидалась {body.version}). Обновите данные и повторите"
+                )
+
+            spectrum_ids = {s.id for s in await self.uow.overlap.get_device_spectra(device_id)}
+            if not set(body.spectrum_ids) <= spectrum_ids:
+                raise BaseException("Матрица содержит спектры другого устройства")
+            chromophore_ids = {c.id for c in await self.uow.chromophore.get_all()}
+            if not set(body.chromophore_ids) <= chromophore_ids:
+                raise BaseException("Матрица содержит несуществующие хромофоры")
+
+            values = {
+                (s_id, c_id): float(coef)
+                for s_id, row in zip(body.spectrum_ids, body.coefficients)
+                for c_id, coef in zip(body.chromophore_ids, row)
+            }
+            await self.uow.overlap.upsert_many(values)
+            return await self._load_matrix(device_id, version)
+
+    async def _load_matrix(self, device_id: UUID, version: int) -> OverlapMatrixSchema:
+        spectra = await self.uow.overlap.get_device_spectra(device_id)
+        chromophores = await self.uow.chromophore.get_all()
+        values = await self.uow.overlap.get_values([s.id for s in spectra])
+        return OverlapMatrixSchema(
+            device_id=device_id,
+            version=version,
+            spectra=spectra,
+            chromophores=chromophores,
+            coefficients=[[values.get((s.id, c.id), 0.0) for c in chromophores] for s in spectra],
+        )
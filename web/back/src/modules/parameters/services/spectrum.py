@@ -20,7 +20,7 @@ class SpectrumService:
         """
         Выдаёт список всех спектров устройства по его ID
         """
-        async with self.uow:
+        async with self.uow.read_only():
             spectrums = await self.uow.spectrum.get_all(device_id)
 
         return [SpectrumSchema.model_validate(s) for s in spectrums]
@@ -1,8 +1,10 @@
 from typing import Annotated
 from fastapi import Depends, Query
+from redis.asyncio import Redis
 
 from src.core.schemas import BasePaginationParams
 from src.core.dependencies import get_pagination_params
+from src.db.redis import get_redis
 from src.modules.patients.dependencies.uow import get_unit_of_work
 from src.modules.patients.schemas.patient import PatientQueryParams
 from src.modules.patients.repositories.uow import UnitOfWork
@@ -12,6 +14,7 @@ from src.modules.patients.services.patient import PatientService
 def get_patient_params(
         pagination: Annotated[BasePaginationParams, Depends(get_pagination_params)],
         organization_id: str | None = Query(None, description='Параметр фильтрации по id организации'),
+        cursor: str | None = Query(None, description='Курсор следующей страницы (next_cursor предыдущего ответа); если задан, offset не используется'),
 ) -> PatientQueryParams:
     """ Получает query-параметры фильтрации для пациентов """
 
@@ -19,13 +22,15 @@ def get_patient_params(
         limit=pagination.limit,
         offset=pagination.offset,
         organization_id=organization_id,
+        cursor=cursor,
     )
 
 
 def get_patient_service(
     uow: Annotated[UnitOfWork, Depends(get_unit_of_work)],
+    redis: Annotated[Redis, Depends(get_redis)],
 ) -> PatientService:
     """
     Возвращает экземпляр PatientService с переданным UnitOfWork (UoW)
     """
-    return PatientService(uow=uow)
\ No newline at end of file
+    return PatientService(uow=uow, redis=redis)
\ No newline at end of file
@@ -3,7 +3,7 @@ from uuid import UUID
 from typing import List, Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, func
+from sqlalchemy import select, update, func, tuple_
 from sqlalchemy.orm import selectinload, joinedload
 from sqlalchemy.exc import NoResultFound
 
@@ -21,25 +21,36 @@ class PatientRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get_all(self, params: PatientQueryParams) -> tuple[list[PatientSchema], int]:
-        """ Возвращает постраничный список пациентов и их общее количество """
+    async def get_all(self, params: PatientQueryParams, after: tuple[str, UUID] | None = None) -> tuple[list[Patient], bool]:
+        """
+        Возвращает страницу пациентов, отсортированных по (full_name, id), и признак следующей страницы.
+        after — ключ последней записи предыдущей страницы (курсорная пагинация по составному индексу);
+        без него используется прежняя пагинация через offset
+        """
         query = select(Patient).options(joinedload(Patient.organization))
         if params.organization_id:
             query = query.where(Patient.organization_id == params.organization_id)
 
-        total_query = select(func.count()).select_from(query.subquery())
+        query = query.order_by(Patient.full_name.asc(), Patient.id.asc())
 
-        query = query.order_by(Patient.full_name.asc())
+        if after is not None:
+            query = query.where(tuple_(Patient.full_name, Patient.id) > tuple_(*after))
+        else:
+            query = query.offset(params.offset * params.limit)
 
-        paginated_query = query.limit(params.limit).offset(params.offset * params.limit)
-
-        total_result = await self.session.execute(total_query)
-        result = await self.session.execute(paginated_query)
-
-        total = total_result.scalar()
+        # Одна лишняя запись показывает, есть ли следующая страница, без подсчёта всех записей
+        result = await self.session.execute(query.limit(params.limit + 1))
         items = result.scalars().unique().all()
 
-        return items, total
+        return items[:params.limit], len(items) > params.limit
+
+    async def count(self, organization_id: UUID | None = None) -> int:
+        """ Возвращает количество пациентов (в организации или всех) """
+        query = select(func.count()).select_from(Patient)
+        if organization_id:
+            query = query.where(Patient.organization_id == organization_id)
+        result = await self.session.execute(query)
+        return result.scalar_one()
 
     async def get_by_id(self, patient_id: UUID) -> PatientDetailSchema:
         """ Возвращает пациента по его ID """
@@ -6,13 +6,17 @@ from typing import List, Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import update, select
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, contains_eager, noload
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.exc import NoResultFound
 
 from src.core.config import settings
 from src.constants.celery import CeleryStatus
-from src.models.patient import Session, RawImage, ReconstructedImage
+from src.models.patient import Session, Patient, RawImage, ReconstructedImage, Result
+from src.models.parameter import Device, Spectrum, Chromophore
+from src.models.user import User
 from src.modules.patients.schemas.session import SessionUpdateSchema
+from src.utils.image import remove_derivatives
 
 logger = logging.getLogger(__name__)
 
@@ -31,30 +35,91 @@ class SessionRepository:
         result = await self.session.execute(query)
         return result.scalars().unique().one_or_none()
 
-    async def get_detail_by_id(self, session_id: UUID) -> Session:
-        """ Возвращает сеанс по его ID """
+    async def get_detail_by_id(self, session_id: UUID, with_images: bool = True) -> Session:
+        """
+        Возвращает сеанс по его ID со связанными объектами.
+        Пациент, оператор и устройство загружаются только нужными столбцами, а коллекции
+        изображений — отдельными запросами, уже отсортированными в БД (без декартова произведения
+        исходных и восстановленных изображений). with_images=False — без изображений
+        """
         query = (
             select(Session)
             .options(
-                joinedload(Session.patient),
-                joinedload(Session.operator),
-                joinedload(Session.device),
-                joinedload(Session.raw_images)
-                    .joinedload(RawImage.spectrum),
-                joinedload(Session.reconstructed_images)
-                    .joinedload(ReconstructedImage.chromophore),
+                joinedload(Session.patient).load_only(
+                    Patient.id, Patient.full_name, Patient.birth_date, Patient.notes
+                ),
+                joinedload(Session.operator).load_only(User.id, User.first_name, User.last_name),
+                joinedload(Session.device).load_only(Device.id, Device.name),
                 joinedload(Session.result),
+                noload(Session.raw_images),
+                noload(Session.reconstructed_images),
+            )
+            .where(Session.id == session_id)
+        )
+        result = await self.session.execute(query)
+        session_obj = result.unique().scalars().one_or_none()
+        if session_obj is None:
+            return None
+
+        raw_images, reconstructed_images = [], []
+        if with_images:
+            raw_images = await self.get_raw_images(session_id)
+            reconstructed_images = await self.get_reconstructed_images(session_id)
+        set_committed_value(session_obj, "raw_images", raw_images)
+        set_committed_value(session_obj, "reconstructed_images", reconstructed_images)
+        return session_obj
+
+    async def get_raw_images(self, session_id: UUID) -> list[RawImage]:
+        """ Возвращает исходные изображения сеанса по возрастанию длины волны """
+        query = (
+            select(RawImage)
+            .outerjoin(RawImage.spectrum)
+            .options(contains_eager(RawImage.spectrum).load_only(Spectrum.id, Spectrum.wavelength, Spectrum.name))
+            .where(RawImage.session_id == session_id)
+            .order_by(Spectrum.wavelength.asc().nulls_first(), RawImage.id)
+        )
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
+
+    async def get_reconstructed_images(self, session_id: UUID) -> list[ReconstructedImage]:
+        """ Возвращает восстановленные изображения сеанса по названию хромофора """
+        query = (
+            select(ReconstructedImage)
+            .outerjoin(ReconstructedImage.chromophore)
+            .options(
+                contains_eager(ReconstructedImage.chromophore)
+                .load_only(Chromophore.id, Chromophore.name, Chromophore.symbol)
+            )
+            .where(ReconstructedImage.session_id == session_id)
+            .order_by(Chromophore.name.asc().nulls_first(), ReconstructedImage.id)
+        )
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
+
+    async def get_status(self, session_id: UUID):
+        """
+        Возвращает только статус обработки сеанса (одна строка, без загрузки связанных объектов)
+        """
+        query = (
+            select(
+                Session.id,
+                Session.patient_id,
+                Session.processing_task_id,
+                Session.processing_status,
+                Result.id.label("result_id"),
             )
+            .outerjoin(Result, Result.session_id == Session.id)
             .where(Session.id == session_id)
         )
         result = await self.session.execute(query)
-        return result.unique().scalars().one_or_none()
+        return result.one_or_none()
 
     async def create(self, session: Session) -> Session:
         """ Создаёт новый сеанс пациента """
         self.session.add(session)
         await self.session.flush()
-        return await self.get_detail_by_id(session.id)
+        # У нового сеанса ещё нет изображений — запросы коллекций не нужны
+        return await self.get_detail_by_id(session.id, with_images=False)
 
     async def update(self, session_id: UUID, body: SessionUpdateSchema) -> Optional[Session]:
         """ Обновляет сеанс по его ID """
@@ -95,6 +160,7 @@ class SessionRepository:
                     os.remove(abs_path)
                 except Exception as e:
                     logger.warning(f"Ошибка при удалении raw image файла {abs_path}: {e}")
+            remove_derivatives(raw.file_path)
 
         # Удаление папки
         raw_images_dir = os.path.join(settings.media.raw_images_path, str(session_id))
@@ -106,6 +172,7 @@ class SessionRepository:
                     shutil.rmtree(raw_images_dir)
             except Exception as e:
                 logger.warning(f"Ошибка при удалении папки raw images {raw_images_dir}: {e}")
+        shutil.rmtree(os.path.join(settings.media.derivatives_path, "raw_images", str(session_id)), ignore_errors=True)
 
         # Удаляем reconstructed images и их файлы
         for rec in session_obj.reconstructed_images:
@@ -116,6 +183,7 @@ class SessionRepository:
                     os.remove(abs_path)
                 except Exception as e:
                     logger.warning(f"Ошибка при удалении reconstructed image файла {abs_path}: {e}")
+            remove_derivatives(rec.file_path)
 
         # Удаляем result и файл контура
         if session_obj.result and session_obj.result.contour_path:
@@ -126,6 +194,7 @@ class SessionRepository:
                     os.remove(abs_path)
                 except Exception as e:
                     logger.warning(f"Ошибка при удалении contour файла {abs_path}: {e}")
+            remove_derivatives(session_obj.result.contour_path)
 
         # Удаляем объект сеанса (с каскадом должны удалиться все дочерние объекты в БД)
         await self.session.delete(session_obj)
@@ -7,6 +7,16 @@ from src.modules.patients.repositories.raw_image import RawImageRepository
 class UnitOfWork:
     def __init__(self):
         self.session_factory = async_session_maker
+        self._read_only = False
+
+    def read_only(self) -> "UnitOfWork":
+        """
+        Следующий блок async with только читает данные: COMMIT не выполняется,
+        сессия просто закрывается (транзакцию откатывает пул при возврате соединения).
+        Загруженные объекты при этом не сбрасываются и остаются доступны после блока
+        """
+        self._read_only = True
+        return self
 
     async def __aenter__(self):
         self.session = self.session_factory()
@@ -17,8 +27,9 @@ class UnitOfWork:
     async def __aexit__(self, exc_type, exc_value, traceback):
         if exc_type is not None:
             await self.rollback()
-        else:
+        elif not self._read_only:
             await self.commit()
+        self._read_only = False
         await self.session.close()
 
     async def commit(self):
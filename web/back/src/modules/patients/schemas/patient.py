@@ -9,6 +9,7 @@ from src.core.schemas import BasePaginationParams
 
 class PatientQueryParams(BasePaginationParams):
     organization_id: UUID | None
+    cursor: str | None = None
 
     class Config:
         arbitrary_types_allowed = True
@@ -1,7 +1,9 @@
 from uuid import UUID
 from typing import List
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, computed_field
+
+from src.utils.image import get_thumbnail_url, get_tiles_url
 
 
 class RawImageSchema(BaseModel):
@@ -12,6 +14,17 @@ class RawImageSchema(BaseModel):
     session_id: UUID = Field(..., description="ID сеанса")
     spectrum_id: UUID = Field(..., description="ID длины волны")
     file_path: str = Field(..., description="Путь к файлу изображения")
+    has_derivatives: bool = Field(False, exclude=True, description="Построены ли миниатюра и пирамида тайлов")
+
+    @computed_field(description="URL миниатюры изображения (None, если ещё не построена)")
+    @property
+    def thumbnail_url(self) -> str | None:
+        return get_thumbnail_url(self.file_path, self.has_derivatives)
+
+    @computed_field(description="URL описания пирамиды тайлов изображения (None, если ещё не построена)")
+    @property
+    def tiles_url(self) -> str | None:
+        return get_tiles_url(self.file_path, self.has_derivatives)
 
     class Config:
         from_attributes = True
@@ -1,9 +1,10 @@
 from uuid import UUID
 from datetime import datetime, date
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, computed_field, model_validator
 
 from src.constants.celery import CeleryStatus
+from src.utils.image import get_thumbnail_url, get_tiles_url
 
 class SessionCreateSchema(BaseModel):
     """
@@ -24,10 +25,26 @@ class SessionUpdateSchema(BaseModel):
     """
     date: datetime | None = Field(None, description="Новая дата и время сеанса")
     notes: str | None = Field(None, description="Обновленные заметки")
+    roi_x: int | None = Field(None, ge=0, description="Левый край области интереса (ROI), пиксели")
+    roi_y: int | None = Field(None, ge=0, description="Верхний край ROI, пиксели")
+    roi_width: int | None = Field(None, gt=0, description="Ширина ROI, пиксели")
+    roi_height: int | None = Field(None, gt=0, description="Высота ROI, пиксели")
 
     class Config:
         from_attributes = True
 
+    @model_validator(mode="after")
+    def check_roi(self):
+        """ ROI задаётся (или сбрасывается значениями null) только всеми четырьмя полями сразу """
+        fields = ("roi_x", "roi_y", "roi_width", "roi_height")
+        passed = [name for name in fields if name in self.model_fields_set]
+        if not passed:
+            return self
+        values = [getattr(self, name) for name in fields]
+        if len(passed) != len(fields) or (None in values and any(v is not None for v in values)):
+            raise ValueError("ROI задаётся всеми полями roi_x, roi_y, roi_width, roi_height (или все null)")
+        return self
+
 
 class SpectrumSchema(BaseModel):
     """
@@ -48,6 +65,17 @@ class RawImageSchema(BaseModel):
     id: UUID = Field(..., description="ID исходного изображения")
     file_path: str = Field(..., description="Путь к файлу изображения")
     spectrum: SpectrumSchema = Field(..., description="ID длины волны")
+    has_derivatives: bool = Field(False, exclude=True, description="Построены ли миниатюра и пирамида тайлов")
+
+    @computed_field(description="URL миниатюры изображения (None, если ещё не построена)")
+    @property
+    def thumbnail_url(self) -> str | None:
+        return get_thumbnail_url(self.file_path, self.has_derivatives)
+
+    @computed_field(description="URL описания пирамиды тайлов изображения (None, если ещё не построена)")
+    @property
+    def tiles_url(self) -> str | None:
+        return get_tiles_url(self.file_path, self.has_derivatives)
 
     class Config:
         from_attributes = True
@@ -72,20 +100,56 @@ class ReconstructedImageSchema(BaseModel):
     id: UUID = Field(..., description="ID восстановленного изображения")
     file_path: str = Field(..., description="Путь к файлу изображения")
     chromophore: ChromophoreSchema = Field(..., description="ID хромофора")
+    has_derivatives: bool = Field(False, exclude=True, description="Построены ли миниатюра и пирамида тайлов")
+
+    @computed_field(description="URL миниатюры изображения (None, если ещё не построена)")
+    @property
+    def thumbnail_url(self) -> str | None:
+        return get_thumbnail_url(self.file_path, self.has_derivatives)
+
+    @computed_field(description="URL описания пирамиды тайлов изображения (None, если ещё не построена)")
+    @property
+    def tiles_url(self) -> str | None:
+        return get_tiles_url(self.file_path, self.has_derivatives)
 
     class Config:
         from_attributes = True
 
 
+class RegistrationShiftSchema(BaseModel):
+    """
+    Схема сдвига канала, найденного при совмещении каналов
+    """
+    wavelength: int = Field(..., description="Длина волны канала, нм")
+    dy: float = Field(..., description="Сдвиг по вертикали, пиксели")
+    dx: float = Field(..., description="Сдвиг по горизонтали, пиксели")
+
+
 class ResultSchema(BaseModel):
     """
     Схема для вложенного поля результата обработки
     """
     id: UUID = Field(..., description="ID результата")
     contour_path: str | None = Field(None, description="Путь к файлу с контуром пораженной области")
+    contour_has_derivatives: bool = Field(
+        False, exclude=True, description="Построены ли миниатюра и пирамида тайлов контура"
+    )
     s_coefficient: float = Field(..., description="Коэффициент s")
     mean_lesion_thb: float = Field(..., description="Средняя концентрация THb в поражённой области")
     mean_skin_thb: float = Field(..., description="Средняя концентрация THb в коже")
+    registration_shifts: list[RegistrationShiftSchema] | None = Field(
+        None, description="Сдвиги каналов, найденные при совмещении"
+    )
+
+    @computed_field(description="URL миниатюры изображения контура (None, если ещё не построена)")
+    @property
+    def contour_thumbnail_url(self) -> str | None:
+        return get_thumbnail_url(self.contour_path, self.contour_has_derivatives)
+
+    @computed_field(description="URL описания пирамиды тайлов изображения контура (None, если ещё не построена)")
+    @property
+    def contour_tiles_url(self) -> str | None:
+        return get_tiles_url(self.contour_path, self.contour_has_derivatives)
 
     class Config:
         from_attributes = True
@@ -144,3 +208,17 @@ class SessionDetailSchema(BaseModel):
     processing_status: CeleryStatus | None = Field(
         None, description="Статус задачи обработки"
     )
+    roi_x: int | None = Field(None, description="Левый край области интереса (ROI), пиксели")
+    roi_y: int | None = Field(None, description="Верхний край ROI, пиксели")
+    roi_width: int | None = Field(None, description="Ширина ROI, пиксели")
+    roi_height: int | None = Field(None, description="Высота ROI, пиксели")
+
+
+class SessionStatusSchema(BaseModel):
+    """
+    Облегчённая схема сеанса для опроса статуса обработки
+    """
+    id: UUID = Field(..., description="ID сессии")
+    processing_task_id: str | None = Field(None, description="ID задачи Celery")
+    processing_status: CeleryStatus | None = Field(None, description="Статус задачи обработки")
+    has_result: bool = Field(..., description="Есть ли у сеанса результат анализа")
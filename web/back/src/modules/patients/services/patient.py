@@ -2,9 +2,11 @@ import logging
 from uuid import UUID
 from typing import List
 
+from redis.asyncio import Redis
 from sqlalchemy.exc import IntegrityError
 
 from src.core.schemas import PaginatedResponse
+from src.core.pagination import encode_cursor, decode_cursor, count_key, get_cached_count, invalidate_counts
 from src.exceptions.base import BaseException
 from src.models.patient import Patient
 from src.modules.patients.schemas.patient import (
@@ -17,8 +19,9 @@ logger = logging.getLogger(__name__)
 
 class PatientService:
     """ Сервис для управления пациентами """
-    def __init__(self, uow: UnitOfWork):
+    def __init__(self, uow: UnitOfWork, redis: Redis | None = None):
         self.uow = uow
+        self.redis = redis
 
     async def get_all(self, params: PatientQueryParams, user_obj: UserSchema) -> List[PatientSchema]:
         """
@@ -27,25 +30,40 @@ class PatientService:
         if not user_obj.is_superuser:
             params.organization_id = user_obj.organization.id
 
-        async with self.uow:
-            patients, total = await self.uow.patient.get_all(params)
+        after = None
+        if params.cursor:
+            full_name, patient_id = decode_cursor(params.cursor, 2)
+            try:
+                after = (full_name, UUID(patient_id))
+            except (TypeError, ValueError) as exc:
+                raise BaseException("Некорректный курсор пагинации") from exc
+
+        async with self.uow.read_only():
+            patients, has_next = await self.uow.patient.get_all(params, after)
+            total = await get_cached_count(
+                self.redis,
+                count_key("patients", params.organization_id),
+                lambda: self.uow.patient.count(params.organization_id),
+            )
 
         items = [PatientSchema.model_validate(patient) for patient in patients]
+        last = patients[-1] if patients else None
 
         return PaginatedResponse[PatientSchema](
             items=items,
             total=total,
             limit=params.limit,
             offset=params.offset,
-            has_next=(params.offset + 1) * params.limit < total,
-            has_previous=params.offset > 0
+            has_next=has_next,
+            has_previous=after is not None or params.offset > 0,
+            next_cursor=encode_cursor([last.full_name, last.id]) if has_next and last else None,
         )
 
     async def get_by_id(self, patient_id: UUID) -> PatientDetailSchema:
         """
         Выдаёт пациента по его ID
         """
-        async with self.uow:
+        async with self.uow.read_only():
             patient = await self.uow.patient.get_with_sessions_by_id(patient_id)
 
             if not patient:
@@ -73,6 +91,7 @@ class PatientService:
             except IntegrityError as e:
                 raise BaseException("Пользователь уже существует") from e
 
+        await invalidate_counts(self.redis, "patients")
         return PatientSchema.model_validate(patient_info)
 
     async def update(self, patient_id: UUID, body: PatientUpdateSchema) -> PatientSchema:
@@ -82,6 +101,9 @@ class PatientService:
         async with self.uow:
             patient = await self.uow.patient.update(patient_id, body)
 
+        if body.organization_id is not None:
+            # Пациент мог перейти в другую организацию
+            await invalidate_counts(self.redis, "patients")
         return patient
 
     async def delete(self, patient_id: UUID) -> None:
@@ -89,4 +111,6 @@ class PatientService:
         Удаляет пациента по его ID
         """
         async with self.uow:
-            await self.uow.patient.delete(patient_id)
\ No newline at end of file
+            await self.uow.patient.delete(patient_id)
+
+        await invalidate_counts(self.redis, "patients")
\ No newline at end of file
@@ -4,12 +4,14 @@ import os
 import uuid
 
 from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
 
 from src.core.config import settings
 from src.exceptions.base import BaseException
 from src.models.patient import RawImage
 from src.modules.patients.schemas.raw_image import RawImageSchema
 from src.modules.patients.repositories.uow import UnitOfWork
+from src.utils.image import safe_build_derivatives, remove_derivatives
 
 
 class RawImageService:
@@ -38,11 +40,15 @@ class RawImageService:
             with open(save_path, "wb") as f:
                 f.write(await file.read())
 
+            # Миниатюра и пирамида тайлов строятся в пуле потоков, чтобы не блокировать цикл событий
+            has_derivatives = await run_in_threadpool(safe_build_derivatives, path)
+
             # Запись в БД
             raw_images.append(RawImage(
                 session_id=session_id,
                 spectrum_id=spectrum_id,
                 file_path=path,
+                has_derivatives=has_derivatives,
             ))
 
         async with self.uow:
@@ -67,6 +73,7 @@ class RawImageService:
                     os.remove(abs_path)
                 except Exception as e:
                     raise BaseException(f"Ошибка удаления файла: {e}")
+            remove_derivatives(raw_image.file_path)
 
             session_id = await self.uow.raw_image.get_session_id_by_image_id(raw_image_id)
 
@@ -88,6 +95,7 @@ class RawImageService:
                         os.remove(abs_path)
                     except Exception as e:
                         raise BaseException(f"Ошибка удаления файла: {e}")
+                remove_derivatives(img.file_path)
 
             session_ids = await self.uow.raw_image.get_session_ids_by_image_ids(ids)
 
@@ -5,7 +5,9 @@ from sqlalchemy.exc import IntegrityError
 
 from src.exceptions.base import BaseException
 from src.models.patient import Session
-from src.modules.patients.schemas.session import SessionCreateSchema, SessionUpdateSchema, SessionDetailSchema
+from src.modules.patients.schemas.session import (
+    SessionCreateSchema, SessionUpdateSchema, SessionDetailSchema, SessionStatusSchema
+)
 from src.modules.patients.repositories.uow import UnitOfWork
 
 from src.celery_app import celery_app
@@ -21,7 +23,7 @@ class SessionService:
         """
         Выдаёт сеанс пациента по её ID
         """
-        async with self.uow:
+        async with self.uow.read_only():
             session = await self.uow.session_repo.get_detail_by_id(session_id)
 
             if not session:
@@ -30,15 +32,26 @@ class SessionService:
             if session.patient_id != patient_id:
                 raise BaseException("Сессия не принадлежит указанному пациенту")
 
-            session.raw_images.sort(
-                key=lambda img: img.spectrum.wavelength if img.spectrum and img.spectrum.wavelength is not None else 0
-            )
+        return session
 
-            session.reconstructed_images.sort(
-                key=lambda img: img.chromophore.name if img.chromophore and img.chromophore.name else ""
-            )
+    async def get_status(self, patient_id: UUID, session_id: UUID) -> SessionStatusSchema:
+        """
+        Выдаёт статус обработки сеанса без загрузки изображений и связанных объектов
+        """
+        async with self.uow.read_only():
+            row = await self.uow.session_repo.get_status(session_id)
 
-        return session
+        if not row:
+            raise BaseException(f"Сессия с ID {session_id} не найдена")
+        if row.patient_id != patient_id:
+            raise BaseException("Сессия не принадлежит указанному пациенту")
+
+        return SessionStatusSchema(
+            id=row.id,
+            processing_task_id=row.processing_task_id,
+            processing_status=row.processing_status,
+            has_result=row.result_id is not None,
+        )
 
     async def create(self, body: SessionCreateSchema, user_id: UUID, patient_id: UUID) -> SessionDetailSchema:
         """
@@ -84,7 +97,7 @@ class SessionService:
             await self.uow.session_repo.set_processing_task_id(session_id, task_id)
 
     async def get_processing_status(self, patient_id: UUID, session_id: UUID) -> dict:
-        async with self.uow:
+        async with self.uow.read_only():
             await self._get_session_checked(session_id, patient_id)
 
             task_id = await self.uow.session_repo.get_processing_task_id(session_id)
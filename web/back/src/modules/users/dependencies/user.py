@@ -2,9 +2,11 @@ from typing import Annotated
 from uuid import UUID
 
 from fastapi import Depends, Query
+from redis.asyncio import Redis
 
 from src.core.schemas import BasePaginationParams
 from src.core.dependencies import get_pagination_params
+from src.db.redis import get_redis
 from src.modules.users.dependencies.uow import get_unit_of_work
 from src.modules.users.schemas.user import UserQueryParams
 from src.modules.users.serializers.user import UserSerializer
@@ -15,6 +17,7 @@ from src.modules.users.services.user import UserService
 def get_user_params(
         pagination: Annotated[BasePaginationParams, Depends(get_pagination_params)],
         organization_id: UUID | None = Query(default=None, alias="organization_id"),
+        cursor: str | None = Query(None, description='Курсор следующей страницы (next_cursor предыдущего ответа); если задан, offset не используется'),
 ) -> UserQueryParams:
     """ Получает query-параметры фильтрации для пользователей """
 
@@ -22,11 +25,13 @@ def get_user_params(
         limit=pagination.limit,
         offset=pagination.offset,
         organization_id=organization_id,
+        cursor=cursor,
     )
 
 
 async def get_user_service(
         uow: Annotated[UnitOfWork, Depends(get_unit_of_work)],
+        redis: Annotated[Redis, Depends(get_redis)],
 ):
     serializer = UserSerializer()
-    return UserService(uow, serializer=serializer)
\ No newline at end of file
+    return UserService(uow, serializer=serializer, redis=redis)
\ No newline at end of file
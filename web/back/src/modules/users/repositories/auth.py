@@ -2,7 +2,7 @@ from abc import ABC, abstractmethod
 from typing import List
 from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import select, update
 
 from src.models.user import User, Role
 from src.modules.users.repositories.base import BaseSQLRepository
@@ -22,6 +22,13 @@ class AuthRepository(BaseAuthRepository, BaseSQLRepository):
         result = await self.session.scalars(query)
         return result.one_or_none()
 
+    async def update_password_hash(self, user_id: UUID, hashed_password: str) -> None:
+        """
+        Заменяет хеш пароля пользователя (пересчёт под текущий метод хеширования)
+        """
+        stmt = update(User).where(User.id == user_id).values(hashed_password=hashed_password)
+        await self.session.execute(stmt)
+
     async def get_roles_by_user(self, user_id: UUID) -> List[str]:
         """
         Получает список ролей по ID пользователя
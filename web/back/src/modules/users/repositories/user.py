@@ -3,10 +3,10 @@ from uuid import UUID
 from typing import List, Tuple
 import logging
 
-from sqlalchemy import update, select, func
-from sqlalchemy.orm import joinedload
+from sqlalchemy import update, select, func, tuple_
+from sqlalchemy.orm import joinedload, selectinload
 from sqlalchemy.exc import NoResultFound
-from werkzeug.security import generate_password_hash
+from src.utils.password import hash_password
 
 from src.models.user import User, UserRoles, Role
 from src.modules.users.repositories.base import BaseSQLRepository
@@ -39,25 +39,34 @@ class UserRepository(BaseUserRepository, BaseSQLRepository):
         result = await self.session.execute(query)
         return result.scalars().unique().one_or_none()
 
-    async def get_user_all(self, params: UserQueryParams) -> Tuple[List[User], int]:
-        """ Получает список всех пользователей с предзагрузкой ролей """
+    async def get_user_all(self, params: UserQueryParams, after: tuple[str, str, UUID] | None = None) -> Tuple[List[User], bool]:
+        """
+        Получает страницу пользователей с предзагрузкой ролей и признак следующей страницы.
+        Сортировка по (фамилия, имя, id) совпадает с индексом ix_users_sort_key;
+        after — ключ последней записи предыдущей страницы, без него используется offset
+        """
         query = select(User).options(
-            joinedload(User.roles),
+            # Роли — отдельным запросом, чтобы LIMIT применялся к пользователям, а не к строкам join
+            selectinload(User.roles),
             joinedload(User.organization)
         )
 
         if params.organization_id is not None:
             query = query.where(User.organization_id == params.organization_id)
 
-        query = query.order_by(User.last_name.asc(), User.first_name.asc())
-        query = query.limit(params.limit).offset(params.offset)
+        sort_key = (func.coalesce(User.last_name, ''), func.coalesce(User.first_name, ''), User.id)
+        query = query.order_by(*sort_key)
 
-        result = await self.session.execute(query)
+        if after is not None:
+            query = query.where(tuple_(*sort_key) > tuple_(*after))
+        else:
+            query = query.offset(params.offset)
+
+        result = await self.session.execute(query.limit(params.limit + 1))
         users = result.scalars().unique().all()
-        total = await self._count_all_users(params.organization_id)
-        return users, total
+        return users[:params.limit], len(users) > params.limit
 
-    async def _count_all_users(self, organization_id=None) -> int:
+    async def count(self, organization_id=None) -> int:
         """ Получает количество пользователей """
         query = select(func.count()).select_from(User)
         if organization_id is not None:
@@ -128,7 +137,7 @@ class UserRepository(BaseUserRepository, BaseSQLRepository):
         if not body.password:
             raise NoResultFound("Нет данных для обновления")
 
-        hashed_password = generate_password_hash(body.password)
+        hashed_password = await hash_password(body.password)
 
         stmt = (
             update(User)
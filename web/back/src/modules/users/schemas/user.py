@@ -6,6 +6,7 @@ from src.core.schemas import BasePaginationParams
 
 class UserQueryParams(BasePaginationParams):
     organization_id: UUID | None = Field(None, description="ID организации")
+    cursor: str | None = Field(None, description="Курсор следующей страницы")
 
     class Config:
         arbitrary_types_allowed = True
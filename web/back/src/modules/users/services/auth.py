@@ -2,18 +2,19 @@
 Модуль содержит сервисы для аутентификации и регистрации пользователей
 """
 
+import time
 from uuid import UUID
 from typing import List
 
 from redis.asyncio import Redis
 
-from src.core.config import settings
 from src.exceptions.base import BaseException
 from src.models.user import User
 from src.modules.users.repositories.uow import UnitOfWork
 from src.modules.users.schemas.auth import AuthSchema
 from src.modules.users.schemas.token import TokenSchema, AccessTokenSchema
 from src.utils.token import JWTHelper
+from src.utils.password import verify_password, needs_rehash, hash_password
 
 
 class AuthService:
@@ -55,17 +56,21 @@ class AuthService:
         """
         Выполняет выход из аккаунта: помечает refresh_token отозванным
         """
-        await self._is_token_valid(tokens.refresh_token)
-        await self._revoke_token(tokens.refresh_token, settings.jwt.refresh_token_expire_time)
+        payload = await self._is_token_valid(tokens.refresh_token)
+        await self._revoke_token(tokens.refresh_token, payload)
 
     async def _login(self, body: AuthSchema) -> User:
         """
         Аутентифицирует пользователя
         """
         user: User = await self.uow.auth.get_user_by_username(body.username)
-        if not user or not user.check_password(body.password):
+        if not user or not await verify_password(user.hashed_password, body.password):
             raise BaseException('Ошибка имени пользователя или пароля')
 
+        if needs_rehash(user.hashed_password):
+            # Пароль известен только в момент входа — тогда и переводим хеш на текущий метод
+            await self.uow.auth.update_password_hash(user.id, await hash_password(body.password))
+
         return user
 
     async def _get_user_roles(self, user_id: str) -> List[str]:
@@ -86,20 +91,24 @@ class AuthService:
             refresh_token=refresh_token,
         )
 
-    async def _is_token_valid(self, token: str) -> None:
+    async def _is_token_valid(self, token: str) -> dict:
         """
-        Валидирует токен
+        Валидирует токен и возвращает его payload
         """
-        is_revoked = await self.redis.get(name=token)
+        payload = self.jwt_helper.verify(token)
+        is_revoked = await self.redis.get(name=self.jwt_helper.revocation_key(token, payload))
         if is_revoked and is_revoked.decode() == "revoked":
             raise BaseException("Token has been revoked")
+        return payload
 
-    async def _revoke_token(self, token: str, expire_time: int):
+    async def _revoke_token(self, token: str, payload: dict):
         """
-        Сохраняет отозванный токен в Redis
+        Сохраняет отметку об отзыве токена в Redis по его jti.
+        Отметка живёт только до истечения самого токена
         """
+        expire_time = max(int(payload['exp'] - time.time()), 1)
         await self.redis.set(
-            name=token,
+            name=self.jwt_helper.revocation_key(token, payload),
             value="revoked",
             ex=expire_time,
         )
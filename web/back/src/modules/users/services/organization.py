@@ -20,7 +20,7 @@ class OrganizationService:
         """
         Выдаёт список всех организаций
         """
-        async with self.uow:
+        async with self.uow.read_only():
             organizations = await self.uow.organization.get_organization_all()
 
         return organizations
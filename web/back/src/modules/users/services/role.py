@@ -20,7 +20,7 @@ class RoleService:
         """
         Выдаёт список всех ролей
         """
-        async with self.uow:
+        async with self.uow.read_only():
             roles = await self.uow.role.get_role_all()
 
         return roles
@@ -4,14 +4,17 @@ import logging
 from uuid import UUID
 
 from fastapi import UploadFile, HTTPException
+from redis.asyncio import Redis
 from sqlalchemy.exc import IntegrityError
 
 from src.core.config import settings
 from src.core.schemas import PaginatedResponse
+from src.core.pagination import encode_cursor, decode_cursor, count_key, get_cached_count, invalidate_counts
 from src.models.user import User
 from src.modules.users.repositories.uow import UnitOfWork
 from src.modules.users.schemas.user import UserCreateSchema, UserUpdateSchema, UpdatePasswordUserSchema, UserSchema, UserQueryParams
 from src.modules.users.serializers.user import BaseSerializer
+from src.utils.password import hash_password
 from src.exceptions.base import BaseException
 
 logger = logging.getLogger(__name__)
@@ -19,33 +22,52 @@ logger = logging.getLogger(__name__)
 
 class UserService:
 
-    def __init__(self, uow: UnitOfWork, serializer: BaseSerializer):
+    def __init__(self, uow: UnitOfWork, serializer: BaseSerializer, redis: Redis | None = None):
         self.uow = uow
         self.serializer = serializer
+        self.redis = redis
 
     async def get_user_all(self, params: UserQueryParams) -> PaginatedResponse[UserSchema]:
         """
         Выдаёт пагинированную информацию обо всех пользователях
         """
-        async with self.uow:
-            users, total = await self.uow.user.get_user_all(params)
+        after = None
+        if params.cursor:
+            last_name, first_name, user_id = decode_cursor(params.cursor, 3)
+            try:
+                after = (last_name, first_name, UUID(user_id))
+            except (TypeError, ValueError) as exc:
+                raise BaseException("Некорректный курсор пагинации") from exc
+
+        async with self.uow.read_only():
+            users, has_next = await self.uow.user.get_user_all(params, after)
+            total = await get_cached_count(
+                self.redis,
+                count_key("users", params.organization_id),
+                lambda: self.uow.user.count(params.organization_id),
+            )
 
         items = [UserSchema.model_validate(user) for user in users]
+        last = users[-1] if users else None
 
         return PaginatedResponse[UserSchema](
                 items=items,
                 total=total,
                 limit=params.limit,
                 offset=params.offset,
-                has_next=(params.offset + 1) * params.limit < total,
-                has_previous=params.offset > 0
+                has_next=has_next,
+                has_previous=after is not None or params.offset > 0,
+                next_cursor=(
+                    encode_cursor([last.last_name or '', last.first_name or '', last.id])
+                    if has_next and last else None
+                ),
             )
 
     async def get_user_by_id(self, user_id: UUID) -> UserSchema:
         """
         Выдаёт информацию о пользователе по его ID
         """
-        async with self.uow:
+        async with self.uow.read_only():
             user = await self.uow.user.get_user_by_id(user_id)
             if not user:
                 raise BaseException(f"Пользователь с ID {user_id} не найден")
@@ -55,11 +77,13 @@ class UserService:
         """
         Создаёт пользователя
         """
+        hashed_password = await hash_password(body.password)
         async with self.uow:
             try:
                 user = User(
                     username=body.username,
                     password=body.password,
+                    hashed_password=hashed_password,
                     email=body.email,
                     first_name=body.first_name,
                     last_name=body.last_name,
@@ -70,6 +94,7 @@ class UserService:
             except IntegrityError as e:
                 raise BaseException("Пользователь уже существует") from e
 
+        await invalidate_counts(self.redis, "users")
         return self.serializer.serialize(user)
 
     async def update(self, user_id: UUID, body: UserUpdateSchema) -> UserSchema:
@@ -82,6 +107,9 @@ class UserService:
             if user is None:
                 raise BaseException(f"Пользователь с ID {user_id} не найден")
 
+        if body.organization_id is not None:
+            # Пользователь мог перейти в другую организацию
+            await invalidate_counts(self.redis, "users")
         return self.serializer.serialize(user)
 
     async def delete(self, user_id: UUID, auth_user_id: UUID) -> None:
@@ -106,6 +134,8 @@ class UserService:
         async with self.uow:
             await self.uow.user.delete(user_id)
 
+        await invalidate_counts(self.redis, "users")
+
     async def update_password(self, user_id: UUID, body: UpdatePasswordUserSchema) -> None:
         """
         Обновляет пароль пользователя
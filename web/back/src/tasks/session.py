@@ -2,20 +2,47 @@ import logging
 import time
 
 import numpy as np
-import imageio.v2 as imageio
 import cv2
 import os
 import scipy.linalg as spla
+from celery.signals import before_task_publish
+from redis import Redis
 
 from src.core.config import settings
+from src.core.metrics import (
+    REGISTRY, StageTimer, PROCESSING_STAGE_SECONDS, PROCESSING_SECONDS,
+    PROCESSING_QUEUE_WAIT_SECONDS, SESSIONS_PROCESSED,
+)
 from src.models.patient import Session, RawImage, ReconstructedImage, Result
 from src.models.parameter import Spectrum, Chromophore, OverlapCoefficient
 from src.db.postgres import SyncSessionLocal
 from src.constants.celery import CeleryStatus
 from src.celery_app import celery_app
+from src.utils.image import safe_build_derivatives, remove_derivatives
+from src.utils import spectral
+from engine.registration import estimate_shifts, apply_shifts
+from engine.unmixing import unmix, REGULARIZED_METHODS
+from engine.profiling import StageProfiler
 
 logger = logging.getLogger(__name__)
 
+_metrics_redis = None
+
+
+@before_task_publish.connect
+def stamp_enqueued_at(headers=None, **kwargs):
+    """ Отмечает время постановки задачи в очередь (для метрики ожидания в очереди) """
+    if headers is not None:
+        headers.setdefault("enqueued_at", time.time())
+
+
+def flush_metrics():
+    """ Сбрасывает накопленные метрики воркера в Redis, откуда их отдаёт /metrics API """
+    global _metrics_redis
+    if _metrics_redis is None:
+        _metrics_redis = Redis.from_url(settings.redis.url)
+    REGISTRY.flush_shared(_metrics_redis)
+
 
 def cleanup_session_results_if_no_raw_images(session_id, db):
     raw_images_count = db.query(RawImage).filter(RawImage.session_id == session_id).count()
@@ -31,6 +58,7 @@ def cleanup_session_results_if_no_raw_images(session_id, db):
                     os.remove(abs_path)
                 except Exception as e:
                     logger.warning(f"Ошибка при удалении файла {abs_path}: {e}")
+            remove_derivatives(rec.file_path)
 
         db.query(ReconstructedImage).filter(ReconstructedImage.session_id == session_id).delete(synchronize_session=False)
         db.commit()
@@ -47,6 +75,7 @@ def cleanup_session_results_if_no_raw_images(session_id, db):
                     os.remove(abs_path)
                 except Exception as e:
                     logger.warning(f"Ошибка при удалении файла {abs_path}: {e}")
+            remove_derivatives(result.contour_path)
         db.query(Result).filter(Result.session_id == session_id).delete(synchronize_session=False)
         db.commit()
 
@@ -54,11 +83,56 @@ def cleanup_session_results_if_no_raw_images(session_id, db):
 
 
 
-def analyze_hyperspectral_session(db, session):
+# Кеш матриц перекрытий процесса воркера: (устройство, версия матрицы, спектры, хромофоры) => матрица
+_overlap_cache = {}
+OVERLAP_CACHE_SIZE = 16
+
+
+def get_overlap_matrix(db, device, spectra, chromophores):
+    """
+    Возвращает матрицу перекрытий [спектр][хромофор] устройства.
+    Коэффициенты читаются одним запросом; результат кешируется по версии матрицы устройства
+    (Device.overlap_version растёт при каждом её изменении), так что устаревшая матрица не используется.
+    """
+    key = (device.id, device.overlap_version, tuple(s.id for s in spectra), tuple(c.id for c in chromophores))
+    cached = _overlap_cache.get(key)
+    if cached is not None:
+        return cached.copy()
+
+    rows = db.query(
+        OverlapCoefficient.spectrum_id, OverlapCoefficient.chromophore_id, OverlapCoefficient.coefficient
+    ).filter(OverlapCoefficient.spectrum_id.in_([s.id for s in spectra])).all()
+    values = {(s_id, c_id): coef for s_id, c_id, coef in rows}
+    overlap_matrix = np.array(
+        [[values.get((s.id, c.id), 0.0) for c in chromophores] for s in spectra],
+        dtype=float,
+    ).reshape(len(spectra), len(chromophores))
+
+    # Старые версии матриц этого устройства больше не понадобятся
+    for old_key in [k for k in _overlap_cache if k[0] == device.id]:
+        del _overlap_cache[old_key]
+    if len(_overlap_cache) >= OVERLAP_CACHE_SIZE:
+        _overlap_cache.pop(next(iter(_overlap_cache)))
+    _overlap_cache[key] = overlap_matrix
+    return overlap_matrix.copy()
+
+
+def analyze_hyperspectral_session(db, session, profiler=None):
     """
     Выполняет обработку гиперспектральных снимков для заданного сеанса.
     Возвращает словарь с вычисленными метриками и путями к результатам.
+    Длительность этапов пишется в hyperspectrus_processing_stage_seconds;
+    статистика по массивам выводится в журнал только при PROCESSING_DEBUG.
+    Если передан включённый profiler, этапы отмечаются и в нём.
     """
+    debug = settings.processing.debug
+    timer = StageTimer(PROCESSING_STAGE_SECONDS)
+    profiler = profiler or StageProfiler()
+
+    def mark(stage):
+        timer.mark(stage)
+        profiler.mark(stage)
+
     # 1. Собираем raw images для сеанса, сортируем по спектрам
     raw_images = db.query(RawImage).filter(RawImage.session_id == session.id).all()
     if not raw_images:
@@ -74,14 +148,8 @@ def analyze_hyperspectral_session(db, session):
     logger.info(f"Спектры устройства (кол-во: {len(spectra)}): {[s.wavelength for s in spectra]}")
     logger.info(f"Хромофоры (кол-во: {len(chromophores)}): {[c.symbol for c in chromophores]}")
 
-    # Строим матрицу перекрытий
-    overlap_matrix = np.zeros((len(spectra), len(chromophores)), dtype=float)
-    for i, spectrum in enumerate(spectra):
-        for j, chrom in enumerate(chromophores):
-            coeff = db.query(OverlapCoefficient)\
-                .filter_by(spectrum_id=spectrum.id, chromophore_id=chrom.id)\
-                .first()
-            overlap_matrix[i, j] = coeff.coefficient if coeff else 0.0
+    # Строим матрицу перекрытий (из кеша воркера, если версия матрицы устройства не менялась)
+    overlap_matrix = get_overlap_matrix(db, session.device, spectra, chromophores)
 
     logger.info(f"Матрица перекрытий: shape={overlap_matrix.shape}, пример={overlap_matrix[:2,:2].tolist()}")
 
@@ -111,14 +179,11 @@ def analyze_hyperspectral_session(db, session):
             missing_spectra.append(spectrum.wavelength)
             continue
 
-        img = imageio.imread(file_path)
-        if img.ndim == 3:
-            img = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
-
-        img = cv2.resize(img, (256, 256), interpolation=cv2.INTER_AREA)
-        img = img.astype(np.float32)
+        # Для снимков, загруженных до появления миниатюр; построенные повторно не пересчитываются.
+        # Флаг сохраняется вместе с результатом обработки
+        img_obj.has_derivatives = safe_build_derivatives(img_obj.file_path)
 
-        images.append(img)
+        images.append(spectral.read_band(file_path, roi=session.roi))
 
     if missing_spectra:
         logger.error(f"Нет изображений для спектров: {missing_spectra}")
@@ -132,37 +197,41 @@ def analyze_hyperspectral_session(db, session):
 
     images = np.stack(images, axis=0)
     logger.info(f"Считано {images.shape[0]} изображений, итоговый shape: {images.shape}")
+    if session.roi is not None:
+        logger.info(f"Обрабатывается область интереса (x, y, ширина, высота): {session.roi}")
+    mark("load")
+
+    # Совмещение каналов: пациент мог сместиться между кадрами разных длин волн
+    registration_shifts = None
+    if settings.processing.registration and len(images) > 1:
+        shifts = estimate_shifts(images)
+        apply_shifts(images, shifts)
+        registration_shifts = [
+            {"wavelength": spectrum.wavelength, "dy": round(float(dy), 2), "dx": round(float(dx), 2)}
+            for spectrum, (dy, dx) in zip(spectra, shifts)
+        ]
+        logger.info(f"Каналы совмещены, наибольший сдвиг {np.abs(shifts).max():.2f} пикс.")
+        mark("register")
 
     # 3. Преобразуем к OD через деление на 255 (чтобы OD был в ожидаемом диапазоне)
-    cube_norm = np.clip(images / 255.0, 1e-6, 1.0)  # На случай переполнения и деления на 0
-    logger.info(f"Диапазон изображений после нормализации: min={cube_norm.min()}, max={cube_norm.max()}")
-    OD = -np.log10(cube_norm)
-
-    logger.info(f"OD гист: {[np.min(OD), np.max(OD), np.mean(OD), np.std(OD)]}")
-
-    # 4. Решаем систему для концентраций по каждому пикселю
-    _, H, W = images.shape
-
-    # concentrations = np.zeros((len(chromophores), H, W), dtype=np.float32)
-    # for y in range(H):
-    #     for x in range(W):
-    #         od_col = OD[:, y, x]
-    #         try:
-    #             x_vec, *_ = np.linalg.lstsq(overlap_matrix, od_col, rcond=None)
-    #             concentrations[:, y, x] = x_vec
-    #         except Exception as e:
-    #             logger.debug(f"Ошибка решения СЛАУ в точке ({y}, {x}): {e}")
-    #             concentrations[:, y, x] = 0.0
-
-    OD_reshaped = OD.reshape(len(spectra), -1)
-    X, *_ = np.linalg.lstsq(overlap_matrix, OD_reshaped, rcond=None)
-    concentrations = X.reshape(len(chromophores), H, W)
-
-    logger.info(f"Полученная концентрация: shape={concentrations.shape}, min={concentrations.min()}, max={concentrations.max()}")
-    logger.info(f"Сondition number overlap_matrix: {np.linalg.cond(overlap_matrix)}")
-    for i, chrom in enumerate(chromophores):
-        img = concentrations[i]
-        logger.info(f"{chrom.symbol}: min={img.min()}, max={img.max()}, mean={img.mean()}, std={img.std()}")
+    OD = spectral.optical_density(images)
+
+    if debug:
+        logger.info(f"OD гист: {[np.min(OD), np.max(OD), np.mean(OD), np.std(OD)]}")
+    mark("od")
+
+    # 4. Решаем систему для концентраций (МНК для всех пикселей сразу)
+    unmixing = settings.processing.unmixing
+    concentrations = unmix(overlap_matrix, OD, unmixing, settings.processing.regularization)
+    mark("unmix")
+
+    if debug:
+        logger.info(f"Полученная концентрация: shape={concentrations.shape}, min={concentrations.min()}, max={concentrations.max()}")
+        logger.info(f"Сondition number overlap_matrix: {np.linalg.cond(overlap_matrix)}")
+        for i, chrom in enumerate(chromophores):
+            img = concentrations[i]
+            logger.info(f"{chrom.symbol}: min={img.min()}, max={img.max()}, mean={img.mean()}, std={img.std()}")
+        timer.restart()
 
     # 5. Строим итоговую карту THb (сумма по гемоглобинам)
     idx_hbo2 = next((i for i, c in enumerate(chromophores) if c.symbol.strip().lower() in ('hbo2',)), None)
@@ -171,51 +240,38 @@ def analyze_hyperspectral_session(db, session):
         logger.error(f"В базе не найден HbO2 или Hb! symbols: {[c.symbol for c in chromophores]}")
         return None
 
-    thb_map = np.abs(concentrations[idx_hbo2]) + np.abs(concentrations[idx_hb])
+    thb_map = spectral.thb_map(concentrations, idx_hbo2, idx_hb)
     logger.info(f"THb карта построена, shape: {thb_map.shape}")
-    logger.info(f"THb гист: {[np.min(thb_map), np.max(thb_map), np.mean(thb_map), np.std(thb_map)]}")
+    if debug:
+        logger.info(f"THb гист: {[np.min(thb_map), np.max(thb_map), np.mean(thb_map), np.std(thb_map)]}")
 
     # 6. Сегментация OTSU
     if np.isnan(thb_map).any():
         logger.warning("В THb карте есть NaN!")
         thb_map = np.nan_to_num(thb_map, nan=0.0, posinf=0.0, neginf=0.0)
 
-    ptp = np.ptp(thb_map)
-    if ptp == 0 or np.isnan(ptp):
-        thb_norm = np.zeros_like(thb_map, dtype=np.uint8)
-    else:
-        thb_norm = ((thb_map - thb_map.min()) / ptp * 255).astype(np.uint8)
-
-    logger.info(f"THb min: {thb_map.min()}, max: {thb_map.max()}, ptp: {ptp}")
-
-    blur = cv2.GaussianBlur(thb_norm, (5, 5), 2)
-    otsu_thr, mask = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-
-    # Для тестирования маски
-    # mask = (blur > otsu_thr + 15).astype(np.uint8) * 255
+    # После разложения с регуляризацией карта уже сглажена — отдельное размытие не нужно
+    mask, ptp = spectral.segment_otsu(thb_map, blur=unmixing not in REGULARIZED_METHODS)
+    if debug:
+        logger.info(f"THb min: {thb_map.min()}, max: {thb_map.max()}, ptp: {ptp}")
 
     mask_ratio = np.count_nonzero(mask) / mask.size
     logger.info(f"Mask ratio={mask_ratio:.4f}")
 
     # 7. Статистика по зонам
-    lesion = thb_map[mask > 0]
-    skin = thb_map[mask == 0]
-    mean_lesion = float(np.mean(lesion)) if lesion.size else 0.0
-    mean_skin = float(np.mean(skin)) if skin.size else 1e-6
-    s_coeff = mean_lesion / mean_skin if mean_skin else 0.0
+    mean_lesion, mean_skin, s_coeff = spectral.zone_statistics(thb_map, mask)
     logger.info(f"Статистика: mean_lesion={mean_lesion}, mean_skin={mean_skin}, s_coeff={s_coeff}")
+    mark("segment")
 
     # 8. Сохраняем контурное изображение
     os.makedirs(settings.media.contour_path, exist_ok=True)
 
-    color_thb = cv2.normalize(thb_map, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
-    color_thb = cv2.cvtColor(color_thb, cv2.COLOR_GRAY2BGR)
-    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    cv2.drawContours(color_thb, contours, -1, (0, 0, 255), 2)
+    color_thb = spectral.contour_image(thb_map, mask)
     filename = f"contour_{session.id}.png"
     contour_path = os.path.join(settings.media.contour_path, filename)
     contour_url = os.path.join(settings.media.contour_url, filename)
     cv2.imwrite(contour_path, color_thb)
+    contour_has_derivatives = safe_build_derivatives(contour_url)
     logger.info(f"Контурное изображение сохранено: {contour_path} (url: {contour_url})")
 
     # 9. Сохраняем reconstructed карты по каждому хромофору
@@ -229,16 +285,21 @@ def analyze_hyperspectral_session(db, session):
         rec_path = os.path.join(settings.media.reconstructed_images_path, filename)
         rec_url = os.path.join(settings.media.reconstructed_images_url, filename)
 
-        img_norm = cv2.normalize(img, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+        img_norm = spectral.to_uint8(img)
         success = cv2.imwrite(rec_path, img_norm)
+        has_derivatives = False
         if not success:
             logger.error(f"Ошибка сохранения reconstructed карты: {rec_path}")
+        else:
+            has_derivatives = safe_build_derivatives(rec_url)
 
         reconstructed_images.append({
             'chromophore_id': str(chrom.id),
-            'file_path': rec_url
+            'file_path': rec_url,
+            'has_derivatives': has_derivatives,
         })
     logger.info(f"Сохранено карт реконструкции: {len(reconstructed_images)} в каталоге: {settings.media.reconstructed_images_path}")
+    mark("encode")
 
     def fmt(x):
         if abs(x) > 0 and (abs(x) < 0.001 or abs(x) > 1000):
@@ -247,9 +308,11 @@ def analyze_hyperspectral_session(db, session):
 
     return {
         'contour_path': contour_url,
+        'contour_has_derivatives': contour_has_derivatives,
         's_coefficient': fmt(s_coeff),
         'mean_lesion_thb': fmt(mean_lesion),
         'mean_skin_thb': fmt(mean_skin),
+        'registration_shifts': registration_shifts,
         'reconstructed_images': reconstructed_images
     }
 
@@ -267,7 +330,44 @@ def update_session_fields(session_id, **fields):
 
 
 @celery_app.task(bind=True)
-def process_session(self, session_id: str):
+def process_session(self, session_id: str, profile: bool = False):
+    """
+    Обработка сеанса. profile=True — профилирование этого запуска: отчёт (cProfile
+    и время/память по этапам) сохраняется в media/profiles рядом с результатами
+    """
+    started = time.perf_counter()
+    enqueued_at = self.request.get("enqueued_at")
+    if enqueued_at:
+        PROCESSING_QUEUE_WAIT_SECONDS.observe(max(time.time() - float(enqueued_at), 0.0))
+
+    profiler = StageProfiler(enabled=profile)
+    profiler.start()
+    try:
+        result = _process_session(session_id, profiler)
+    finally:
+        PROCESSING_SECONDS.observe(time.perf_counter() - started)
+        profiler.stop()
+        if profile:
+            save_profile(session_id, profiler)
+        flush_metrics()
+    if profile:
+        result["profile"] = os.path.join(settings.media.profiles_url, f"profile_{session_id}.txt")
+    return result
+
+
+def save_profile(session_id: str, profiler: StageProfiler):
+    """ Сохраняет отчёт профилирования; ошибка записи не должна ломать обработку """
+    try:
+        report_path = profiler.write_report(settings.media.profiles_path, f"profile_{session_id}")
+    except Exception as exc:
+        logger.warning(f"Не удалось сохранить профиль сеанса {session_id}: {exc}")
+        return
+    for line in profiler.summary_lines():
+        logger.info(line)
+    logger.info(f"Отчёт профилирования сеанса {session_id}: {report_path}")
+
+
+def _process_session(session_id: str, profiler: StageProfiler | None = None):
     update_session_fields(session_id, processing_status=CeleryStatus.STARTED)
 
     try:
@@ -278,6 +378,7 @@ def process_session(self, session_id: str):
             if not session:
                 logger.error(f"Session {session_id} not found")
                 update_session_fields(session_id, processing_status=CeleryStatus.FAILURE, processing_task_id=None)
+                SESSIONS_PROCESSED.inc(status="failure")
                 return {"status": "finished", "session_id": session_id}
 
             # --- Удаляем старые reconstructed карты и их файлы ---
@@ -290,44 +391,57 @@ def process_session(self, session_id: str):
                         os.remove(file_path)
                     except Exception as e:
                         logger.warning(f"Ошибка при удалении файла {file_path}: {e}")
+                remove_derivatives(rec.file_path)
 
-            db.query(ReconstructedImage).filter(ReconstructedImage.session_id == session_id).delete(synchronize_session=False)
-            db.commit()
+            with PROCESSING_STAGE_SECONDS.time(stage="db"):
+                db.query(ReconstructedImage).filter(ReconstructedImage.session_id == session_id).delete(synchronize_session=False)
+                db.commit()
 
             # Основная обработка
-            result = analyze_hyperspectral_session(db, session)
+            result = analyze_hyperspectral_session(db, session, profiler)
 
             if result is None:
                 cleanup_session_results_if_no_raw_images(session_id, db)
                 logger.info(f"Результаты сеанса {session_id} очищены, анализ не выполнен.")
                 update_session_fields(session_id, processing_status=CeleryStatus.RETRY, processing_task_id=None)
+                SESSIONS_PROCESSED.inc(status="skipped")
                 return {"status": "finished", "session_id": session_id}
 
+            db_timer = StageTimer(PROCESSING_STAGE_SECONDS)
+
             # --- Сохраняем reconstructed карты ---
             for rec in result['reconstructed_images']:
                 db.add(ReconstructedImage(
                     session_id=session_id,
                     chromophore_id=rec['chromophore_id'],
-                    file_path=rec['file_path']
+                    file_path=rec['file_path'],
+                    has_derivatives=rec['has_derivatives'],
                 ))
 
             # --- Сохраняем результат анализа (обновление если есть) ---
             existing = db.query(Result).filter(Result.session_id == session_id).first()
             if existing:
                 existing.contour_path = result['contour_path']
+                existing.contour_has_derivatives = result['contour_has_derivatives']
                 existing.s_coefficient = result['s_coefficient']
                 existing.mean_lesion_thb = result['mean_lesion_thb']
                 existing.mean_skin_thb = result['mean_skin_thb']
+                existing.registration_shifts = result['registration_shifts']
             else:
                 db.add(Result(
                     session_id=session_id,
                     contour_path=result['contour_path'],
+                    contour_has_derivatives=result['contour_has_derivatives'],
                     s_coefficient=result['s_coefficient'],
                     mean_lesion_thb=result['mean_lesion_thb'],
                     mean_skin_thb=result['mean_skin_thb'],
+                    registration_shifts=result['registration_shifts'],
                 ))
 
             db.commit()
+            db_timer.mark("db")
+            if profiler:
+                profiler.mark("db")
 
         logger.info(f"Обработка сеанса {session_id} завершена")
 
@@ -336,6 +450,7 @@ def process_session(self, session_id: str):
             processing_status=CeleryStatus.SUCCESS,
             processing_task_id=None
         )
+        SESSIONS_PROCESSED.inc(status="success")
 
     except Exception as exc:
         logger.exception(f"Ошибка при обработке сеанса {session_id}: {exc}")
@@ -344,6 +459,7 @@ def process_session(self, session_id: str):
             processing_status=CeleryStatus.FAILURE,
             processing_task_id=None
         )
+        SESSIONS_PROCESSED.inc(status="failure")
         raise
 
     return {"status": "finished", "session_id": session_id}
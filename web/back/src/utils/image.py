@@ -0,0 +1,169 @@
+import json
+import logging
+import math
+import os
+import shutil
+
+import cv2
+import numpy as np
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZE = 256
+TILE_SIZE = 256
+JPEG_QUALITY = 85
+
+THUMBNAIL_NAME = "thumb.jpg"
+MANIFEST_NAME = "tiles.json"
+TILES_DIR = "tiles"
+
+
+def media_url_to_path(file_url: str) -> str:
+    """
+    Преобразует URL файла из каталога media в абсолютный путь на диске
+    """
+    relative = file_url.removeprefix(f"/{settings.media.base}").lstrip("/")
+    return os.path.join(settings.media.base_path, relative)
+
+
+def _derivatives_relative(file_url: str) -> str:
+    """
+    Возвращает относительный путь каталога производных изображений:
+    /media/raw_images/<sid>/<name>.png -> raw_images/<sid>/<name>
+    """
+    relative = file_url.removeprefix(f"/{settings.media.base}").lstrip("/")
+    return os.path.splitext(relative)[0]
+
+
+def get_derivatives_dir(file_url: str) -> str:
+    """ Абсолютный путь каталога с миниатюрой и пирамидой тайлов изображения """
+    return os.path.join(settings.media.derivatives_path, _derivatives_relative(file_url))
+
+
+def get_thumbnail_url(file_url: str | None, has_derivatives: bool) -> str | None:
+    """
+    Возвращает URL миниатюры изображения или None, если она ещё не построена.
+    Готовность берётся из флага в БД (его выставляет построивший производные код), без обращения к диску
+    """
+    if not file_url or not has_derivatives:
+        return None
+    return f"{settings.media.derivatives_url}/{_derivatives_relative(file_url)}/{THUMBNAIL_NAME}"
+
+
+def get_tiles_url(file_url: str | None, has_derivatives: bool) -> str | None:
+    """
+    Возвращает URL описания пирамиды тайлов (tiles.json) или None, если пирамида ещё не построена.
+    Тайлы лежат рядом: tiles/<level>/<col>_<row>.jpg, уровень 0 — один тайл на всё изображение
+    """
+    if not file_url or not has_derivatives:
+        return None
+    return f"{settings.media.derivatives_url}/{_derivatives_relative(file_url)}/{MANIFEST_NAME}"
+
+
+def _to_uint8(img: np.ndarray) -> np.ndarray:
+    """ Приводит изображение к 8 битам для сохранения в JPEG """
+    if img.dtype == np.uint8:
+        return img
+    return cv2.normalize(img, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+
+
+def _write_jpeg(path: str, img: np.ndarray) -> None:
+    cv2.imwrite(path, img, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+
+
+def build_derivatives(file_url: str) -> bool:
+    """
+    Строит миниатюру и пирамиду тайлов для изображения из каталога media.
+    Результат кешируется на диске: если производные новее исходника, повторно не строятся.
+    Возвращает True, если производные актуальны
+    """
+    src_path = media_url_to_path(file_url)
+    if not os.path.exists(src_path):
+        logger.warning(f"Исходное изображение для миниатюр не найдено: {src_path}")
+        return False
+
+    out_dir = get_derivatives_dir(file_url)
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    if os.path.exists(manifest_path) and os.path.getmtime(manifest_path) >= os.path.getmtime(src_path):
+        return True
+
+    img = cv2.imread(src_path, cv2.IMREAD_UNCHANGED)
+    if img is None:
+        logger.warning(f"Не удалось прочитать изображение для миниатюр: {src_path}")
+        return False
+    if img.ndim == 3 and img.shape[2] == 4:
+        img = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
+    img = _to_uint8(img)
+
+    # Пересобираем каталог целиком, чтобы не оставить тайлы старых размеров
+    if os.path.exists(out_dir):
+        shutil.rmtree(out_dir, ignore_errors=True)
+    os.makedirs(out_dir, exist_ok=True)
+
+    height, width = img.shape[:2]
+
+    # Миниатюра
+    scale = min(1.0, THUMBNAIL_SIZE / max(height, width))
+    thumb = cv2.resize(
+        img,
+        (max(1, round(width * scale)), max(1, round(height * scale))),
+        interpolation=cv2.INTER_AREA,
+    ) if scale < 1.0 else img
+    _write_jpeg(os.path.join(out_dir, THUMBNAIL_NAME), thumb)
+
+    # Пирамида тайлов: от полного разрешения вниз, уменьшая вдвое, пока не поместится в один тайл
+    max_level = max(0, math.ceil(math.log2(max(height, width) / TILE_SIZE)))
+    level_img = img
+    for level in range(max_level, -1, -1):
+        level_dir = os.path.join(out_dir, TILES_DIR, str(level))
+        os.makedirs(level_dir, exist_ok=True)
+        h, w = level_img.shape[:2]
+        for row in range(math.ceil(h / TILE_SIZE)):
+            for col in range(math.ceil(w / TILE_SIZE)):
+                tile = level_img[row * TILE_SIZE:(row + 1) * TILE_SIZE, col * TILE_SIZE:(col + 1) * TILE_SIZE]
+                _write_jpeg(os.path.join(level_dir, f"{col}_{row}.jpg"), tile)
+        if level > 0:
+            level_img = cv2.resize(
+                level_img,
+                (max(1, (w + 1) // 2), max(1, (h + 1) // 2)),
+                interpolation=cv2.INTER_AREA,
+            )
+
+    # Описание пирамиды пишется последним: по нему определяется готовность производных
+    with open(manifest_path, "w") as f:
+        json.dump({
+            "width": width,
+            "height": height,
+            "tile_size": TILE_SIZE,
+            "max_level": max_level,
+            "format": "jpg",
+            "tiles_url": f"{settings.media.derivatives_url}/{_derivatives_relative(file_url)}/{TILES_DIR}",
+        }, f)
+
+    return True
+
+
+def safe_build_derivatives(file_url: str) -> bool:
+    """
+    Строит производные изображения, не прерывая основную операцию при ошибке.
+    Возвращает True, если производные готовы (значение флага has_derivatives в БД)
+    """
+    try:
+        return build_derivatives(file_url)
+    except Exception as e:
+        logger.warning(f"Ошибка построения миниатюр для {file_url}: {e}")
+        return False
+
+
+def remove_derivatives(file_url: str | None) -> None:
+    """ Удаляет миниатюру и пирамиду тайлов изображения """
+    if not file_url:
+        return
+    out_dir = get_derivatives_dir(file_url)
+    if os.path.exists(out_dir):
+        try:
+            shutil.rmtree(out_dir)
+        except Exception as e:
+            logger.warning(f"Ошибка при удалении производных изображения {out_dir}: {e}")
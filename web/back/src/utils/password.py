@@ -0,0 +1,92 @@
+import time
+import asyncio
+import logging
+import threading
+from functools import cache
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from src.core.config import settings
+from src.core.metrics import PASSWORD_HASH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+"""
+Хеширование и проверка паролей вне цикла событий.
+scrypt/PBKDF2 занимают десятки миллисекунд процессорного времени; вызванные прямо
+в async-обработчике, они останавливают все остальные запросы. Здесь они выполняются
+в ограниченном пуле потоков (hashlib отпускает GIL на время вычисления), поэтому
+всплеск входов занимает не больше PASSWORD_HASH_WORKERS ядер, а API продолжает отвечать.
+"""
+
+SLOW_HASH_SECONDS = 1.0  # Порог предупреждения в журнале о долгом хешировании
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.password.hash_workers,
+                thread_name_prefix="password-hash",
+            )
+        return _executor
+
+
+def shutdown_executor() -> None:
+    """ Останавливает пул хеширования (при завершении приложения) """
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def observe_hash(operation: str, seconds: float) -> None:
+    """ Учитывает длительность операции хеширования в метрике hyperspectrus_password_hash_seconds """
+    PASSWORD_HASH_SECONDS.observe(seconds, operation=operation)
+    if seconds > SLOW_HASH_SECONDS:
+        logger.warning(f"Долгая операция с паролем ({operation}): {seconds:.3f} с")
+
+
+async def _run(operation: str, func, *args):
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    try:
+        return await loop.run_in_executor(_get_executor(), func, *args)
+    finally:
+        # Время включает ожидание в очереди пула — именно его видит пользователь при входе
+        observe_hash(operation, time.perf_counter() - started)
+
+
+def hash_method(hashed_password: str) -> str:
+    """ Метод и параметры хеша werkzeug (часть до первого '$', например scrypt:32768:8:1) """
+    return hashed_password.split("$", 1)[0]
+
+
+@cache
+def current_hash_method() -> str:
+    """
+    Метод из настроек (PASSWORD_HASH_METHOD) в полной форме, как его записывает werkzeug:
+    сокращения раскрываются (scrypt -> scrypt:32768:8:1, pbkdf2 -> pbkdf2:sha256:1000000)
+    """
+    return hash_method(generate_password_hash("", settings.password.hash_method))
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """ Хеш получен не текущим методом из настроек (PASSWORD_HASH_METHOD) """
+    return hash_method(hashed_password) != current_hash_method()
+
+
+async def hash_password(password: str) -> str:
+    """ Хеширует пароль текущим методом из настроек """
+    return await _run("hash", generate_password_hash, password, settings.password.hash_method)
+
+
+async def verify_password(hashed_password: str, password: str) -> bool:
+    """ Проверяет пароль по хешу """
+    return await _run("verify", check_password_hash, hashed_password, password)
@@ -0,0 +1,124 @@
+import cv2
+import numpy as np
+import imageio.v2 as imageio
+from PIL import Image
+
+"""
+Вычислительные этапы обработки сеанса без привязки к БД и Celery:
+чтение каналов, оптическая плотность, разложение на хромофоры, THb и сегментация.
+Используются задачей process_session и бенчмарком (benchmarks/pipeline.py).
+"""
+
+BAND_SIZE = (256, 256)  # Размер, к которому приводятся все каналы (W, H)
+
+
+# Флаги cv2.imread для чтения в оттенках серого с уменьшением при декодировании
+REDUCED_DECODE_FLAGS = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+
+def imagesize(file_path: str) -> tuple[int, int]:
+    """ Размер снимка (W, H) по заголовку файла, без декодирования """
+    with Image.open(file_path) as img:
+        return img.size
+
+
+def _reduced_decode_factor(frame: tuple[int, int], size: tuple[int, int]) -> int:
+    """ Наибольший коэффициент уменьшения при декодировании, после которого кадр frame (W, H) не меньше size """
+    for factor in sorted(REDUCED_DECODE_FLAGS, reverse=True):
+        if frame[0] >= size[0] * factor and frame[1] >= size[1] * factor:
+            return factor
+    return 1
+
+
+def read_band(
+        file_path: str,
+        size: tuple[int, int] = BAND_SIZE,
+        roi: tuple[int, int, int, int] | None = None,
+) -> np.ndarray:
+    """
+    Читает снимок канала в оттенках серого, вырезает область интереса roi (x, y, ширина, высота)
+    и приводит к размеру size (float32). Снимок сразу декодируется уменьшенным в 2/4/8 раз
+    (для JPEG — масштабированием в libjpeg), насколько позволяет итоговый размер
+    """
+    width, height = imagesize(file_path)
+    x, y, w, h = roi if roi is not None else (0, 0, width, height)
+    x, y = min(max(x, 0), width - 1), min(max(y, 0), height - 1)
+    w, h = max(min(w, width - x), 1), max(min(h, height - y), 1)
+
+    factor = _reduced_decode_factor((w, h), size)
+    img = cv2.imread(file_path, REDUCED_DECODE_FLAGS[factor])
+    if img is None:  # Формат, который не читает OpenCV
+        factor = 1
+        img = imageio.imread(file_path)
+        if img.ndim == 3:
+            img = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+    img = img[y // factor:(y + h) // factor, x // factor:(x + w) // factor]
+    img = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+    return img.astype(np.float32)
+
+
+def optical_density(images: np.ndarray) -> np.ndarray:
+    """
+    OD = -log10(I / 255); значения ограничиваются снизу, чтобы не брать логарифм нуля
+    """
+    cube_norm = np.clip(images / 255.0, 1e-6, 1.0)
+    return -np.log10(cube_norm)
+
+
+def thb_map(concentrations: np.ndarray, idx_hbo2: int, idx_hb: int) -> np.ndarray:
+    """
+    Карта общего гемоглобина THb = |HbO2| + |Hb|
+    """
+    return np.abs(concentrations[idx_hbo2]) + np.abs(concentrations[idx_hb])
+
+
+def segment_otsu(thb: np.ndarray, blur: bool = True) -> tuple[np.ndarray, float]:
+    """
+    Маска очага: нормировка к 0–255, размытие Гаусса и порог Otsu. Возвращает (маска, размах).
+    blur=False — без размытия (карта уже сглажена регуляризацией при разложении)
+    """
+    ptp = np.ptp(thb)
+    if ptp == 0 or np.isnan(ptp):
+        thb_norm = np.zeros_like(thb, dtype=np.uint8)
+    else:
+        thb_norm = ((thb - thb.min()) / ptp * 255).astype(np.uint8)
+
+    if blur:
+        thb_norm = cv2.GaussianBlur(thb_norm, (5, 5), 2)
+    _, mask = cv2.threshold(thb_norm, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return mask, ptp
+
+
+def zone_statistics(thb: np.ndarray, mask: np.ndarray) -> tuple[float, float, float]:
+    """
+    Средний THb в очаге и на коже и их отношение (s-коэффициент)
+    """
+    lesion = thb[mask > 0]
+    skin = thb[mask == 0]
+    mean_lesion = float(np.mean(lesion)) if lesion.size else 0.0
+    mean_skin = float(np.mean(skin)) if skin.size else 1e-6
+    s_coeff = mean_lesion / mean_skin if mean_skin else 0.0
+    return mean_lesion, mean_skin, s_coeff
+
+
+def contour_image(thb: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """
+    Цветная THb-карта (BGR) с нанесённым контуром очага
+    """
+    color_thb = cv2.normalize(thb, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+    color_thb = cv2.cvtColor(color_thb, cv2.COLOR_GRAY2BGR)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    cv2.drawContours(color_thb, contours, -1, (0, 0, 255), 2)
+    return color_thb
+
+
+def to_uint8(img: np.ndarray) -> np.ndarray:
+    """
+    Нормировка карты к 0–255 для сохранения
+    """
+    return cv2.normalize(img, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
@@ -1,4 +1,8 @@
 import time
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
 from datetime import timedelta
 from uuid import UUID
 
@@ -11,6 +15,56 @@ from src.models.user import User
 from src.exceptions.base import BaseException
 from src.utils.time import get_current_utc_time
 
+REVOKED_KEY_PREFIX = "revoked"
+
+
+class TokenVerifyCache:
+    """
+    LRU-кеш результатов проверки JWT в памяти процесса.
+    Ключ — SHA-256 токена (сам токен не хранится), запись живёт не дольше exp токена.
+    Подпись HS256 детерминирована, поэтому повторная проверка того же токена
+    даёт тот же результат и её можно не выполнять
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: OrderedDict[bytes, tuple[float, UserJWT]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> UserJWT | None:
+        key = self._key(token)
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            exp, user = item
+            if exp <= time.time():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return user
+
+    def put(self, token: str, exp: float, user: UserJWT) -> None:
+        if self.max_size <= 0:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._items[key] = (exp, user)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+verify_cache = TokenVerifyCache(settings.jwt.verify_cache_size)
+
 
 class JWTHelper:
     """
@@ -29,6 +83,7 @@ class JWTHelper:
             'exp': now + expiration,        # Время истечения токена
             'roles': roles,                 # Роли пользователя
             'is_superuser': is_superuser,   # Пользователь - суперпользователь
+            'jti': uuid.uuid4().hex,        # Идентификатор токена (для отзыва)
         }
 
         encoded_jwt = jwt.encode(payload, key=settings.jwt.secret_key, algorithm=settings.jwt.algorithm)
@@ -91,11 +146,24 @@ class JWTHelper:
 
         return new_access_token
 
+    @staticmethod
+    def revocation_key(token: str, payload: dict) -> str:
+        """
+        Ключ Redis отметки об отзыве токена: по jti, а для токенов,
+        выпущенных до появления jti, — прежний ключ (сам токен)
+        """
+        jti = payload.get('jti')
+        return f"{REVOKED_KEY_PREFIX}:{jti}" if jti else token
+
     @staticmethod
     def decode(token: str) -> dict | None:
         """
-        Проверяет подлинность и срок действия переданного JWT токена
+        Проверяет подлинность и срок действия переданного JWT токена.
+        Результат проверки кешируется до истечения токена (см. TokenVerifyCache)
         """
+        cached = verify_cache.get(token)
+        if cached is not None:
+            return cached
 
         try:
             decoded_token = decode(
@@ -114,6 +182,8 @@ class JWTHelper:
                 "token": token,
             }
 
-            return UserJWT(**user_data)
+            user = UserJWT(**user_data)
+            verify_cache.put(token, decoded_token["exp"], user)
+            return user
         except (ExpiredSignatureError, InvalidTokenError):
             return None
\ No newline at end of file
@@ -25,6 +25,10 @@ export class SessionResource extends ApiService {
     return this.$post(`/api/v1/patients/${patientId}/sessions/${sessionId}/process/`);
   }
 
+  getSessionStatus(patientId, sessionId) {
+    return this.$get(`/api/v1/patients/${patientId}/sessions/${sessionId}/status/`);
+  }
+
   processSessionStatus(patientId, sessionId) {
     return this.$get(`/api/v1/patients/${patientId}/sessions/${sessionId}/process/status/`);
   }
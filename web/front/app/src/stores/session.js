@@ -50,6 +50,14 @@ export const useSessionStore = defineStore("session", {
       }
       return null
     },
+    // Получение облегчённого статуса сеанса (без изображений) для опроса во время обработки
+    async loadSessionStatus(patientId, sessionId) {
+      const res = await resources.session.getSessionStatus(patientId, sessionId);
+      if (res.__state === "success") {
+        return res.data
+      }
+      return null
+    },
     // Получение статуса обработки данных сеанса у пациента по их ID
     async processSessionStatus(patientId, sessionId) {
       const res = await resources.session.processSessionStatus(patientId, sessionId);